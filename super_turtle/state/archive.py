@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator, Mapping
+
+try:
+    from super_turtle.state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _exclusive_lock,
+        _load_record,
+    )
+except ModuleNotFoundError:
+    from state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _exclusive_lock,
+        _load_record,
+    )
+
+ARCHIVE_DIRNAME = "archive"
+ARCHIVE_KINDS = frozenset({"wakeups", "workers"})
+TERMINAL_WAKEUP_STATES = frozenset({"sent", "suppressed", "failed"})
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600
+GC_STAMP_FILENAME = ".last_gc.json"
+COMMITTED_SIZES_FILENAME = ".committed.json"
+
+
+def _archive_dir(conductor: ConductorStateStore) -> Path:
+    return conductor.paths.base_dir / ARCHIVE_DIRNAME
+
+
+def _archive_file(conductor: ConductorStateStore, kind: str) -> Path:
+    if kind not in ARCHIVE_KINDS:
+        raise ValueError(f"kind must be one of: {', '.join(sorted(ARCHIVE_KINDS))}")
+    return _archive_dir(conductor) / f"{kind}.jsonl.gz"
+
+
+def _parse_timestamp(value: Any) -> float | None:
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _record_age_reference(record: Mapping[str, Any], *keys: str) -> float | None:
+    for key in keys:
+        parsed = _parse_timestamp(record.get(key))
+        if parsed is not None:
+            return parsed
+    return None
+
+
+def _load_json_file(path: Path) -> dict[str, Any] | None:
+    try:
+        loaded = _load_record(path)
+    except (OSError, ValueError):
+        return None
+    return loaded if isinstance(loaded, dict) else None
+
+
+def _time_listing(conductor: ConductorStateStore) -> float:
+    started_at = time.perf_counter()
+    conductor.list_wakeups()
+    conductor.list_worker_states()
+    return time.perf_counter() - started_at
+
+
+def _append_archive_member(
+    conductor: ConductorStateStore, kind: str, records: list[dict[str, Any]]
+) -> int:
+    # Caller holds the archive lock. The committed size is recorded only after
+    # the member is fsynced, so a member cut short by a crash is dropped by
+    # the next pass instead of hiding every member appended after it.
+    archive_file = _archive_file(conductor, kind)
+    committed_file = _archive_dir(conductor) / COMMITTED_SIZES_FILENAME
+    committed = _load_json_file(committed_file) or {}
+    size_before = archive_file.stat().st_size if archive_file.exists() else 0
+    expected = committed.get(kind)
+    if isinstance(expected, int) and size_before > expected:
+        os.truncate(archive_file, expected)
+        size_before = expected
+    with gzip.open(archive_file, "at", encoding="utf-8") as archive:
+        for record in records:
+            archive.write(json.dumps(record, sort_keys=True) + "\n")
+    with archive_file.open("rb") as archive_bytes:
+        os.fsync(archive_bytes.fileno())
+    size_after = archive_file.stat().st_size
+    committed[kind] = size_after
+    _atomic_write_json(committed_file, committed, shared=False)
+    return size_after - size_before
+
+
+def _archive_paths(
+    conductor: ConductorStateStore,
+    kind: str,
+    paths: list[Path],
+    lock_path_for: Callable[[Path], Path | None],
+) -> tuple[int, int]:
+    # Each GC pass appends one gzip member. Originals are removed only after
+    # the member is committed, so a crash can duplicate a record but never
+    # lose one; readers keep the last copy per id.
+    if not paths:
+        return 0, 0
+    snapshots: list[tuple[Path, dict[str, Any]]] = []
+    for path in paths:
+        record = _load_json_file(path)
+        if record is not None:
+            snapshots.append((path, record))
+    if not snapshots:
+        return 0, 0
+    with _exclusive_lock(_archive_dir(conductor) / ".lock"):
+        added = _append_archive_member(conductor, kind, [record for _path, record in snapshots])
+    reclaimed = 0
+    for path, record in snapshots:
+        lock_path = lock_path_for(path)
+        with _exclusive_lock(lock_path) if lock_path is not None else nullcontext():
+            # A writer may have reused the id since the snapshot; keep the
+            # live record then (the archived copy is history only).
+            current = _load_json_file(path)
+            if current is None or current.get("updated_at") != record.get("updated_at"):
+                continue
+            if not _is_collectable(kind, current):
+                continue
+            try:
+                reclaimed += path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+    return reclaimed, added
+
+
+def _is_collectable(kind: str, record: Mapping[str, Any]) -> bool:
+    if kind == "wakeups":
+        return record.get("delivery_state") in TERMINAL_WAKEUP_STATES
+    return record.get("lifecycle_state") == "archived"
+
+
+def collect_garbage(
+    state_dir: str | Path,
+    *,
+    retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+    now: float | None = None,
+    dry_run: bool = False,
+) -> dict[str, Any]:
+    conductor = ConductorStateStore(state_dir)
+    now = time.time() if now is None else now
+    cutoff = now - retention_seconds
+    listing_seconds_before = _time_listing(conductor)
+
+    wakeup_paths: list[Path] = []
+    for path in [
+        *conductor.paths.wakeups_dir.glob("*.json"),
+        *conductor.paths.wakeups_archive_dir.glob("*.json"),
+    ]:
+        record = _load_json_file(path)
+        if record is None or not _is_collectable("wakeups", record):
+            continue
+        reference = _record_age_reference(record, "updated_at", "created_at")
+        if reference is not None and reference < cutoff:
+            wakeup_paths.append(path)
+
+    worker_paths: list[Path] = []
+    for path in conductor.paths.workers_dir.glob("*.json"):
+        record = _load_json_file(path)
+        if record is None or not _is_collectable("workers", record):
+            continue
+        reference = _record_age_reference(record, "updated_at", "terminal_at", "created_at")
+        if reference is not None and reference < cutoff:
+            worker_paths.append(path)
+
+    report: dict[str, Any] = {
+        "dry_run": dry_run,
+        "retention_seconds": retention_seconds,
+        "wakeups_archived": len(wakeup_paths),
+        "workers_archived": len(worker_paths),
+        "bytes_reclaimed": 0,
+        "archive_bytes_added": 0,
+        "listing_seconds_before": round(listing_seconds_before, 6),
+        "listing_seconds_after": round(listing_seconds_before, 6),
+    }
+    if dry_run:
+        report["bytes_reclaimed"] = sum(path.stat().st_size for path in [*wakeup_paths, *worker_paths])
+        return report
+
+    # Hold the queue lock so an in-flight ack cannot move a wakeup mid-pass;
+    # workers are re-checked under their own lock before removal.
+    with _exclusive_lock(conductor.paths.wakeup_queue_dir / ".lock"):
+        wakeup_reclaimed, wakeup_added = _archive_paths(
+            conductor, "wakeups", wakeup_paths, lambda _path: None
+        )
+    worker_reclaimed, worker_added = _archive_paths(
+        conductor,
+        "workers",
+        worker_paths,
+        lambda path: conductor.worker_lock_path(path.stem),
+    )
+
+    report["bytes_reclaimed"] = wakeup_reclaimed + worker_reclaimed
+    report["archive_bytes_added"] = wakeup_added + worker_added
+    report["listing_seconds_after"] = round(_time_listing(conductor), 6)
+    _atomic_write_json(
+        _archive_dir(conductor) / GC_STAMP_FILENAME,
+        {"ran_at": now, "report": report},
+        shared=False,
+    )
+    return report
+
+
+def maybe_collect_garbage(
+    state_dir: str | Path,
+    *,
+    interval_seconds: float,
+    retention_seconds: float = DEFAULT_RETENTION_SECONDS,
+    now: float | None = None,
+) -> dict[str, Any] | None:
+    conductor = ConductorStateStore(state_dir)
+    now = time.time() if now is None else now
+    stamp = _load_json_file(_archive_dir(conductor) / GC_STAMP_FILENAME) or {}
+    last_ran_at = stamp.get("ran_at")
+    if isinstance(last_ran_at, (int, float)) and now - last_ran_at < interval_seconds:
+        return None
+    return collect_garbage(state_dir, retention_seconds=retention_seconds, now=now)
+
+
+def iter_archived(state_dir: str | Path, kind: str) -> Iterator[dict[str, Any]]:
+    archive_file = _archive_file(ConductorStateStore(state_dir), kind)
+    if not archive_file.exists():
+        return
+    with gzip.open(archive_file, "rt", encoding="utf-8") as archive:
+        try:
+            for line in archive:
+                try:
+                    loaded = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(loaded, dict):
+                    yield loaded
+        except (EOFError, gzip.BadGzipFile):
+            # A member cut short by an interrupted pass; everything before it
+            # is intact and the next pass truncates it away.
+            return
+
+
+def query_archive(
+    state_dir: str | Path,
+    kind: str,
+    *,
+    worker_name: str | None = None,
+    record_id: str | None = None,
+    delivery_state: str | None = None,
+) -> list[dict[str, Any]]:
+    latest: dict[str, dict[str, Any]] = {}
+    for record in iter_archived(state_dir, kind):
+        if worker_name and record.get("worker_name") != worker_name:
+            continue
+        if delivery_state and record.get("delivery_state") != delivery_state:
+            continue
+        key = str(record.get("id") or record.get("worker_name") or "")
+        if kind == "workers":
+            # A worker name is reused across runs; keep each run separately.
+            key = f"{record.get('worker_name')}:{record.get('run_id')}"
+        if record_id and record_id not in {record.get("id"), record.get("worker_name")}:
+            continue
+        latest[key] = record
+    return list(latest.values())
+
+
+__all__ = [
+    "ARCHIVE_DIRNAME",
+    "DEFAULT_RETENTION_SECONDS",
+    "collect_garbage",
+    "iter_archived",
+    "maybe_collect_garbage",
+    "query_archive",
+]
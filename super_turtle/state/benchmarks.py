@@ -0,0 +1,456 @@
+"""Synthetic-fleet benchmarks for the conductor state layer.
+
+Run ``python -m super_turtle.state.benchmarks --scenario smoke --update-baseline``
+once to record a local baseline, then ``--compare`` after a change to time the
+store's hot operations against it. Baselines are machine-local and are not
+checked in; each run also times a fixed calibration workload, and comparisons
+scale the baseline by the calibration ratio so a slower or faster host does
+not read as a regression or an improvement.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Mapping, Sequence
+
+if __package__ in {None, ""}:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from super_turtle.state.conductor_state import (
+        CONDUCTOR_SCHEMA_VERSION,
+        ConductorStateStore,
+    )
+    from super_turtle.state.record_codecs import encode_event_line
+    from super_turtle.state.run_state_writer import refresh_handoff_from_conductor
+except ModuleNotFoundError:
+    from state.conductor_state import CONDUCTOR_SCHEMA_VERSION, ConductorStateStore
+    from state.record_codecs import encode_event_line
+    from state.run_state_writer import refresh_handoff_from_conductor
+
+BENCHMARK_REPORT_VERSION = 1
+BASELINE_ENV = "SUPERTURTLE_BENCHMARK_BASELINE"
+# Relative to the working directory; .superturtle/ holds local runtime state.
+DEFAULT_BASELINE_PATH = Path(".superturtle") / "benchmark_baseline.json"
+DEFAULT_TOLERANCE = 0.25
+# p50 differences below this are timer noise on any machine.
+NOISE_FLOOR_MS = 0.05
+CALIBRATION_SAMPLES = 100
+SEED_TIMESTAMP = "2026-01-01T00:00:00Z"
+_SEED_CHUNK_LINES = 10_000
+_LIFECYCLE_MIX = ("running", "running", "running", "completed", "failed", "stopped")
+_LOOP_TYPES = ("slow", "yolo", "yolo-codex", "yolo-codex-spark")
+_CHECKPOINT_PAYLOAD = {
+    "kind": "iteration_complete",
+    "loop_type": "yolo",
+    "head_sha": "0" * 40,
+    "timings": {"clock": "monotonic", "phases": {"yolo": 42.5}, "total_seconds": 43.0},
+}
+
+
+@dataclass(frozen=True)
+class Fleet:
+    workers: int
+    events: int
+    wakeups: int
+    # Timed calls per operation.
+    samples: int
+
+
+SCENARIOS = {
+    "smoke": Fleet(workers=10, events=1_000, wakeups=100, samples=50),
+    "small": Fleet(workers=100, events=10_000, wakeups=1_000, samples=50),
+    "medium": Fleet(workers=1_000, events=100_000, wakeups=2_000, samples=20),
+    "large": Fleet(workers=10_000, events=10_000_000, wakeups=5_000, samples=5),
+}
+OPERATIONS = (
+    "append_event",
+    "write_worker_state",
+    "list_worker_states",
+    "list_wakeups",
+    "refresh_handoff_from_conductor",
+)
+
+
+def _worker_names(fleet: Fleet) -> list[str]:
+    return [f"bench-{index:05d}" for index in range(fleet.workers)]
+
+
+def _seed_events(store: ConductorStateStore, names: Sequence[str], count: int) -> None:
+    # Written straight to the log: timing setup through append_event would
+    # dominate the run at 1e7 events. Every other event carries a key, so the
+    # idempotency index has realistic work to catch up on.
+    store.paths.events_jsonl_file.parent.mkdir(parents=True, exist_ok=True)
+    with store.paths.events_jsonl_file.open("a", encoding="utf-8") as events_file:
+        chunk: list[str] = []
+        for index in range(count):
+            worker_name = names[index % len(names)]
+            chunk.append(
+                encode_event_line(
+                    {
+                        "kind": "worker_event",
+                        "schema_version": CONDUCTOR_SCHEMA_VERSION,
+                        "id": f"evt_bench_{index:08d}",
+                        "timestamp": SEED_TIMESTAMP,
+                        "worker_name": worker_name,
+                        "run_id": f"run-{worker_name}",
+                        "event_type": "worker.checkpoint",
+                        "emitted_by": "subturtle",
+                        "lifecycle_state": "running",
+                        "idempotency_key": f"seed:{index}" if index % 2 == 0 else None,
+                        "payload": _CHECKPOINT_PAYLOAD,
+                    }
+                )
+            )
+            if len(chunk) >= _SEED_CHUNK_LINES:
+                events_file.writelines(chunk)
+                chunk = []
+        events_file.writelines(chunk)
+
+
+def seed_fleet(state_dir: Path, fleet: Fleet, *, seed: int = 0) -> dict[str, float]:
+    """Populate ``state_dir`` with a synthetic fleet; returns seconds per step."""
+    rng = random.Random(seed)
+    store = ConductorStateStore(state_dir)
+    names = _worker_names(fleet)
+    workspaces_dir = state_dir.parent / "workspaces"
+    setup: dict[str, float] = {}
+
+    started_at = time.perf_counter()
+    for worker_name in names:
+        workspace = workspaces_dir / worker_name
+        workspace.mkdir(parents=True, exist_ok=True)
+        store.write_worker_state(
+            store.make_worker_state(
+                worker_name=worker_name,
+                lifecycle_state=rng.choice(_LIFECYCLE_MIX),
+                updated_by="subturtle",
+                run_id=f"run-{worker_name}",
+                workspace=str(workspace),
+                loop_type=rng.choice(_LOOP_TYPES),
+                current_task="Synthetic benchmark task",
+                checkpoint={"iteration": rng.randint(1, 500), **_CHECKPOINT_PAYLOAD},
+            )
+        )
+    setup["workers_seconds"] = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    _seed_events(store, names, fleet.events)
+    setup["events_seconds"] = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    for index in range(fleet.wakeups):
+        store.write_wakeup(
+            store.make_wakeup(
+                worker_name=names[index % len(names)],
+                category=rng.choice(("critical", "notable", "silent")),
+                summary=f"Synthetic wakeup {index}",
+                delivery_state="pending" if index % 4 == 0 else "sent",
+                wakeup_id=f"wake_bench_{index:06d}",
+            )
+        )
+    setup["wakeups_seconds"] = time.perf_counter() - started_at
+    return {key: round(seconds, 3) for key, seconds in setup.items()}
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _summarize(durations: Sequence[float]) -> dict[str, Any]:
+    ordered = sorted(seconds * 1000 for seconds in durations)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 4),
+        "p50_ms": round(_percentile(ordered, 0.50), 4),
+        "p95_ms": round(_percentile(ordered, 0.95), 4),
+        "max_ms": round(ordered[-1], 4),
+    }
+
+
+def _time_calls(call: Callable[[int], Any], count: int) -> dict[str, Any]:
+    durations = []
+    for index in range(count):
+        started_at = time.perf_counter()
+        call(index)
+        durations.append(time.perf_counter() - started_at)
+    return _summarize(durations)
+
+
+def calibrate(work_dir: Path, samples: int = CALIBRATION_SAMPLES) -> dict[str, Any]:
+    """Time a fixed JSON-and-file workload that stands in for host speed."""
+    path = work_dir / "calibration.json"
+    records = [{**_CHECKPOINT_PAYLOAD, "iteration": index} for index in range(50)]
+
+    def call(_index: int) -> None:
+        path.write_text(json.dumps(records, sort_keys=True), encoding="utf-8")
+        json.loads(path.read_text(encoding="utf-8"))
+
+    try:
+        return _time_calls(call, samples)
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def time_operations(
+    state_dir: Path, fleet: Fleet, operations: Sequence[str] = OPERATIONS
+) -> dict[str, dict[str, Any]]:
+    """Time each operation ``fleet.samples`` times against a seeded state dir.
+
+    Reads use a fresh store per call, as a one-shot CLI invocation would.
+    The first keyed append also pays for catching the idempotency index up
+    with the seeded log; it is reported on its own as ``event_index_catch_up``.
+    """
+    names = _worker_names(fleet)
+    store = ConductorStateStore(state_dir)
+    results: dict[str, dict[str, Any]] = {}
+
+    def append(index: int) -> None:
+        worker_name = names[index % len(names)]
+        store.append_event(
+            worker_name=worker_name,
+            event_type="worker.checkpoint",
+            emitted_by="subturtle",
+            run_id=f"run-{worker_name}",
+            lifecycle_state="running",
+            payload=_CHECKPOINT_PAYLOAD,
+            idempotency_key=f"bench:{index}",
+        )
+
+    def write_state(index: int) -> None:
+        state = store.load_worker_state(names[index % len(names)]) or {}
+        store.write_worker_state({**state, "current_task": f"Benchmark task {index}"})
+
+    calls: dict[str, Callable[[int], Any]] = {
+        "append_event": lambda index: append(index + 1),
+        "write_worker_state": write_state,
+        "list_worker_states": lambda _index: ConductorStateStore(state_dir).list_worker_states(),
+        "list_wakeups": lambda _index: ConductorStateStore(state_dir).list_wakeups(),
+        "refresh_handoff_from_conductor": lambda _index: refresh_handoff_from_conductor(
+            state_dir, updated_at=SEED_TIMESTAMP
+        ),
+    }
+    if "append_event" in operations:
+        results["event_index_catch_up"] = _time_calls(append, 1)
+    for operation in operations:
+        results[operation] = _time_calls(calls[operation], fleet.samples)
+    return results
+
+
+def run_benchmarks(
+    fleet: Fleet,
+    *,
+    scenario: str = "custom",
+    operations: Sequence[str] = OPERATIONS,
+    work_dir: Path | None = None,
+) -> dict[str, Any]:
+    """Seed a throwaway state dir, time ``operations`` and return the report."""
+    temp_dir = Path(tempfile.mkdtemp(prefix="superturtle-bench-", dir=work_dir))
+    try:
+        state_dir = temp_dir / "state"
+        setup = seed_fleet(state_dir, fleet)
+        before = calibrate(temp_dir)
+        results = time_operations(state_dir, fleet, operations)
+        after = calibrate(temp_dir)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return {
+        "version": BENCHMARK_REPORT_VERSION,
+        "scenario": scenario,
+        "fleet": asdict(fleet),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "setup_seconds": setup,
+        # Bracketing the operations evens out host speed drifting mid-run.
+        "calibration": {
+            "count": before["count"] + after["count"],
+            "p50_ms": round((before["p50_ms"] + after["p50_ms"]) / 2, 4),
+        },
+        "operations": results,
+    }
+
+
+def compare_to_baseline(
+    report: Mapping[str, Any],
+    baseline: Mapping[str, Any],
+    *,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> dict[str, Any]:
+    """Compare p50 latencies with the baseline for the report's scenario.
+
+    When both sides carry a calibration timing, baseline p50s are first
+    scaled by the ratio of the two calibration p50s, so only the operations'
+    speed relative to the host is compared. An operation regresses when its
+    p50 exceeds the (scaled) baseline by more than ``tolerance`` (a fraction)
+    and by more than ``NOISE_FLOOR_MS``.
+    """
+    scenarios = baseline.get("scenarios") if isinstance(baseline.get("scenarios"), Mapping) else {}
+    expected = scenarios.get(report.get("scenario"))
+    comparison: dict[str, Any] = {
+        "regressions": [],
+        "improvements": [],
+        "missing": [],
+        "host_scale": None,
+    }
+    if not isinstance(expected, Mapping):
+        comparison["missing"] = sorted(report.get("operations", {}))
+        return comparison
+    scale = 1.0
+    current_calibration = report.get("calibration")
+    expected_calibration = expected.get("calibration")
+    if (
+        isinstance(current_calibration, Mapping)
+        and isinstance(expected_calibration, Mapping)
+        and float(expected_calibration.get("p50_ms") or 0) > 0
+    ):
+        scale = float(current_calibration["p50_ms"]) / float(expected_calibration["p50_ms"])
+        comparison["host_scale"] = round(scale, 3)
+    for operation, current in sorted(report.get("operations", {}).items()):
+        previous = expected.get("operations", {}).get(operation)
+        if not isinstance(previous, Mapping):
+            comparison["missing"].append(operation)
+            continue
+        before, after = round(float(previous["p50_ms"]) * scale, 4), float(current["p50_ms"])
+        entry = {
+            "operation": operation,
+            "baseline_p50_ms": before,
+            "p50_ms": after,
+            "ratio": round(after / before, 3) if before else None,
+        }
+        if after - before > NOISE_FLOOR_MS and after > before * (1 + tolerance):
+            comparison["regressions"].append(entry)
+        elif before - after > NOISE_FLOOR_MS and after < before / (1 + tolerance):
+            comparison["improvements"].append(entry)
+    return comparison
+
+
+def load_baseline(path: Path) -> dict[str, Any]:
+    try:
+        loaded = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {"version": BENCHMARK_REPORT_VERSION, "scenarios": {}}
+    if not isinstance(loaded, dict):
+        raise ValueError(f"baseline must be a JSON object: {path}")
+    loaded.setdefault("scenarios", {})
+    return loaded
+
+
+def update_baseline(path: Path, report: Mapping[str, Any]) -> None:
+    """Store ``report`` as the baseline for its scenario, keeping the others."""
+    baseline = load_baseline(path)
+    baseline["version"] = BENCHMARK_REPORT_VERSION
+    baseline["scenarios"][report["scenario"]] = {
+        key: report[key]
+        for key in ("fleet", "python", "platform", "calibration", "operations")
+        if key in report
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="benchmarks",
+        description="Time conductor state operations on a synthetic fleet.",
+    )
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="smoke")
+    for field in ("workers", "events", "wakeups", "samples"):
+        parser.add_argument(
+            f"--{field}", type=int, default=None, help=f"Override the scenario's {field}."
+        )
+    parser.add_argument(
+        "--operation",
+        dest="operations",
+        action="append",
+        choices=OPERATIONS,
+        default=None,
+        help="Only time this operation (repeatable).",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=Path(os.environ.get(BASELINE_ENV) or DEFAULT_BASELINE_PATH),
+        help=f"Local baseline file (default: ${BASELINE_ENV} or {DEFAULT_BASELINE_PATH}).",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Exit 1 when an operation regressed against the baseline.",
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Record this run as the scenario's baseline.",
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        default=None,
+        help="Where to create the throwaway state dir (defaults to the system temp dir).",
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    fleet = SCENARIOS[args.scenario]
+    overrides = {
+        field: getattr(args, field)
+        for field in ("workers", "events", "wakeups", "samples")
+        if getattr(args, field) is not None
+    }
+    scenario = args.scenario
+    if overrides:
+        fleet = Fleet(**{**asdict(fleet), **overrides})
+    if set(overrides) - {"samples"}:
+        # A different fleet shape is not comparable with the scenario's baseline.
+        scenario = "custom"
+    report = run_benchmarks(
+        fleet,
+        scenario=scenario,
+        operations=args.operations or OPERATIONS,
+        work_dir=args.work_dir,
+    )
+    exit_code = 0
+    if args.compare:
+        report["comparison"] = compare_to_baseline(
+            report, load_baseline(args.baseline), tolerance=args.tolerance
+        )
+        exit_code = 1 if report["comparison"]["regressions"] else 0
+    if args.update_baseline:
+        update_baseline(args.baseline, report)
+    print(json.dumps(report, sort_keys=True))
+    return exit_code
+
+
+__all__ = [
+    "BASELINE_ENV",
+    "DEFAULT_BASELINE_PATH",
+    "OPERATIONS",
+    "SCENARIOS",
+    "Fleet",
+    "calibrate",
+    "compare_to_baseline",
+    "load_baseline",
+    "run_benchmarks",
+    "seed_fleet",
+    "time_operations",
+    "update_baseline",
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,13 +1,36 @@
 from __future__ import annotations
 
+import fcntl
+import hashlib
 import json
+import os
+import random
 import re
 import secrets
 import tempfile
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Mapping
+from typing import Any, Callable, Iterator, Mapping
+
+try:
+    from super_turtle.state.migrations import MIGRATIONS, record_version
+    from super_turtle.state.record_codecs import (
+        decode_record,
+        encode_event_line,
+        encode_record,
+        get_codec,
+    )
+except ModuleNotFoundError:
+    from state.migrations import MIGRATIONS, record_version
+    from state.record_codecs import (
+        decode_record,
+        encode_event_line,
+        encode_record,
+        get_codec,
+    )
 
 CONDUCTOR_SCHEMA_VERSION = 1
 
@@ -31,6 +54,11 @@ WAKEUP_CATEGORIES = frozenset({"critical", "notable", "silent"})
 WAKEUP_DELIVERY_STATES = frozenset(
     {"pending", "processing", "sent", "suppressed", "failed"}
 )
+WAKEUP_CATEGORY_PRIORITY = ("critical", "notable", "silent")
+WAKEUP_ARCHIVE_STATES = frozenset({"sent", "suppressed"})
+WAKEUP_TERMINAL_STATES = frozenset({"sent", "suppressed", "failed"})
+DEFAULT_WAKEUP_LEASE_SECONDS = 300.0
+WORKER_STATE_CAS_ATTEMPTS = 5
 EVENT_EMITTERS = frozenset(
     {"subturtle", "supervisor", "meta_agent", "cron", "watchdog", "system"}
 )
@@ -47,18 +75,62 @@ def _utc_now_iso() -> str:
     )
 
 
-def _atomic_write_text(path: Path, content: str) -> None:
+def _atomic_write_bytes(path: Path, content: bytes) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with tempfile.NamedTemporaryFile(
-        "w", encoding="utf-8", delete=False, dir=path.parent
-    ) as tmp_file:
+    with tempfile.NamedTemporaryFile("wb", delete=False, dir=path.parent) as tmp_file:
         tmp_file.write(content)
         tmp_path = Path(tmp_file.name)
     tmp_path.replace(path)
 
 
-def _atomic_write_json(path: Path, payload: Mapping[str, Any]) -> None:
-    _atomic_write_text(path, json.dumps(dict(payload), indent=2, sort_keys=True) + "\n")
+def _atomic_write_text(path: Path, content: str) -> None:
+    _atomic_write_bytes(path, content.encode("utf-8"))
+
+
+def _atomic_write_json(path: Path, payload: Mapping[str, Any], *, shared: bool = True) -> None:
+    # ``shared`` records are also parsed by the bot and shell helpers, so they
+    # only ever use a JSON codec; private caches may use the binary one.
+    _atomic_write_bytes(path, encode_record(payload, get_codec(shared=shared)))
+
+
+def _load_record(path: Path) -> Any:
+    return decode_record(path.read_bytes())
+
+
+def _upgrade_record(record: dict[str, Any], kind: str) -> dict[str, Any]:
+    # Lazy upgrade-on-read: older records are migrated in memory and reach
+    # disk in the current schema on their next write (or via the migrator).
+    if record_version(record) >= CONDUCTOR_SCHEMA_VERSION:
+        return record
+    return MIGRATIONS.upgrade(record, kind, CONDUCTOR_SCHEMA_VERSION)
+
+
+@contextmanager
+def _exclusive_lock(lock_path: Path) -> Iterator[None]:
+    # Advisory fcntl lock; held only for the short critical sections around
+    # read-modify-write cycles, never across agent work.
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _wakeup_queue_marker(wakeup: Mapping[str, Any]) -> str:
+    # Marker names sort in FIFO order: compact created_at, then the id.
+    created_key = re.sub(r"[^0-9A-Za-z]", "", str(wakeup.get("created_at") or ""))
+    return f"{created_key}__{wakeup['id']}"
+
+
+def _iso_from_epoch(epoch_seconds: float) -> str:
+    return (
+        datetime.fromtimestamp(epoch_seconds, timezone.utc)
+        .replace(microsecond=0)
+        .isoformat()
+        .replace("+00:00", "Z")
+    )
 
 
 def _validate_worker_name(worker_name: str) -> str:
@@ -95,6 +167,9 @@ class ConductorPaths:
     events_jsonl_file: Path
     workers_dir: Path
     wakeups_dir: Path
+    wakeup_queue_dir: Path
+    wakeups_archive_dir: Path
+    event_keys_dir: Path
     runs_jsonl_file: Path
     handoff_md_file: Path
 
@@ -103,29 +178,44 @@ def ensure_conductor_state_paths(state_dir: str | Path) -> ConductorPaths:
     base_dir = Path(state_dir)
     workers_dir = base_dir / "workers"
     wakeups_dir = base_dir / "wakeups"
+    wakeup_queue_dir = wakeups_dir / "queue"
+    wakeups_archive_dir = wakeups_dir / "archive"
     events_jsonl_file = base_dir / "events.jsonl"
+    event_keys_dir = base_dir / "event_keys"
     runs_jsonl_file = base_dir / "runs.jsonl"
     handoff_md_file = base_dir / "handoff.md"
 
     base_dir.mkdir(parents=True, exist_ok=True)
     workers_dir.mkdir(parents=True, exist_ok=True)
     wakeups_dir.mkdir(parents=True, exist_ok=True)
+    (wakeup_queue_dir / "pending").mkdir(parents=True, exist_ok=True)
+    (wakeup_queue_dir / "leased").mkdir(parents=True, exist_ok=True)
+    wakeups_archive_dir.mkdir(parents=True, exist_ok=True)
     events_jsonl_file.touch(exist_ok=True)
     runs_jsonl_file.touch(exist_ok=True)
 
     return ConductorPaths(
         base_dir=base_dir,
         events_jsonl_file=events_jsonl_file,
+        event_keys_dir=event_keys_dir,
         workers_dir=workers_dir,
         wakeups_dir=wakeups_dir,
+        wakeup_queue_dir=wakeup_queue_dir,
+        wakeups_archive_dir=wakeups_archive_dir,
         runs_jsonl_file=runs_jsonl_file,
         handoff_md_file=handoff_md_file,
     )
 
 
+def _idempotency_hash(idempotency_key: str) -> str:
+    return hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()[:24]
+
+
 class ConductorStateStore:
     def __init__(self, state_dir: str | Path):
         self.paths = ensure_conductor_state_paths(state_dir)
+        # worker_name -> (index file size, {key hash: event start offset})
+        self._event_key_cache: dict[str, tuple[int, dict[str, int]]] = {}
 
     def worker_state_path(self, worker_name: str) -> Path:
         return self.paths.workers_dir / f"{_validate_worker_name(worker_name)}.json"
@@ -136,24 +226,73 @@ class ConductorStateStore:
             raise ValueError("wakeup_id must not be empty")
         return self.paths.wakeups_dir / f"{wakeup_id}.json"
 
+    def worker_lock_path(self, worker_name: str) -> Path:
+        return self.paths.workers_dir / ".locks" / f"{_validate_worker_name(worker_name)}.lock"
+
     def load_worker_state(self, worker_name: str) -> dict[str, Any] | None:
+        return self._load_worker_state_with_token(worker_name)[0]
+
+    def _load_worker_state_with_token(
+        self, worker_name: str
+    ) -> tuple[dict[str, Any] | None, tuple[Any, ...] | None]:
+        # The token changes on every atomic replace (new inode/mtime), including
+        # writes from processes that do not take the lock. It is read before
+        # the content, so a racing write can only make the token look stale.
         path = self.worker_state_path(worker_name)
-        if not path.exists():
-            return None
-        loaded = json.loads(path.read_text(encoding="utf-8"))
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            return None, None
+        loaded = _load_record(path)
         if not isinstance(loaded, dict):
             raise ValueError(f"worker state at {path} must be a JSON object")
-        return loaded
+        loaded = _upgrade_record(loaded, "worker_state")
+        token = (
+            stat_result.st_ino,
+            stat_result.st_mtime_ns,
+            loaded.get("updated_at"),
+            loaded.get("last_event_id"),
+        )
+        return loaded, token
+
+    def update_worker_state(
+        self,
+        worker_name: str,
+        build: Callable[[dict[str, Any]], Mapping[str, Any]],
+        *,
+        max_attempts: int = WORKER_STATE_CAS_ATTEMPTS,
+    ) -> dict[str, Any]:
+        # Optimistic read-modify-write: ``build`` runs unlocked on a snapshot
+        # and the write only lands if the snapshot token is unchanged under the
+        # per-worker lock. After ``max_attempts`` conflicts the final build runs
+        # while holding the lock, so a hot worker still makes progress.
+        lock_path = self.worker_lock_path(worker_name)
+        for attempt in range(max_attempts):
+            existing, token = self._load_worker_state_with_token(worker_name)
+            state = build(dict(existing or {}))
+            with _exclusive_lock(lock_path):
+                if self._load_worker_state_with_token(worker_name)[1] == token:
+                    return self._write_worker_state_unlocked(state)
+            time.sleep(random.uniform(0, 0.002 * (2**attempt)))
+
+        with _exclusive_lock(lock_path):
+            existing, _token = self._load_worker_state_with_token(worker_name)
+            return self._write_worker_state_unlocked(build(dict(existing or {})))
 
     def list_worker_states(self) -> list[dict[str, Any]]:
         states: list[dict[str, Any]] = []
         for path in sorted(self.paths.workers_dir.glob("*.json")):
-            loaded = json.loads(path.read_text(encoding="utf-8"))
+            loaded = _load_record(path)
             if isinstance(loaded, dict):
-                states.append(loaded)
+                states.append(_upgrade_record(loaded, "worker_state"))
         return states
 
     def write_worker_state(self, state: Mapping[str, Any]) -> dict[str, Any]:
+        worker_name = _validate_worker_name(str(state.get("worker_name", "")))
+        with _exclusive_lock(self.worker_lock_path(worker_name)):
+            return self._write_worker_state_unlocked(state)
+
+    def _write_worker_state_unlocked(self, state: Mapping[str, Any]) -> dict[str, Any]:
         worker_name = _validate_worker_name(str(state.get("worker_name", "")))
         lifecycle_state = _validate_choice(
             "lifecycle_state",
@@ -282,10 +421,108 @@ class ConductorStateStore:
             "payload": _normalize_mapping(payload),
         }
 
-        with self.paths.events_jsonl_file.open("a", encoding="utf-8") as jsonl_file:
-            jsonl_file.write(json.dumps(entry, sort_keys=True) + "\n")
+        with _exclusive_lock(self.paths.event_keys_dir / ".lock"):
+            if idempotency_key:
+                original = self._find_event_by_idempotency_key(worker_name, idempotency_key)
+                if original is not None:
+                    return original
+            with self.paths.events_jsonl_file.open("a", encoding="utf-8") as jsonl_file:
+                jsonl_file.write(encode_event_line(entry))
         return entry
 
+    def _catch_up_event_key_index(self) -> None:
+        # The key index is derived state: per-worker files of "<hash> <offset>"
+        # lines plus a cursor into events.jsonl. It is rebuilt from the log
+        # whenever it is missing or the log was replaced, and otherwise only
+        # the lines appended since the cursor are scanned.
+        cursor_path = self.paths.event_keys_dir / "cursor.json"
+        stat_result = self.paths.events_jsonl_file.stat()
+        try:
+            cursor = _load_record(cursor_path)
+        except (OSError, ValueError):
+            cursor = {}
+        offset = cursor.get("offset") if cursor.get("inode") == stat_result.st_ino else None
+        if not isinstance(offset, int) or offset > stat_result.st_size:
+            for index_path in self.paths.event_keys_dir.glob("*.idx"):
+                index_path.unlink(missing_ok=True)
+            self._event_key_cache.clear()
+            offset = 0
+        if offset == stat_result.st_size and cursor_path.exists():
+            return
+
+        additions: dict[str, list[str]] = {}
+        for start, end, event in self._iter_event_lines(offset):
+            offset = end
+            key = event.get("idempotency_key")
+            worker_name = event.get("worker_name")
+            if isinstance(key, str) and key and isinstance(worker_name, str) and worker_name:
+                additions.setdefault(worker_name, []).append(f"{_idempotency_hash(key)} {start}\n")
+        self.paths.event_keys_dir.mkdir(parents=True, exist_ok=True)
+        for worker_name, lines in additions.items():
+            with (self.paths.event_keys_dir / f"{worker_name}.idx").open("a", encoding="utf-8") as index_file:
+                index_file.writelines(lines)
+        _atomic_write_json(
+            cursor_path, {"inode": stat_result.st_ino, "offset": offset}, shared=False
+        )
+
+    def _load_event_key_index(self, worker_name: str) -> dict[str, int]:
+        index_path = self.paths.event_keys_dir / f"{worker_name}.idx"
+        try:
+            size = index_path.stat().st_size
+        except FileNotFoundError:
+            return {}
+        cached = self._event_key_cache.get(worker_name)
+        if cached and cached[0] == size:
+            return cached[1]
+        index: dict[str, int] = {}
+        for line in index_path.read_text(encoding="utf-8").splitlines():
+            key_hash, _, offset = line.partition(" ")
+            if offset.isdigit():
+                index.setdefault(key_hash, int(offset))
+        self._event_key_cache[worker_name] = (size, index)
+        return index
+
+    def _find_event_by_idempotency_key(
+        self, worker_name: str, idempotency_key: str
+    ) -> dict[str, Any] | None:
+        self._catch_up_event_key_index()
+        offset = self._load_event_key_index(worker_name).get(_idempotency_hash(idempotency_key))
+        if offset is None:
+            return None
+        for _start, _end, event in self._iter_event_lines(offset):
+            if (
+                event.get("worker_name") == worker_name
+                and event.get("idempotency_key") == idempotency_key
+            ):
+                return event
+            break
+        return None
+
+    def _iter_event_lines(self, start_offset: int = 0) -> Iterator[tuple[int, int, dict[str, Any]]]:
+        # Yields (line start, line end, event). A trailing partial line is left
+        # for the next reader so callers can persist the end offset as a cursor.
+        with self.paths.events_jsonl_file.open("rb") as jsonl_file:
+            jsonl_file.seek(start_offset)
+            offset = start_offset
+            for raw_line in jsonl_file:
+                if not raw_line.endswith(b"\n"):
+                    break
+                line_start = offset
+                offset += len(raw_line)
+                stripped = raw_line.strip()
+                if not stripped:
+                    continue
+                try:
+                    loaded = json.loads(stripped)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(loaded, dict):
+                    yield line_start, offset, _upgrade_record(loaded, "worker_event")
+
+    def iter_events(self, start_offset: int = 0) -> Iterator[tuple[int, dict[str, Any]]]:
+        for _line_start, line_end, event in self._iter_event_lines(start_offset):
+            yield line_end, event
+
     def make_wakeup(
         self,
         *,
@@ -333,6 +570,8 @@ class ConductorStateStore:
                 "sent_at": sent_at,
                 "failed_at": failed_at,
                 "suppressed_at": suppressed_at,
+                "lease_id": None,
+                "lease_expires_at": None,
             },
             "payload": _normalize_mapping(payload),
             "metadata": _normalize_mapping(metadata),
@@ -377,6 +616,8 @@ class ConductorStateStore:
                 "sent_at": delivery.get("sent_at"),
                 "failed_at": delivery.get("failed_at"),
                 "suppressed_at": delivery.get("suppressed_at"),
+                "lease_id": delivery.get("lease_id"),
+                "lease_expires_at": delivery.get("lease_expires_at"),
             },
             "payload": _normalize_mapping(
                 wakeup.get("payload")
@@ -389,32 +630,55 @@ class ConductorStateStore:
                 else None
             ),
         }
-        _atomic_write_json(self.wakeup_path(wakeup_id), normalized)
+        live_path = self.wakeup_path(wakeup_id)
+        archived_path = self.paths.wakeups_archive_dir / live_path.name
+        if not live_path.exists() and archived_path.exists():
+            # Acked wakeups live only in the archive; writing a live copy
+            # would make them claimable again.
+            if delivery_state not in WAKEUP_TERMINAL_STATES:
+                raise ValueError(
+                    f"wakeup {wakeup_id} is archived; "
+                    "only terminal delivery states can be written"
+                )
+            _atomic_write_json(archived_path, normalized)
+            return normalized
+        _atomic_write_json(live_path, normalized)
+        self._sync_wakeup_queue_marker(normalized)
         return normalized
 
     def load_wakeup(self, wakeup_id: str) -> dict[str, Any] | None:
         path = self.wakeup_path(wakeup_id)
+        if not path.exists():
+            path = self.paths.wakeups_archive_dir / path.name
         if not path.exists():
             return None
-        loaded = json.loads(path.read_text(encoding="utf-8"))
+        loaded = _load_record(path)
         if not isinstance(loaded, dict):
             raise ValueError(f"wakeup record at {path} must be a JSON object")
-        return loaded
+        return _upgrade_record(loaded, "wakeup")
 
-    def list_wakeups(self, delivery_state: str | None = None) -> list[dict[str, Any]]:
+    def list_wakeups(
+        self,
+        delivery_state: str | None = None,
+        *,
+        include_archived: bool = False,
+    ) -> list[dict[str, Any]]:
         if delivery_state is not None:
             delivery_state = _validate_choice(
                 "delivery_state", delivery_state, WAKEUP_DELIVERY_STATES
             )
 
+        paths = list(self.paths.wakeups_dir.glob("*.json"))
+        if include_archived:
+            paths.extend(self.paths.wakeups_archive_dir.glob("*.json"))
         wakeups: list[dict[str, Any]] = []
-        for path in sorted(self.paths.wakeups_dir.glob("*.json")):
-            loaded = json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted(paths, key=lambda candidate: candidate.name):
+            loaded = _load_record(path)
             if not isinstance(loaded, dict):
                 continue
             if delivery_state and loaded.get("delivery_state") != delivery_state:
                 continue
-            wakeups.append(loaded)
+            wakeups.append(_upgrade_record(loaded, "wakeup"))
         return wakeups
 
     def update_wakeup_delivery(
@@ -427,6 +691,30 @@ class ConductorStateStore:
         sent_at: str | None = None,
         failed_at: str | None = None,
         suppressed_at: str | None = None,
+    ) -> dict[str, Any]:
+        with _exclusive_lock(self._wakeup_queue_lock_path()):
+            return self._update_wakeup_delivery_locked(
+                wakeup_id=wakeup_id,
+                delivery_state=delivery_state,
+                increment_attempts=increment_attempts,
+                last_attempt_at=last_attempt_at,
+                sent_at=sent_at,
+                failed_at=failed_at,
+                suppressed_at=suppressed_at,
+            )
+
+    def _update_wakeup_delivery_locked(
+        self,
+        *,
+        wakeup_id: str,
+        delivery_state: str,
+        increment_attempts: bool = False,
+        last_attempt_at: str | None = None,
+        sent_at: str | None = None,
+        failed_at: str | None = None,
+        suppressed_at: str | None = None,
+        lease_id: str | None = None,
+        lease_expires_at: str | None = None,
     ) -> dict[str, Any]:
         wakeup = self.load_wakeup(wakeup_id)
         if wakeup is None:
@@ -436,6 +724,16 @@ class ConductorStateStore:
             "delivery_state", delivery_state, WAKEUP_DELIVERY_STATES
         )
         delivery = dict(wakeup.get("delivery") or {})
+        held_lease_id = delivery.get("lease_id")
+        if held_lease_id and held_lease_id != lease_id:
+            # Clearing the record's lease also drops its lease file, so the
+            # expiry sweep cannot later requeue a wakeup that moved on.
+            try:
+                self._release_wakeup_lease_locked(wakeup_id, str(held_lease_id))
+            except ValueError:
+                pass
+        delivery["lease_id"] = lease_id
+        delivery["lease_expires_at"] = lease_expires_at
         if increment_attempts:
             delivery["attempts"] = int(delivery.get("attempts", 0)) + 1
         if last_attempt_at is not None:
@@ -452,3 +750,203 @@ class ConductorStateStore:
         updated["updated_at"] = _utc_now_iso()
         updated["delivery"] = delivery
         return self.write_wakeup(updated)
+
+    def _wakeup_queue_lock_path(self) -> Path:
+        return self.paths.wakeup_queue_dir / ".lock"
+
+    def _wakeup_pending_marker_path(self, wakeup: Mapping[str, Any]) -> Path:
+        return (
+            self.paths.wakeup_queue_dir
+            / "pending"
+            / str(wakeup["category"])
+            / _wakeup_queue_marker(wakeup)
+        )
+
+    def _wakeup_lease_path(self, wakeup_id: str) -> Path:
+        return self.paths.wakeup_queue_dir / "leased" / f"{wakeup_id}.json"
+
+    def _sync_wakeup_queue_marker(self, wakeup: Mapping[str, Any]) -> None:
+        marker_path = self._wakeup_pending_marker_path(wakeup)
+        if wakeup.get("delivery_state") == "pending":
+            marker_path.parent.mkdir(parents=True, exist_ok=True)
+            marker_path.touch(exist_ok=True)
+        else:
+            marker_path.unlink(missing_ok=True)
+
+    def _sync_wakeup_queue_index(self) -> None:
+        # Wakeups written by other processes (the bot supervisor, older
+        # writers) have no queue marker. The directory mtime moves when files
+        # are added, replaced or removed, so unchanged directories cost a
+        # single stat; otherwise only files whose inode, mtime or size changed
+        # are parsed. The supervisor requeues a wakeup by rewriting the same
+        # name back to pending, so a bare list of seen names is not enough.
+        index_path = self.paths.wakeup_queue_dir / "index.json"
+        try:
+            index = _load_record(index_path)
+        except (OSError, ValueError):
+            index = {}
+        dir_mtime_ns = self.paths.wakeups_dir.stat().st_mtime_ns
+        if index.get("wakeups_dir_mtime_ns") == dir_mtime_ns:
+            return
+
+        known = index.get("files") if isinstance(index.get("files"), dict) else {}
+        present: dict[str, list[int]] = {}
+        for path in self.paths.wakeups_dir.glob("*.json"):
+            try:
+                stat_result = path.stat()
+            except OSError:
+                continue
+            signature = [stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size]
+            present[path.name] = signature
+            if known.get(path.name) == signature:
+                continue
+            try:
+                loaded = _load_record(path)
+            except (OSError, ValueError):
+                continue
+            if (
+                isinstance(loaded, dict)
+                and loaded.get("delivery_state") == "pending"
+                and loaded.get("category") in WAKEUP_CATEGORIES
+                and loaded.get("id")
+            ):
+                self._sync_wakeup_queue_marker(loaded)
+        _atomic_write_json(
+            index_path,
+            {"wakeups_dir_mtime_ns": dir_mtime_ns, "files": present},
+            shared=False,
+        )
+
+    def _expire_wakeup_leases_locked(self, now: float) -> list[str]:
+        expired: list[str] = []
+        for lease_path in (self.paths.wakeup_queue_dir / "leased").glob("*.json"):
+            try:
+                lease = _load_record(lease_path)
+            except (OSError, ValueError):
+                lease = {}
+            if float(lease.get("expires_at") or 0) > now:
+                continue
+            wakeup_id = lease_path.name[: -len(".json")]
+            lease_path.unlink(missing_ok=True)
+            wakeup = self.load_wakeup(wakeup_id)
+            if wakeup is None or wakeup.get("delivery_state") != "processing":
+                continue
+            self._update_wakeup_delivery_locked(wakeup_id=wakeup_id, delivery_state="pending")
+            expired.append(wakeup_id)
+        return expired
+
+    def expire_wakeup_leases(self, *, now: float | None = None) -> list[str]:
+        with _exclusive_lock(self._wakeup_queue_lock_path()):
+            return self._expire_wakeup_leases_locked(time.time() if now is None else now)
+
+    def claim_next(
+        self,
+        *,
+        category: str | None = None,
+        lease_seconds: float = DEFAULT_WAKEUP_LEASE_SECONDS,
+        claimed_by: str | None = None,
+        now: float | None = None,
+    ) -> dict[str, Any] | None:
+        categories = (
+            (_validate_choice("category", category, WAKEUP_CATEGORIES),)
+            if category is not None
+            else WAKEUP_CATEGORY_PRIORITY
+        )
+        if lease_seconds <= 0:
+            raise ValueError("lease_seconds must be positive")
+        now = time.time() if now is None else now
+
+        with _exclusive_lock(self._wakeup_queue_lock_path()):
+            self._sync_wakeup_queue_index()
+            self._expire_wakeup_leases_locked(now)
+            for candidate_category in categories:
+                category_dir = self.paths.wakeup_queue_dir / "pending" / candidate_category
+                if not category_dir.is_dir():
+                    continue
+                for marker in sorted(os.listdir(category_dir)):
+                    marker_path = category_dir / marker
+                    wakeup_id = marker.split("__", 1)[-1]
+                    wakeup = self.load_wakeup(wakeup_id)
+                    if (
+                        wakeup is None
+                        or wakeup.get("delivery_state") != "pending"
+                        or wakeup.get("category") != candidate_category
+                    ):
+                        # Stale marker: the record moved on without the queue.
+                        marker_path.unlink(missing_ok=True)
+                        continue
+
+                    lease_id = _new_record_id("lease")
+                    expires_at = now + lease_seconds
+                    _atomic_write_json(
+                        self._wakeup_lease_path(wakeup_id),
+                        {
+                            "lease_id": lease_id,
+                            "expires_at": expires_at,
+                            "claimed_by": claimed_by,
+                        },
+                        shared=False,
+                    )
+                    claimed = self._update_wakeup_delivery_locked(
+                        wakeup_id=wakeup_id,
+                        delivery_state="processing",
+                        increment_attempts=True,
+                        last_attempt_at=_iso_from_epoch(now),
+                        lease_id=lease_id,
+                        lease_expires_at=_iso_from_epoch(expires_at),
+                    )
+                    marker_path.unlink(missing_ok=True)
+                    return claimed
+        return None
+
+    def _release_wakeup_lease_locked(self, wakeup_id: str, lease_id: str) -> None:
+        lease_path = self._wakeup_lease_path(wakeup_id)
+        try:
+            lease = _load_record(lease_path)
+        except (OSError, ValueError):
+            raise ValueError(f"wakeup {wakeup_id} is not leased") from None
+        if lease.get("lease_id") != lease_id:
+            raise ValueError(f"lease {lease_id} does not own wakeup {wakeup_id}")
+        lease_path.unlink(missing_ok=True)
+
+    def ack(
+        self,
+        wakeup_id: str,
+        lease_id: str,
+        *,
+        delivery_state: str = "sent",
+    ) -> dict[str, Any]:
+        delivery_state = _validate_choice(
+            "delivery_state", delivery_state, WAKEUP_ARCHIVE_STATES
+        )
+        with _exclusive_lock(self._wakeup_queue_lock_path()):
+            self._release_wakeup_lease_locked(wakeup_id, lease_id)
+            now = _utc_now_iso()
+            acked = self._update_wakeup_delivery_locked(
+                wakeup_id=wakeup_id,
+                delivery_state=delivery_state,
+                sent_at=now if delivery_state == "sent" else None,
+                suppressed_at=now if delivery_state == "suppressed" else None,
+            )
+            live_path = self.wakeup_path(wakeup_id)
+            live_path.replace(self.paths.wakeups_archive_dir / live_path.name)
+            return acked
+
+    def nack(
+        self,
+        wakeup_id: str,
+        lease_id: str,
+        *,
+        retry: bool = True,
+    ) -> dict[str, Any]:
+        with _exclusive_lock(self._wakeup_queue_lock_path()):
+            self._release_wakeup_lease_locked(wakeup_id, lease_id)
+            if retry:
+                return self._update_wakeup_delivery_locked(
+                    wakeup_id=wakeup_id, delivery_state="pending"
+                )
+            return self._update_wakeup_delivery_locked(
+                wakeup_id=wakeup_id,
+                delivery_state="failed",
+                failed_at=_utc_now_iso(),
+            )
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Mapping
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+try:
+    from super_turtle.state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _load_record,
+    )
+except ModuleNotFoundError:
+    from state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _load_record,
+    )
+
+METRICS_CACHE_FILENAME = "metrics_cache.json"
+METRICS_CACHE_VERSION = 1
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9464
+# Agent phases run for seconds to tens of minutes.
+PHASE_LATENCY_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, 1800.0, 3600.0)
+ACTIVE_WAKEUP_STATES = frozenset({"pending", "processing"})
+
+
+def _empty_cache() -> dict[str, Any]:
+    return {
+        "version": METRICS_CACHE_VERSION,
+        "events": {
+            "offset": 0,
+            "inode": None,
+            "by_type": {},
+            "checkpoints": {},
+            "iterations": {},
+            "retries": {},
+            "phase_histograms": {},
+        },
+        "workers": {"dir_mtime_ns": None, "files": {}},
+        "wakeups": {"dir_mtime_ns": None, "files": {}},
+    }
+
+
+def _observe(histogram: dict[str, Any], seconds: float) -> None:
+    buckets = histogram.setdefault("buckets", [0] * len(PHASE_LATENCY_BUCKETS))
+    for index, bound in enumerate(PHASE_LATENCY_BUCKETS):
+        if seconds <= bound:
+            buckets[index] += 1
+    histogram["sum"] = histogram.get("sum", 0.0) + seconds
+    histogram["count"] = histogram.get("count", 0) + 1
+
+
+def _file_signature(stat_result: os.stat_result) -> list[int]:
+    return [stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+    rendered = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels.items())
+    return "{" + rendered + "}"
+
+
+def _format_number(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsAggregate:
+    """Incrementally maintained metrics over conductor state.
+
+    Events are consumed from a persisted byte offset, and worker/wakeup files
+    are only re-parsed when their directory changed since the last refresh, so
+    a scrape costs a couple of stats when nothing moved; the cache file is
+    only rewritten when one of its sections changed.
+    """
+
+    def __init__(self, state_dir: str | Path):
+        self.conductor = ConductorStateStore(state_dir)
+        self.cache_path = self.conductor.paths.base_dir / METRICS_CACHE_FILENAME
+        self._lock = threading.Lock()
+
+    def _load_cache(self) -> dict[str, Any]:
+        try:
+            loaded = _load_record(self.cache_path)
+        except (OSError, ValueError):
+            return _empty_cache()
+        if not isinstance(loaded, dict) or loaded.get("version") != METRICS_CACHE_VERSION:
+            return _empty_cache()
+        return loaded
+
+    def _catch_up_events(self, cache: dict[str, Any]) -> bool:
+        events = cache["events"]
+        stat_result = self.conductor.paths.events_jsonl_file.stat()
+        reset = events["inode"] != stat_result.st_ino or events["offset"] > stat_result.st_size
+        if reset:
+            # The log was rotated or truncated; start over from its beginning.
+            events.update(_empty_cache()["events"])
+            events["inode"] = stat_result.st_ino
+        if events["offset"] == stat_result.st_size:
+            return reset
+
+        for offset, event in self.conductor.iter_events(events["offset"]):
+            events["offset"] = offset
+            event_type = str(event.get("event_type") or "unknown")
+            events["by_type"][event_type] = events["by_type"].get(event_type, 0) + 1
+            if event_type != "worker.checkpoint":
+                continue
+
+            worker_name = str(event.get("worker_name") or "unknown")
+            payload = event.get("payload") if isinstance(event.get("payload"), Mapping) else {}
+            loop_type = str(payload.get("loop_type") or "unknown")
+            events["checkpoints"][worker_name] = events["checkpoints"].get(worker_name, 0) + 1
+            if isinstance(payload.get("iteration"), int):
+                events["iterations"][worker_name] = payload["iteration"]
+
+            timings = payload.get("timings") if isinstance(payload.get("timings"), Mapping) else {}
+            if isinstance(timings.get("retries"), int):
+                events["retries"][loop_type] = events["retries"].get(loop_type, 0) + timings["retries"]
+            phases = timings.get("phases") if isinstance(timings.get("phases"), Mapping) else {}
+            for phase, seconds in phases.items():
+                if isinstance(seconds, (int, float)):
+                    histogram = events["phase_histograms"].setdefault(loop_type, {}).setdefault(str(phase), {})
+                    _observe(histogram, float(seconds))
+        return True
+
+    def _refresh_directory(
+        self,
+        section: dict[str, Any],
+        directory: Path,
+        fields: tuple[str, ...],
+    ) -> bool:
+        dir_mtime_ns = directory.stat().st_mtime_ns
+        if section["dir_mtime_ns"] == dir_mtime_ns:
+            return False
+
+        previous = section["files"]
+        current: dict[str, Any] = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                try:
+                    signature = _file_signature(entry.stat())
+                except OSError:
+                    continue
+                cached = previous.get(entry.name)
+                if cached and cached[0] == signature:
+                    current[entry.name] = cached
+                    continue
+                try:
+                    loaded = _load_record(Path(entry.path))
+                except (OSError, ValueError):
+                    continue
+                if isinstance(loaded, dict):
+                    current[entry.name] = [signature, [str(loaded.get(field) or "unknown") for field in fields]]
+        section["files"] = current
+        section["dir_mtime_ns"] = dir_mtime_ns
+        return True
+
+    def refresh(self) -> dict[str, Any]:
+        with self._lock:
+            cache = self._load_cache()
+            changed = self._catch_up_events(cache)
+            changed |= self._refresh_directory(
+                cache["workers"], self.conductor.paths.workers_dir, ("lifecycle_state",)
+            )
+            changed |= self._refresh_directory(
+                cache["wakeups"],
+                self.conductor.paths.wakeups_dir,
+                ("category", "delivery_state"),
+            )
+            if changed:
+                _atomic_write_json(self.cache_path, cache, shared=False)
+            return cache
+
+    def render(self) -> str:
+        cache = self.refresh()
+        events = cache["events"]
+        lines: list[str] = []
+
+        def family(name: str, metric_type: str, help_text: str) -> None:
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.append(f"# HELP {name} {help_text}")
+
+        workers_by_state: dict[str, int] = {}
+        for _signature, (lifecycle_state,) in cache["workers"]["files"].values():
+            workers_by_state[lifecycle_state] = workers_by_state.get(lifecycle_state, 0) + 1
+        family("superturtle_workers", "gauge", "Workers by lifecycle state.")
+        for lifecycle_state, count in sorted(workers_by_state.items()):
+            lines.append(f"superturtle_workers{_labels(lifecycle_state=lifecycle_state)} {count}")
+
+        wakeups_by_category: dict[tuple[str, str], int] = {}
+        for _signature, (category, delivery_state) in cache["wakeups"]["files"].values():
+            if delivery_state in ACTIVE_WAKEUP_STATES:
+                key = (category, delivery_state)
+                wakeups_by_category[key] = wakeups_by_category.get(key, 0) + 1
+        family("superturtle_pending_wakeups", "gauge", "Undelivered wakeups by category.")
+        for (category, delivery_state), count in sorted(wakeups_by_category.items()):
+            lines.append(
+                f"superturtle_pending_wakeups{_labels(category=category, delivery_state=delivery_state)} {count}"
+            )
+
+        family("superturtle_worker_iteration", "gauge", "Latest checkpointed iteration per worker.")
+        for worker_name, iteration in sorted(events["iterations"].items()):
+            lines.append(f"superturtle_worker_iteration{_labels(worker=worker_name)} {iteration}")
+
+        family("superturtle_checkpoints", "counter", "Checkpoint events per worker.")
+        for worker_name, count in sorted(events["checkpoints"].items()):
+            lines.append(f"superturtle_checkpoints_total{_labels(worker=worker_name)} {count}")
+
+        family("superturtle_agent_retries", "counter", "Agent retries folded into checkpoints per loop type.")
+        for loop_type, count in sorted(events["retries"].items()):
+            lines.append(f"superturtle_agent_retries_total{_labels(loop_type=loop_type)} {count}")
+
+        family("superturtle_phase_duration_seconds", "histogram", "Loop phase latency.")
+        for loop_type, phases in sorted(events["phase_histograms"].items()):
+            for phase, histogram in sorted(phases.items()):
+                for bound, count in zip(PHASE_LATENCY_BUCKETS, histogram["buckets"]):
+                    lines.append(
+                        "superturtle_phase_duration_seconds_bucket"
+                        f"{_labels(loop_type=loop_type, phase=phase, le=_format_number(bound))} {count}"
+                    )
+                lines.append(
+                    "superturtle_phase_duration_seconds_bucket"
+                    f"{_labels(loop_type=loop_type, phase=phase, le='+Inf')} {histogram['count']}"
+                )
+                lines.append(
+                    "superturtle_phase_duration_seconds_sum"
+                    f"{_labels(loop_type=loop_type, phase=phase)} {_format_number(histogram['sum'])}"
+                )
+                lines.append(
+                    "superturtle_phase_duration_seconds_count"
+                    f"{_labels(loop_type=loop_type, phase=phase)} {histogram['count']}"
+                )
+
+        family("superturtle_events", "counter", "Conductor events by type.")
+        for event_type, count in sorted(events["by_type"].items()):
+            lines.append(f"superturtle_events_total{_labels(event_type=event_type)} {count}")
+
+        family("superturtle_event_log_bytes", "gauge", "Size of events.jsonl.")
+        lines.append(f"superturtle_event_log_bytes {self.conductor.paths.events_jsonl_file.stat().st_size}")
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def render_metrics(state_dir: str | Path) -> str:
+    return MetricsAggregate(state_dir).render()
+
+
+def make_metrics_server(
+    state_dir: str | Path,
+    *,
+    host: str = DEFAULT_METRICS_HOST,
+    port: int = DEFAULT_METRICS_PORT,
+) -> ThreadingHTTPServer:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    aggregate = MetricsAggregate(state_dir)
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = aggregate.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            return
+
+    return ThreadingHTTPServer((host, port), MetricsHandler)
+
+
+def serve_metrics(
+    state_dir: str | Path,
+    *,
+    host: str = DEFAULT_METRICS_HOST,
+    port: int = DEFAULT_METRICS_PORT,
+) -> None:
+    server = make_metrics_server(state_dir, host=host, port=port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+__all__ = [
+    "DEFAULT_METRICS_HOST",
+    "DEFAULT_METRICS_PORT",
+    "METRICS_CACHE_FILENAME",
+    "OPENMETRICS_CONTENT_TYPE",
+    "PHASE_LATENCY_BUCKETS",
+    "MetricsAggregate",
+    "make_metrics_server",
+    "render_metrics",
+    "serve_metrics",
+]
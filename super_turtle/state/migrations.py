@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Mapping
+
+RECORD_KINDS = frozenset({"worker_state", "wakeup", "worker_event"})
+
+Migration = Callable[[dict[str, Any]], dict[str, Any]]
+
+
+class MigrationRegistry:
+    """Single-step upgraders per record kind, keyed by the version they read.
+
+    A migration registered for ``(kind, n)`` takes a version ``n`` record and
+    returns its version ``n + 1`` form; ``upgrade`` chains steps up to the
+    target. Records newer than the target are returned untouched so an older
+    reader never downgrades what a newer writer produced.
+    """
+
+    def __init__(self) -> None:
+        self._steps: dict[tuple[str, int], Migration] = {}
+
+    def register(self, kind: str, from_version: int) -> Callable[[Migration], Migration]:
+        if kind not in RECORD_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(sorted(RECORD_KINDS))}")
+
+        def decorator(migration: Migration) -> Migration:
+            key = (kind, from_version)
+            if key in self._steps:
+                raise ValueError(f"migration for {kind} v{from_version} is already registered")
+            self._steps[key] = migration
+            return migration
+
+        return decorator
+
+    def unregister(self, kind: str, from_version: int) -> None:
+        self._steps.pop((kind, from_version), None)
+
+    def needs_upgrade(self, record: Mapping[str, Any], target_version: int) -> bool:
+        return record_version(record) < target_version
+
+    def upgrade(
+        self,
+        record: Mapping[str, Any],
+        kind: str,
+        target_version: int,
+    ) -> dict[str, Any]:
+        upgraded = dict(record)
+        version = record_version(upgraded)
+        while version < target_version:
+            migration = self._steps.get((kind, version))
+            if migration is None:
+                raise ValueError(f"no migration registered for {kind} v{version}")
+            upgraded = migration(upgraded)
+            version += 1
+            upgraded["schema_version"] = version
+        return upgraded
+
+
+def record_version(record: Mapping[str, Any]) -> int:
+    # Records written before versioning was enforced count as version 1.
+    version = record.get("schema_version")
+    return version if isinstance(version, int) and version > 0 else 1
+
+
+MIGRATIONS = MigrationRegistry()
+
+
+__all__ = [
+    "MIGRATIONS",
+    "RECORD_KINDS",
+    "Migration",
+    "MigrationRegistry",
+    "record_version",
+]
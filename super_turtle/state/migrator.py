@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Any, Callable, Mapping
+
+try:
+    from super_turtle.state.conductor_state import (
+        CONDUCTOR_SCHEMA_VERSION,
+        ConductorStateStore,
+        _atomic_write_json,
+        _exclusive_lock,
+        _load_record,
+        _upgrade_record,
+    )
+except ModuleNotFoundError:
+    from state.conductor_state import (
+        CONDUCTOR_SCHEMA_VERSION,
+        ConductorStateStore,
+        _atomic_write_json,
+        _exclusive_lock,
+        _load_record,
+        _upgrade_record,
+    )
+
+MIGRATION_PROGRESS_FILENAME = "migration_progress.json"
+DEFAULT_CHUNK_SIZE = 200
+
+
+def _sources(conductor: ConductorStateStore) -> dict[str, tuple[str, Path]]:
+    # events.jsonl is not rewritten: it is append-only, shared with writers
+    # that take no lock, and iter_events already upgrades lines as it reads.
+    return {
+        "workers": ("worker_state", conductor.paths.workers_dir),
+        "wakeups": ("wakeup", conductor.paths.wakeups_dir),
+        "archived_wakeups": ("wakeup", conductor.paths.wakeups_archive_dir),
+    }
+
+
+def _empty_progress() -> dict[str, Any]:
+    return {"schema_version": CONDUCTOR_SCHEMA_VERSION, "completed": False, "sources": {}}
+
+
+def _migrate_file(conductor: ConductorStateStore, kind: str, path: Path) -> bool:
+    lock_path = (
+        conductor.worker_lock_path(path.stem)
+        if kind == "worker_state"
+        else conductor.paths.wakeup_queue_dir / ".lock"
+    )
+    with _exclusive_lock(lock_path):
+        try:
+            loaded = _load_record(path)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(loaded, dict):
+            return False
+        upgraded = _upgrade_record(loaded, kind)
+        if upgraded is loaded:
+            return False
+        _atomic_write_json(path, upgraded)
+        return True
+
+
+def migrate_records(
+    state_dir: str | Path,
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_chunks: int | None = None,
+    pause_seconds: float = 0.0,
+    on_progress: Callable[[Mapping[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """Rewrite stored records in the current schema, a chunk at a time.
+
+    Progress is persisted after every chunk, so an interrupted or
+    ``max_chunks``-bounded run resumes where it stopped. Readers upgrade
+    lazily in the meantime, so this never has to finish before startup.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    conductor = ConductorStateStore(state_dir)
+    progress_path = conductor.paths.base_dir / MIGRATION_PROGRESS_FILENAME
+    try:
+        progress = _load_record(progress_path)
+    except (OSError, ValueError):
+        progress = None
+    if (
+        not isinstance(progress, dict)
+        or progress.get("completed")
+        or progress.get("schema_version") != CONDUCTOR_SCHEMA_VERSION
+    ):
+        progress = _empty_progress()
+
+    chunks = 0
+    for source, (kind, directory) in _sources(conductor).items():
+        state = progress["sources"].setdefault(
+            source, {"after": None, "scanned": 0, "migrated": 0, "done": False}
+        )
+        if state["done"]:
+            continue
+        names = sorted(path.name for path in directory.glob("*.json"))
+        if state["after"] is not None:
+            names = [name for name in names if name > state["after"]]
+        for start in range(0, len(names), chunk_size):
+            if max_chunks is not None and chunks >= max_chunks:
+                return progress
+            chunk = names[start : start + chunk_size]
+            for name in chunk:
+                if _migrate_file(conductor, kind, directory / name):
+                    state["migrated"] += 1
+            state["scanned"] += len(chunk)
+            state["after"] = chunk[-1]
+            chunks += 1
+            _atomic_write_json(progress_path, progress, shared=False)
+            if on_progress is not None:
+                on_progress({"source": source, **state})
+            if pause_seconds > 0:
+                time.sleep(pause_seconds)
+        state["done"] = True
+
+    progress["completed"] = True
+    _atomic_write_json(progress_path, progress, shared=False)
+    return progress
+
+
+__all__ = [
+    "DEFAULT_CHUNK_SIZE",
+    "MIGRATION_PROGRESS_FILENAME",
+    "migrate_records",
+]
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Any, Mapping
+
+try:
+    from super_turtle.state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _load_record,
+        _utc_now_iso,
+    )
+except ModuleNotFoundError:
+    from state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _load_record,
+        _utc_now_iso,
+    )
+
+PROJECTIONS_DIRNAME = "projections"
+WORKER_PROJECTION_FILENAME = "workers.json"
+PROJECTION_VERSION = 1
+# Fields every writer keeps in step with the event it appends; these are the
+# ones the consistency check compares against stored worker state.
+CHECKED_FIELDS = ("run_id", "lifecycle_state", "last_event_id", "last_event_at")
+TERMINAL_LIFECYCLE_STATES = frozenset({"completed", "failed", "timed_out", "stopped", "archived"})
+_RUN_SCOPED_FIELDS = ("stop_reason", "completion_requested_at", "terminal_at", "checkpoint", "last_error")
+
+
+def _empty_snapshot() -> dict[str, Any]:
+    return {"version": PROJECTION_VERSION, "inode": None, "offset": 0, "workers": {}}
+
+
+def _empty_projection(worker_name: str) -> dict[str, Any]:
+    return {
+        "worker_name": worker_name,
+        "run_id": None,
+        "lifecycle_state": None,
+        "last_event_id": None,
+        "last_event_at": None,
+        "event_count": 0,
+        **{field: None for field in _RUN_SCOPED_FIELDS},
+    }
+
+
+def fold_event(workers: dict[str, dict[str, Any]], event: Mapping[str, Any]) -> None:
+    worker_name = event.get("worker_name")
+    if not isinstance(worker_name, str) or not worker_name:
+        return
+    projected = workers.setdefault(worker_name, _empty_projection(worker_name))
+    event_type = event.get("event_type")
+    timestamp = event.get("timestamp")
+    payload = event.get("payload") if isinstance(event.get("payload"), Mapping) else {}
+
+    run_id = event.get("run_id")
+    if run_id and run_id != projected["run_id"]:
+        # Worker names are reused across spawns; a new run starts clean.
+        for field in _RUN_SCOPED_FIELDS:
+            projected[field] = None
+        projected["run_id"] = run_id
+
+    lifecycle_state = event.get("lifecycle_state")
+    if isinstance(lifecycle_state, str) and lifecycle_state:
+        projected["lifecycle_state"] = lifecycle_state
+        if lifecycle_state in TERMINAL_LIFECYCLE_STATES and projected["terminal_at"] is None:
+            projected["terminal_at"] = timestamp
+
+    if event_type == "worker.checkpoint":
+        projected["checkpoint"] = {key: value for key, value in payload.items() if key != "kind"}
+    elif event_type == "worker.completion_requested":
+        projected["completion_requested_at"] = timestamp
+        projected["stop_reason"] = "completed"
+    elif event_type == "worker.completed":
+        projected["stop_reason"] = "completed"
+    elif event_type == "worker.fatal_error":
+        projected["stop_reason"] = "fatal_error"
+        projected["last_error"] = {**payload, "recorded_at": timestamp}
+    elif event_type == "worker.stopped" and payload.get("reason"):
+        projected["stop_reason"] = payload["reason"]
+
+    projected["last_event_id"] = event.get("id")
+    projected["last_event_at"] = timestamp
+    projected["event_count"] += 1
+
+
+class WorkerProjection:
+    """Worker state derived by folding ``events.jsonl``.
+
+    The fold is snapshotted together with the byte offset it reached, so a
+    rebuild after a crash only replays the tail of the log. A full replay is
+    needed only when the log is replaced or the projection version changes.
+    """
+
+    def __init__(self, state_dir: str | Path):
+        self.conductor = ConductorStateStore(state_dir)
+        self.snapshot_path = (
+            self.conductor.paths.base_dir / PROJECTIONS_DIRNAME / WORKER_PROJECTION_FILENAME
+        )
+        self._lock = threading.Lock()
+
+    def _load_snapshot(self) -> dict[str, Any]:
+        try:
+            loaded = _load_record(self.snapshot_path)
+        except (OSError, ValueError):
+            return _empty_snapshot()
+        if not isinstance(loaded, dict) or loaded.get("version") != PROJECTION_VERSION:
+            return _empty_snapshot()
+        return loaded
+
+    def catch_up(self, *, full: bool = False) -> dict[str, Any]:
+        with self._lock:
+            snapshot = _empty_snapshot() if full else self._load_snapshot()
+            stat_result = self.conductor.paths.events_jsonl_file.stat()
+            if snapshot["inode"] != stat_result.st_ino or snapshot["offset"] > stat_result.st_size:
+                snapshot = _empty_snapshot()
+                snapshot["inode"] = stat_result.st_ino
+
+            start_offset = snapshot["offset"]
+            folded = 0
+            for offset, event in self.conductor.iter_events(start_offset):
+                fold_event(snapshot["workers"], event)
+                snapshot["offset"] = offset
+                folded += 1
+            if folded or full or not self.snapshot_path.exists():
+                _atomic_write_json(self.snapshot_path, snapshot, shared=False)
+            return {
+                "start_offset": start_offset,
+                "offset": snapshot["offset"],
+                "events_folded": folded,
+                "workers": snapshot["workers"],
+            }
+
+    def project(self) -> dict[str, dict[str, Any]]:
+        return self.catch_up()["workers"]
+
+    def check_consistency(self) -> list[dict[str, Any]]:
+        projected_workers = self.project()
+        stored_workers = {
+            state["worker_name"]: state
+            for state in self.conductor.list_worker_states()
+            if isinstance(state.get("worker_name"), str)
+        }
+        differences: list[dict[str, Any]] = []
+        for worker_name in sorted(set(projected_workers) | set(stored_workers)):
+            projected = projected_workers.get(worker_name)
+            stored = stored_workers.get(worker_name)
+            if stored is None:
+                # Archived workers are removed from workers/ by GC on purpose.
+                if projected is not None and projected["lifecycle_state"] not in {None, "archived"}:
+                    differences.append(
+                        {"worker_name": worker_name, "field": None, "projected": projected, "stored": None}
+                    )
+                continue
+            if projected is None:
+                if stored.get("last_event_id"):
+                    differences.append(
+                        {"worker_name": worker_name, "field": None, "projected": None, "stored": stored}
+                    )
+                continue
+            for field in CHECKED_FIELDS:
+                if projected[field] is not None and projected[field] != stored.get(field):
+                    differences.append(
+                        {
+                            "worker_name": worker_name,
+                            "field": field,
+                            "projected": projected[field],
+                            "stored": stored.get(field),
+                        }
+                    )
+        return differences
+
+    def repair(self, differences: list[dict[str, Any]]) -> list[str]:
+        projected_workers = self.project()
+        repaired: list[str] = []
+        for worker_name in sorted({difference["worker_name"] for difference in differences}):
+            projected = projected_workers.get(worker_name)
+            if projected is None or projected["lifecycle_state"] is None:
+                continue
+
+            def build_state(existing: dict[str, Any], projected: Mapping[str, Any] = projected) -> dict[str, Any]:
+                if not existing:
+                    return self.conductor.make_worker_state(
+                        worker_name=projected["worker_name"],
+                        lifecycle_state=projected["lifecycle_state"],
+                        updated_by="system",
+                        run_id=projected["run_id"],
+                        stop_reason=projected["stop_reason"],
+                        completion_requested_at=projected["completion_requested_at"],
+                        terminal_at=projected["terminal_at"],
+                        last_event_id=projected["last_event_id"],
+                        last_event_at=projected["last_event_at"],
+                        checkpoint=projected["checkpoint"],
+                    )
+                state = dict(existing)
+                for field in CHECKED_FIELDS:
+                    if projected[field] is not None:
+                        state[field] = projected[field]
+                state["updated_at"] = _utc_now_iso()
+                state["updated_by"] = "system"
+                return state
+
+            self.conductor.update_worker_state(worker_name, build_state)
+            repaired.append(worker_name)
+        return repaired
+
+
+def rebuild_projections(state_dir: str | Path, *, full: bool = False) -> dict[str, Any]:
+    return WorkerProjection(state_dir).catch_up(full=full)
+
+
+def check_projections(state_dir: str | Path, *, repair: bool = False) -> dict[str, Any]:
+    projection = WorkerProjection(state_dir)
+    differences = projection.check_consistency()
+    repaired = projection.repair(differences) if repair and differences else []
+    return {"consistent": not differences, "differences": differences, "repaired": repaired}
+
+
+__all__ = [
+    "CHECKED_FIELDS",
+    "PROJECTIONS_DIRNAME",
+    "WorkerProjection",
+    "check_projections",
+    "fold_event",
+    "rebuild_projections",
+]
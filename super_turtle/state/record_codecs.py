@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+import time
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+STATE_CODEC_ENV = "SUPERTURTLE_STATE_CODEC"
+DEFAULT_CODEC = "pretty"
+# Framed records: magic, big-endian body length, tagged body. The magic
+# starts with a NUL byte, which can never begin a JSON document, and ends
+# with the format version; bump it whenever the body layout changes.
+BINARY_MAGIC = b"\x00STB2"
+_BINARY_HEADER = struct.Struct(">I")
+# Body layout: one tag byte per value, then a fixed-width big-endian payload
+# (int64, float64) or a uint32 length/count followed by UTF-8 bytes, list
+# items, or key/value pairs. Only JSON's value types are representable.
+_LENGTH = struct.Struct(">I")
+_INT64 = struct.Struct(">q")
+_FLOAT64 = struct.Struct(">d")
+_INT64_RANGE = range(-(1 << 63), 1 << 63)
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    encode: Callable[[Mapping[str, Any]], bytes]
+    # Files the TypeScript bot and shell helpers also read must stay JSON.
+    is_text: bool
+
+
+def _encode_pretty(payload: Mapping[str, Any]) -> bytes:
+    return (json.dumps(dict(payload), indent=2, sort_keys=True) + "\n").encode("utf-8")
+
+
+def _encode_compact(payload: Mapping[str, Any]) -> bytes:
+    return (json.dumps(dict(payload), separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _encode_value(value: Any, out: list[bytes]) -> None:
+    if value is None:
+        out.append(b"N")
+    elif value is True:
+        out.append(b"T")
+    elif value is False:
+        out.append(b"F")
+    elif isinstance(value, int):
+        if value in _INT64_RANGE:
+            out.append(b"i" + _INT64.pack(value))
+        else:
+            digits = str(value).encode("ascii")
+            out.append(b"I" + _LENGTH.pack(len(digits)) + digits)
+    elif isinstance(value, float):
+        out.append(b"d" + _FLOAT64.pack(value))
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        out.append(b"s" + _LENGTH.pack(len(encoded)) + encoded)
+    elif isinstance(value, (list, tuple)):
+        out.append(b"l" + _LENGTH.pack(len(value)))
+        for item in value:
+            _encode_value(item, out)
+    elif isinstance(value, Mapping):
+        out.append(b"m" + _LENGTH.pack(len(value)))
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"binary record keys must be str, not {type(key).__name__}")
+            encoded = key.encode("utf-8")
+            out.append(_LENGTH.pack(len(encoded)) + encoded)
+            _encode_value(item, out)
+    else:
+        raise TypeError(f"{type(value).__name__} is not representable in a binary record")
+
+
+def _read_bytes(data: bytes, offset: int) -> tuple[bytes, int]:
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    raw = data[offset : offset + length]
+    if len(raw) != length:
+        raise ValueError("truncated binary record")
+    return raw, offset + length
+
+
+def _decode_value(data: bytes, offset: int) -> tuple[Any, int]:
+    tag = data[offset : offset + 1]
+    offset += 1
+    if tag == b"N":
+        return None, offset
+    if tag == b"T":
+        return True, offset
+    if tag == b"F":
+        return False, offset
+    if tag == b"i":
+        return _INT64.unpack_from(data, offset)[0], offset + _INT64.size
+    if tag == b"d":
+        return _FLOAT64.unpack_from(data, offset)[0], offset + _FLOAT64.size
+    if tag == b"s":
+        raw, offset = _read_bytes(data, offset)
+        return raw.decode("utf-8"), offset
+    if tag == b"I":
+        raw, offset = _read_bytes(data, offset)
+        return int(raw), offset
+    if tag == b"l":
+        (count,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        items = []
+        for _ in range(count):
+            item, offset = _decode_value(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == b"m":
+        (count,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        mapping = {}
+        for _ in range(count):
+            key, offset = _read_bytes(data, offset)
+            value, offset = _decode_value(data, offset)
+            mapping[key.decode("utf-8")] = value
+        return mapping, offset
+    raise ValueError(f"unknown binary record tag {tag!r}")
+
+
+def _encode_binary(payload: Mapping[str, Any]) -> bytes:
+    out: list[bytes] = []
+    _encode_value(payload, out)
+    body = b"".join(out)
+    return BINARY_MAGIC + _BINARY_HEADER.pack(len(body)) + body
+
+
+CODECS: dict[str, Codec] = {
+    "pretty": Codec("pretty", _encode_pretty, is_text=True),
+    "compact": Codec("compact", _encode_compact, is_text=True),
+    "binary": Codec("binary", _encode_binary, is_text=False),
+}
+
+
+def get_codec(name: str | None = None, *, shared: bool = False) -> Codec:
+    name = (name or os.environ.get(STATE_CODEC_ENV, "") or DEFAULT_CODEC).strip().lower()
+    codec = CODECS.get(name)
+    if codec is None:
+        raise ValueError(f"{STATE_CODEC_ENV} must be one of: {', '.join(sorted(CODECS))}")
+    if shared and not codec.is_text:
+        return CODECS["compact"]
+    return codec
+
+
+def encode_record(payload: Mapping[str, Any], codec: Codec | None = None) -> bytes:
+    return (codec or get_codec()).encode(payload)
+
+
+def decode_record(data: bytes) -> Any:
+    # Auto-detects the codec, so readers never need to know the writer's.
+    # Other framing versions (or NUL-led garbage) fail to parse as JSON and
+    # raise ValueError, which private-cache readers treat as a miss.
+    if not data.startswith(BINARY_MAGIC):
+        return json.loads(data)
+    header_end = len(BINARY_MAGIC) + _BINARY_HEADER.size
+    try:
+        (length,) = _BINARY_HEADER.unpack_from(data, len(BINARY_MAGIC))
+        body = data[header_end:]
+        if len(body) != length:
+            raise ValueError("truncated binary record")
+        value, offset = _decode_value(body, 0)
+    except (UnicodeDecodeError, struct.error) as error:
+        raise ValueError(f"malformed binary record: {error}") from None
+    if offset != length:
+        raise ValueError("malformed binary record: trailing bytes")
+    return value
+
+
+def encode_event_line(entry: Mapping[str, Any], codec: Codec | None = None) -> str:
+    # events.jsonl is newline-delimited and appended to by other writers, so
+    # every codec keeps it JSON; only the compact codec drops key sorting.
+    codec = codec or get_codec(shared=True)
+    if codec.name == "pretty":
+        return json.dumps(dict(entry), sort_keys=True) + "\n"
+    return json.dumps(dict(entry), separators=(",", ":")) + "\n"
+
+
+def benchmark_codecs(
+    records: list[Mapping[str, Any]],
+    *,
+    iterations: int = 200,
+) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    for name, codec in CODECS.items():
+        started_at = time.perf_counter()
+        for _ in range(iterations):
+            encoded = [codec.encode(record) for record in records]
+        encode_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        for _ in range(iterations):
+            for blob in encoded:
+                decode_record(blob)
+        decode_seconds = time.perf_counter() - started_at
+
+        operations = iterations * len(records)
+        results[name] = {
+            "encode_us_per_record": round(encode_seconds / operations * 1e6, 3),
+            "decode_us_per_record": round(decode_seconds / operations * 1e6, 3),
+            "bytes_per_record": round(sum(len(blob) for blob in encoded) / len(records), 1),
+        }
+    return results
+
+
+__all__ = [
+    "BINARY_MAGIC",
+    "CODECS",
+    "DEFAULT_CODEC",
+    "STATE_CODEC_ENV",
+    "Codec",
+    "benchmark_codecs",
+    "decode_record",
+    "encode_event_line",
+    "encode_record",
+    "get_codec",
+]
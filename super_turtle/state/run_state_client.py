@@ -0,0 +1,91 @@
+"""Thin client for a ``run_state_writer.py daemon``.
+
+Takes the same arguments as ``run_state_writer.py``. While a daemon serves the
+state dir, the command runs there and skips interpreter and import startup;
+otherwise this process execs ``run_state_writer.py`` with the same arguments.
+Commands run with the daemon's environment and working directory, fixed when
+it started (``SUPERTURTLE_HANDOFF_REFRESH_INTERVAL_SECONDS`` included), so
+pass absolute paths. Keep imports here to a few small stdlib modules.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+
+DAEMON_SOCKET_FILENAME = "run_state_writer.sock"
+DEFAULT_STATE_DIR = "super_turtle/state"
+WRITER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_state_writer.py")
+
+
+def split_state_dir(argv: list[str]) -> tuple[str, list[str]]:
+    """Split the leading ``--state-dir`` option from the command arguments."""
+    state_dir = DEFAULT_STATE_DIR
+    rest = list(argv)
+    while rest and rest[0].startswith("--state-dir"):
+        option = rest.pop(0)
+        if "=" in option:
+            state_dir = option.split("=", 1)[1]
+        elif rest:
+            state_dir = rest.pop(0)
+    return state_dir, rest
+
+
+class DaemonReplyError(RuntimeError):
+    """The request reached the daemon but no usable reply came back."""
+
+
+def request(socket_path: str, argv: list[str]) -> dict | None:
+    """Run ``argv`` in the daemon; returns None when no daemon accepts it.
+
+    That covers no daemon listening and a stale socket file. Once the request
+    is sent the daemon may have applied it, so a dropped or garbled reply
+    raises DaemonReplyError instead of inviting a retry.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    chunks = []
+    try:
+        try:
+            client.connect(socket_path)
+        except OSError:
+            return None
+        try:
+            client.sendall((json.dumps({"argv": argv}) + "\n").encode("utf-8"))
+            client.shutdown(socket.SHUT_WR)
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except OSError as error:
+            raise DaemonReplyError(f"lost the daemon connection: {error}") from error
+    finally:
+        client.close()
+    try:
+        response = json.loads(b"".join(chunks))
+    except ValueError:
+        response = None
+    if not isinstance(response, dict) or not {"exit_code", "stdout", "stderr"} <= response.keys():
+        raise DaemonReplyError("the daemon sent no usable reply")
+    return response
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    state_dir, command_argv = split_state_dir(argv)
+    try:
+        response = request(os.path.join(state_dir, DAEMON_SOCKET_FILENAME), command_argv)
+    except DaemonReplyError as error:
+        sys.stderr.write(f"run_state_client: {error}; the command may have been applied\n")
+        return 1
+    if response is None:
+        os.execv(sys.executable, [sys.executable, WRITER_PATH, *argv])
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["exit_code"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
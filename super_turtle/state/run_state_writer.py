@@ -1,21 +1,51 @@
 from __future__ import annotations
 
 import argparse
+import importlib
+import io
 import json
+import math
+import os
+import subprocess
 import sys
 import tempfile
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Mapping, Sequence
+from typing import Any, Iterable, Mapping, Sequence, TextIO
 
 if __package__ in {None, ""}:
     sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 try:
-    from super_turtle.state.conductor_state import ConductorStateStore
+    from super_turtle.state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _exclusive_lock,
+        _load_record,
+    )
+    from super_turtle.state.workspace_cache import WorkspaceLivenessCache
 except ModuleNotFoundError:
-    from state.conductor_state import ConductorStateStore
-
+    from state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _exclusive_lock,
+        _load_record,
+    )
+    from state.workspace_cache import WorkspaceLivenessCache
+
+DAEMON_SOCKET_FILENAME = "run_state_writer.sock"
+# Commands that own the process (stdin, a server loop or a timed wait) and so
+# cannot run as a daemon request or batch entry.
+IN_PROCESS_EXCLUDED_COMMANDS = frozenset({"batch", "daemon", "flush-handoff"})
+# Writers bump a generation counter in the stamp file and one refresher
+# renders every generation seen so far; with a positive interval, renders are
+# also spaced at least that far apart and a deferred render is picked up by a
+# detached ``flush-handoff`` process once the interval has elapsed.
+HANDOFF_REFRESH_INTERVAL_ENV = "SUPERTURTLE_HANDOFF_REFRESH_INTERVAL_SECONDS"
+HANDOFF_REFRESH_STAMP_FILENAME = "handoff_refresh.json"
 DEFAULT_HANDOFF_NOTE = "Rendered from canonical conductor state."
 WORKSPACE_FILTER_HANDOFF_NOTE = "Workers without live workspaces are omitted from active sections."
 ACTIVE_WORKER_STATES = frozenset(
@@ -33,6 +63,15 @@ def _utc_now_iso() -> str:
     )
 
 
+def _state_module(name: str) -> Any:
+    # Commands outside the hot put-worker/event/wakeup path import their
+    # modules on first use, keeping one-shot CLI startup short.
+    try:
+        return importlib.import_module(f"super_turtle.state.{name}")
+    except ModuleNotFoundError:
+        return importlib.import_module(f"state.{name}")
+
+
 def render_handoff(
     *,
     updated_at: str,
@@ -144,20 +183,16 @@ def _sort_newest(records: Sequence[Mapping[str, Any]], *timestamp_keys: str) ->
     return sorted((dict(record) for record in records), key=sort_key, reverse=True)
 
 
-def _workspace_exists(state: Mapping[str, Any]) -> bool:
-    workspace = _string_value(state.get("workspace"))
-    if not workspace:
-        return False
-    return Path(workspace).exists()
-
-
-def _worker_has_live_workspace(
-    conductor: ConductorStateStore, worker_name: str | None
-) -> bool:
-    if not worker_name:
-        return False
-    state = conductor.load_worker_state(worker_name) or {}
-    return _workspace_exists(state)
+def _live_workspaces_by_worker(
+    state_dir: str | Path, worker_states: Sequence[Mapping[str, Any]]
+) -> dict[str, bool]:
+    workspaces = {
+        worker_name: workspace
+        for state in worker_states
+        if (worker_name := _string_value(state.get("worker_name")))
+        and (workspace := _string_value(state.get("workspace")))
+    }
+    return WorkspaceLivenessCache(state_dir).live_workspaces(workspaces)
 
 
 def _format_checkpoint(checkpoint: Mapping[str, Any]) -> str | None:
@@ -239,19 +274,20 @@ def _state_should_render_recent_update(state: Mapping[str, Any]) -> bool:
     return resolved_terminal_state in RECENT_UPDATE_STATES
 
 
-def refresh_handoff_from_conductor(
+def _render_handoff_from_conductor(
     state_dir: str | Path,
     *,
     notes: Sequence[str] | None = None,
     updated_at: str | None = None,
 ) -> str:
-    writer = RunStateWriter(state_dir)
     conductor = ConductorStateStore(state_dir)
 
+    all_worker_states = conductor.list_worker_states()
+    live_by_worker = _live_workspaces_by_worker(state_dir, all_worker_states)
     worker_states = [
         state
-        for state in conductor.list_worker_states()
-        if _workspace_exists(state)
+        for state in all_worker_states
+        if live_by_worker.get(_string_value(state.get("worker_name")) or "", False)
     ]
     active_workers = [
         _format_active_worker(state)
@@ -272,26 +308,336 @@ def refresh_handoff_from_conductor(
                 if _string_value(wakeup.get("delivery_state"))
                 in {"pending", "processing"}
                 if _string_value(wakeup.get("category")) != "silent"
-                and _worker_has_live_workspace(
-                    conductor, _string_value(wakeup.get("worker_name"))
-                )
+                and live_by_worker.get(_string_value(wakeup.get("worker_name")) or "", False)
             ],
             "created_at",
             "updated_at",
         )
     ][:8]
 
-    content = render_conductor_handoff(
+    return render_conductor_handoff(
         updated_at=updated_at or _utc_now_iso(),
         active_workers=active_workers,
         pending_wakeups=pending_wakeups,
         recent_updates=recent_updates,
         notes=notes,
     )
+
+
+def handoff_refresh_interval_from_env() -> float:
+    raw = os.environ.get(HANDOFF_REFRESH_INTERVAL_ENV, "").strip()
+    if not raw:
+        return 0.0
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        return 0.0
+
+
+def _handoff_lock_paths(state_dir: Path) -> tuple[Path, Path]:
+    # (stamp lock, refresh lock): bumping the generation never waits on a render.
+    return state_dir / ".handoff_stamp.lock", state_dir / ".handoff_refresh.lock"
+
+
+def _load_refresh_stamp(state_dir: Path) -> dict[str, Any]:
+    try:
+        stamp = _load_record(state_dir / HANDOFF_REFRESH_STAMP_FILENAME)
+    except (OSError, ValueError):
+        return {}
+    return stamp if isinstance(stamp, dict) else {}
+
+
+def _update_refresh_stamp(state_dir: Path, **fields: Any) -> dict[str, Any]:
+    stamp_lock, _refresh_lock = _handoff_lock_paths(state_dir)
+    with _exclusive_lock(stamp_lock):
+        stamp = _load_refresh_stamp(state_dir)
+        if "generation" in fields:
+            fields["generation"] = stamp.get("generation", 0) + fields["generation"]
+        if "rendered_generation" in fields:
+            fields["rendered_generation"] = max(
+                stamp.get("rendered_generation", 0), fields["rendered_generation"]
+            )
+        stamp.update(fields)
+        _atomic_write_json(state_dir / HANDOFF_REFRESH_STAMP_FILENAME, stamp, shared=False)
+    return stamp
+
+
+def _write_handoff_locked(
+    state_dir: Path,
+    *,
+    notes: Sequence[str] | None = None,
+    updated_at: str | None = None,
+) -> str:
+    # Caller holds the refresh lock. The generation is read before conductor
+    # state so writes landing during the render stay dirty.
+    writer = RunStateWriter(state_dir)
+    generation = _load_refresh_stamp(state_dir).get("generation", 0)
+    content = _render_handoff_from_conductor(state_dir, notes=notes, updated_at=updated_at)
     _atomic_write_text(writer.handoff_md_file, content)
+    _update_refresh_stamp(state_dir, rendered_generation=generation, rendered_at=time.time())
     return content
 
 
+def refresh_handoff_from_conductor(
+    state_dir: str | Path,
+    *,
+    notes: Sequence[str] | None = None,
+    updated_at: str | None = None,
+) -> str:
+    """Re-render handoff.md now, serialized with other refreshers."""
+    base_dir = Path(state_dir)
+    _stamp_lock, refresh_lock = _handoff_lock_paths(base_dir)
+    with _exclusive_lock(refresh_lock):
+        return _write_handoff_locked(base_dir, notes=notes, updated_at=updated_at)
+
+
+def _refresh_handoff_if_stale(state_dir: Path, generation: int, interval_seconds: float) -> bool:
+    def settled(stamp: Mapping[str, Any]) -> bool:
+        if stamp.get("rendered_generation", 0) >= generation:
+            return True
+        rendered_at = stamp.get("rendered_at")
+        return (
+            interval_seconds > 0
+            and isinstance(rendered_at, (int, float))
+            and time.time() - rendered_at < interval_seconds
+        )
+
+    if settled(_load_refresh_stamp(state_dir)):
+        return False
+    _stamp_lock, refresh_lock = _handoff_lock_paths(state_dir)
+    with _exclusive_lock(refresh_lock):
+        # The refresher we waited on may already have covered this generation.
+        if settled(_load_refresh_stamp(state_dir)):
+            return False
+        _write_handoff_locked(state_dir)
+    return True
+
+
+def _schedule_trailing_refresh(state_dir: Path, interval_seconds: float) -> float | None:
+    # Spawns one detached flusher per interval window, so the last write of a
+    # burst is rendered even when no later write, daemon or refresh follows.
+    stamp_lock, _refresh_lock = _handoff_lock_paths(state_dir)
+    with _exclusive_lock(stamp_lock):
+        stamp = _load_refresh_stamp(state_dir)
+        rendered_at = stamp.get("rendered_at")
+        if stamp.get("rendered_generation", 0) >= stamp.get("generation", 0) or not isinstance(
+            rendered_at, (int, float)
+        ):
+            return None
+        due_at = rendered_at + interval_seconds
+        if stamp.get("flush_due_at", 0) >= due_at:
+            return None
+        stamp["flush_due_at"] = due_at
+        _atomic_write_json(state_dir / HANDOFF_REFRESH_STAMP_FILENAME, stamp, shared=False)
+    subprocess.Popen(
+        [
+            sys.executable,
+            str(Path(__file__).resolve()),
+            "--state-dir",
+            str(state_dir.resolve()),
+            "flush-handoff",
+            "--at",
+            repr(due_at),
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    return due_at
+
+
+def request_handoff_refresh(
+    state_dir: str | Path, *, interval_seconds: float | None = None
+) -> bool:
+    """Mark handoff.md dirty and re-render it unless another refresher covers it.
+
+    Returns whether this call rendered. Concurrent writers coalesce into the
+    refresher holding the lock; with ``interval_seconds`` (default from
+    ``SUPERTURTLE_HANDOFF_REFRESH_INTERVAL_SECONDS``) renders closer together
+    than the interval are deferred, and a background ``flush-handoff`` renders
+    them once the interval has elapsed.
+    """
+    base_dir = Path(state_dir)
+    ensure_state_files(base_dir)
+    if interval_seconds is None:
+        interval_seconds = handoff_refresh_interval_from_env()
+    generation = _update_refresh_stamp(base_dir, generation=1)["generation"]
+    if _refresh_handoff_if_stale(base_dir, generation, interval_seconds):
+        return True
+    if interval_seconds > 0:
+        _schedule_trailing_refresh(base_dir, interval_seconds)
+    return False
+
+
+def flush_handoff_refresh(state_dir: str | Path) -> bool:
+    """Render a deferred refresh now; returns False when handoff.md is current."""
+    base_dir = Path(state_dir)
+    generation = _load_refresh_stamp(base_dir).get("generation", 0)
+    return _refresh_handoff_if_stale(base_dir, generation, 0.0)
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    # Nearest-rank percentile; callers pass a non-empty, ascending sequence.
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _summarize_durations(values: Sequence[float]) -> dict[str, Any]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50": round(_percentile(ordered, 0.50), 6),
+        "p95": round(_percentile(ordered, 0.95), 6),
+        "max": round(ordered[-1], 6),
+    }
+
+
+def _checkpoint_timing_samples(timings: Mapping[str, Any]) -> dict[str, float]:
+    samples: dict[str, float] = {}
+    for phase, seconds in _mapping_value(timings.get("phases")).items():
+        if isinstance(seconds, (int, float)):
+            samples[str(phase)] = float(seconds)
+    for key, label in (
+        ("total_seconds", "total"),
+        ("retry_sleep_seconds", "retry_sleep"),
+        ("failed_attempt_seconds", "failed_attempts"),
+        ("last_checkpoint_write_seconds", "checkpoint_write"),
+    ):
+        value = timings.get(key)
+        if isinstance(value, (int, float)):
+            samples[label] = float(value)
+    return samples
+
+
+def summarize_checkpoint_timings(
+    state_dir: str | Path,
+    *,
+    worker_name: str | None = None,
+    loop_type: str | None = None,
+) -> dict[str, Any]:
+    conductor = ConductorStateStore(state_dir)
+    overall: dict[str, list[float]] = {}
+    by_loop_type: dict[str, dict[str, list[float]]] = {}
+    by_worker: dict[str, dict[str, list[float]]] = {}
+    retries = 0
+    checkpoints = 0
+
+    for _offset, event in conductor.iter_events():
+        if event.get("event_type") != "worker.checkpoint":
+            continue
+        payload = _mapping_value(event.get("payload"))
+        timings = _mapping_value(payload.get("timings"))
+        if not timings:
+            continue
+        event_worker = _string_value(event.get("worker_name")) or "(unknown)"
+        event_loop_type = _string_value(payload.get("loop_type")) or "(unknown)"
+        if worker_name and event_worker != worker_name:
+            continue
+        if loop_type and event_loop_type != loop_type:
+            continue
+
+        checkpoints += 1
+        if isinstance(timings.get("retries"), int):
+            retries += timings["retries"]
+        for phase, seconds in _checkpoint_timing_samples(timings).items():
+            overall.setdefault(phase, []).append(seconds)
+            by_loop_type.setdefault(event_loop_type, {}).setdefault(phase, []).append(seconds)
+            by_worker.setdefault(event_worker, {}).setdefault(phase, []).append(seconds)
+
+    def summarize(groups: Mapping[str, Sequence[float]]) -> dict[str, Any]:
+        return {phase: _summarize_durations(values) for phase, values in groups.items()}
+
+    return {
+        "checkpoints": checkpoints,
+        "retries": retries,
+        "phases": summarize(overall),
+        "by_loop_type": {key: summarize(groups) for key, groups in by_loop_type.items()},
+        "by_worker": {key: summarize(groups) for key, groups in by_worker.items()},
+    }
+
+
+# Mirrors the subturtle resource meter: peaks combine with max(), the rest sum.
+_PEAK_RESOURCE_KEYS = frozenset({"peak_rss_kb", "cgroup_peak_memory_bytes"})
+RESOURCE_SORT_KEYS = {"cpu": "cpu_seconds", "memory": "peak_memory_kb"}
+
+
+def _merge_resource_totals(total: dict[str, Any], sample: Mapping[str, Any]) -> None:
+    for key, value in sample.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        if key in _PEAK_RESOURCE_KEYS:
+            total[key] = max(total.get(key, 0), value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def _ranked_resource_rows(
+    groups: Mapping[str, dict[str, Any]], label: str, sort_key: str
+) -> list[dict[str, Any]]:
+    rows = []
+    for name, totals in groups.items():
+        row: dict[str, Any] = {label: name}
+        for key, value in totals.items():
+            row[key] = round(value, 3) if isinstance(value, float) else value
+        # memory.peak covers the whole agent tree; wait4's maxrss only its largest process.
+        row["peak_memory_kb"] = max(
+            totals.get("peak_rss_kb", 0), totals.get("cgroup_peak_memory_bytes", 0) // 1024
+        )
+        rows.append(row)
+    rows.sort(key=lambda row: (-row.get(sort_key, 0), row[label]))
+    return rows
+
+
+def summarize_checkpoint_resources(
+    state_dir: str | Path,
+    *,
+    worker_name: str | None = None,
+    loop_type: str | None = None,
+    sort: str = "cpu",
+) -> dict[str, Any]:
+    """Rank workers and loop phases by agent CPU-seconds or peak memory.
+
+    Reads the per-phase ``resources`` blocks that checkpoints carry; ``sort``
+    is ``"cpu"`` or ``"memory"``.
+    """
+    sort_key = RESOURCE_SORT_KEYS[sort]
+    conductor = ConductorStateStore(state_dir)
+    totals: dict[str, Any] = {}
+    by_worker: dict[str, dict[str, Any]] = {}
+    by_phase: dict[str, dict[str, Any]] = {}
+    checkpoints = 0
+
+    for _offset, event in conductor.iter_events():
+        if event.get("event_type") != "worker.checkpoint":
+            continue
+        payload = _mapping_value(event.get("payload"))
+        phases = _mapping_value(_mapping_value(payload.get("resources")).get("phases"))
+        if not phases:
+            continue
+        event_worker = _string_value(event.get("worker_name")) or "(unknown)"
+        event_loop_type = _string_value(payload.get("loop_type")) or "(unknown)"
+        if worker_name and event_worker != worker_name:
+            continue
+        if loop_type and event_loop_type != loop_type:
+            continue
+
+        checkpoints += 1
+        for phase, sample in phases.items():
+            sample = _mapping_value(sample)
+            _merge_resource_totals(totals, sample)
+            _merge_resource_totals(by_worker.setdefault(event_worker, {}), sample)
+            _merge_resource_totals(by_phase.setdefault(str(phase), {}), sample)
+
+    return {
+        "checkpoints": checkpoints,
+        "sort": sort,
+        "totals": _ranked_resource_rows({"all": totals}, "scope", sort_key)[0] if totals else {},
+        "workers": _ranked_resource_rows(by_worker, "worker", sort_key),
+        "phases": _ranked_resource_rows(by_phase, "phase", sort_key),
+    }
+
+
 def _atomic_write_text(path: Path, content: str) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with tempfile.NamedTemporaryFile(
@@ -455,6 +801,17 @@ def _build_parser() -> argparse.ArgumentParser:
         help="Override timestamp string (defaults to current UTC).",
     )
 
+    flush_handoff_parser = subparsers.add_parser(
+        "flush-handoff",
+        help="Render a refresh deferred by the handoff refresh interval.",
+    )
+    flush_handoff_parser.add_argument(
+        "--at",
+        type=float,
+        default=None,
+        help="Wait until this epoch time before flushing.",
+    )
+
     refresh_handoff_parser = subparsers.add_parser(
         "refresh-handoff-from-conductor",
         help="Rewrite handoff.md from canonical worker state and wakeups.",
@@ -594,11 +951,338 @@ def _build_parser() -> argparse.ArgumentParser:
     wakeup_parser.add_argument("--created-at", default=None, help="Creation timestamp.")
     wakeup_parser.add_argument("--updated-at", default=None, help="Update timestamp.")
 
+    claim_parser = subparsers.add_parser(
+        "claim-wakeup",
+        help="Lease the next pending wake-up (prints null when none is pending).",
+    )
+    claim_parser.add_argument("--category", default=None, help="Only claim this category.")
+    claim_parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=None,
+        help="Lease length before the wake-up is requeued (default: 300).",
+    )
+    claim_parser.add_argument("--claimed-by", default=None, help="Consumer name for the lease.")
+
+    ack_parser = subparsers.add_parser(
+        "ack-wakeup",
+        help="Finish a leased wake-up and move it to wakeups/archive/.",
+    )
+    ack_parser.add_argument("--wakeup-id", required=True, help="Claimed wake-up id.")
+    ack_parser.add_argument("--lease-id", required=True, help="Lease id returned by claim.")
+    ack_parser.add_argument(
+        "--delivery-state",
+        choices=["sent", "suppressed"],
+        default="sent",
+        help="Final delivery state.",
+    )
+
+    nack_parser = subparsers.add_parser(
+        "nack-wakeup",
+        help="Give a leased wake-up back to the queue, or mark it failed.",
+    )
+    nack_parser.add_argument("--wakeup-id", required=True, help="Claimed wake-up id.")
+    nack_parser.add_argument("--lease-id", required=True, help="Lease id returned by claim.")
+    nack_parser.add_argument(
+        "--fail",
+        action="store_true",
+        help="Mark the wake-up failed instead of requeueing it.",
+    )
+
+    timings_parser = subparsers.add_parser(
+        "timings",
+        help="Aggregate p50/p95 phase timings from worker.checkpoint events.",
+    )
+    timings_parser.add_argument("--worker-name", default=None, help="Only include this worker.")
+    timings_parser.add_argument("--loop-type", default=None, help="Only include this loop type.")
+
+    usage_parser = subparsers.add_parser(
+        "usage",
+        help="Rank workers and phases by agent CPU-seconds and memory from checkpoints.",
+    )
+    usage_parser.add_argument("--worker-name", default=None, help="Only include this worker.")
+    usage_parser.add_argument("--loop-type", default=None, help="Only include this loop type.")
+    usage_parser.add_argument(
+        "--sort",
+        choices=sorted(RESOURCE_SORT_KEYS),
+        default="cpu",
+        help="Rank by total CPU-seconds or by peak memory.",
+    )
+
+    metrics_parser = subparsers.add_parser(
+        "metrics",
+        help="Print OpenMetrics text for conductor state and loop metrics.",
+    )
+    metrics_parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Serve /metrics over HTTP instead of printing once.",
+    )
+    metrics_parser.add_argument(
+        "--host",
+        default=None,
+        help="HTTP bind host (default: 127.0.0.1).",
+    )
+    metrics_parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="HTTP bind port (default: 9464).",
+    )
+
+    gc_parser = subparsers.add_parser(
+        "gc",
+        help="Move old terminal wakeups and archived workers into compressed archives.",
+    )
+    gc_parser.add_argument(
+        "--retention-hours",
+        type=float,
+        default=None,
+        help="Keep terminal records younger than this many hours (default: 168).",
+    )
+    gc_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would be archived without moving anything.",
+    )
+
+    archive_query_parser = subparsers.add_parser(
+        "archive-query",
+        help="Query records moved into the compressed archive by gc.",
+    )
+    archive_query_parser.add_argument(
+        "--kind",
+        required=True,
+        choices=["wakeups", "workers"],
+        help="Archive to search.",
+    )
+    archive_query_parser.add_argument("--worker-name", default=None, help="Filter by worker name.")
+    archive_query_parser.add_argument("--id", default=None, help="Filter by record id.")
+    archive_query_parser.add_argument(
+        "--delivery-state",
+        default=None,
+        help="Filter wakeups by delivery state.",
+    )
+
+    rebuild_projections_parser = subparsers.add_parser(
+        "rebuild-projections",
+        help="Fold events.jsonl into the worker-state projection snapshot.",
+    )
+    rebuild_projections_parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Replay the whole log instead of catching up from the snapshot offset.",
+    )
+
+    check_projections_parser = subparsers.add_parser(
+        "check-projections",
+        help="Diff projected worker state against stored worker state.",
+    )
+    check_projections_parser.add_argument(
+        "--repair",
+        action="store_true",
+        help="Rewrite diverged fields of stored worker state from the projection.",
+    )
+
+    codec_bench_parser = subparsers.add_parser(
+        "codec-bench",
+        help="Compare record codecs on this state dir's worker and wakeup records.",
+    )
+    codec_bench_parser.add_argument(
+        "--iterations",
+        type=int,
+        default=200,
+        help="Encode/decode passes over the sampled records.",
+    )
+
+    migrate_parser = subparsers.add_parser(
+        "migrate",
+        help="Rewrite worker and wake-up records in the current schema, resumably.",
+    )
+    migrate_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Records rewritten between progress checkpoints (default: 200).",
+    )
+    migrate_parser.add_argument(
+        "--max-chunks",
+        type=int,
+        default=None,
+        help="Stop after this many chunks; the next run resumes.",
+    )
+    migrate_parser.add_argument(
+        "--pause-seconds",
+        type=float,
+        default=0.0,
+        help="Sleep between chunks to keep background runs cheap.",
+    )
+
+    batch_parser = subparsers.add_parser(
+        "batch",
+        help="Apply NDJSON {\"argv\": [...]} commands from stdin, refreshing the handoff once.",
+    )
+    batch_parser.add_argument(
+        "--stop-on-error",
+        action="store_true",
+        help="Skip the remaining commands after the first failure.",
+    )
+
+    daemon_parser = subparsers.add_parser(
+        "daemon",
+        help="Serve commands for this state dir over a UNIX socket (see run_state_client.py).",
+    )
+    daemon_parser.add_argument(
+        "--socket",
+        default=None,
+        help=f"Socket path (default: <state-dir>/{DAEMON_SOCKET_FILENAME}).",
+    )
+
     return parser
 
 
+def _run_captured_command(
+    parser: argparse.ArgumentParser,
+    state_dir: Path,
+    request: Mapping[str, Any],
+    *,
+    refresh_handoff: bool = True,
+) -> dict[str, Any]:
+    # Runs one {"argv": [...]} request in-process for the daemon and batch
+    # modes, capturing what the one-shot CLI would print.
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            argv = request.get("argv")
+            if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+                raise ValueError("request argv must be a list of strings")
+            args = parser.parse_args(["--state-dir", str(state_dir), *argv])
+            if args.command in IN_PROCESS_EXCLUDED_COMMANDS or (
+                args.command == "metrics" and args.serve
+            ):
+                raise ValueError(f"{args.command} cannot run inside another command")
+            exit_code = _run_command(args, refresh_handoff=refresh_handoff)
+        except SystemExit as error:
+            exit_code = error.code if isinstance(error.code, int) else 1
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+    return {"exit_code": exit_code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+
+def run_batch(
+    state_dir: str | Path,
+    lines: Iterable[str],
+    output: TextIO,
+    *,
+    stop_on_error: bool = False,
+) -> int:
+    """Apply NDJSON ``{"argv": [...]}`` commands in order, refreshing the handoff once.
+
+    One result line (``index``, ``exit_code``, ``stdout``, ``stderr``) is
+    written and flushed per command. Returns 0 when every command succeeded.
+    """
+    base_dir = Path(state_dir)
+    parser = _build_parser()
+    failed = False
+    applied = False
+    for index, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as error:
+            result = {"exit_code": 2, "stdout": "", "stderr": f"invalid request: {error}\n"}
+        else:
+            result = _run_captured_command(parser, base_dir, request, refresh_handoff=False)
+        output.write(json.dumps({"index": index, **result}, sort_keys=True) + "\n")
+        output.flush()
+        if result["exit_code"] == 0:
+            applied = True
+        else:
+            failed = True
+            if stop_on_error:
+                break
+    if applied:
+        request_handoff_refresh(base_dir)
+    return 1 if failed else 0
+
+
+def make_state_daemon(state_dir: str | Path, socket_path: str | Path | None = None) -> Any:
+    """Return a UNIX socket server that runs CLI commands against ``state_dir``.
+
+    Each connection sends one JSON line ``{"argv": [<command>, ...]}`` (the
+    CLI arguments after ``--state-dir``) and receives one JSON line with
+    ``exit_code``, ``stdout`` and ``stderr``. Requests are handled one at a
+    time, but one-shot CLI calls may write the same state dir concurrently, so
+    each request builds its stores afresh and takes the usual file locks.
+    Requests run with the daemon's own environment and working directory, so
+    settings such as ``SUPERTURTLE_HANDOFF_REFRESH_INTERVAL_SECONDS`` are fixed
+    when it starts; restart it to change them.
+    """
+    import socket
+    import socketserver
+
+    base_dir = Path(state_dir).resolve()
+    ensure_state_files(base_dir)
+    path = Path(socket_path) if socket_path is not None else base_dir / DAEMON_SOCKET_FILENAME
+    if path.exists():
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+        except OSError:
+            path.unlink()
+        else:
+            raise RuntimeError(f"a run_state_writer daemon is already serving {path}")
+        finally:
+            probe.close()
+    parser = _build_parser()
+
+    class StateRequestHandler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            try:
+                request = json.loads(self.rfile.readline())
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+            except ValueError as error:
+                response = {"exit_code": 2, "stdout": "", "stderr": f"invalid request: {error}\n"}
+            else:
+                response = _run_captured_command(parser, base_dir, request)
+            self.wfile.write((json.dumps(response, sort_keys=True) + "\n").encode("utf-8"))
+
+    class StateDaemonServer(socketserver.UnixStreamServer):
+        def service_actions(self) -> None:
+            # Runs between requests; renders refreshes deferred by the interval.
+            flush_handoff_refresh(base_dir)
+
+    return StateDaemonServer(str(path), StateRequestHandler)
+
+
+def serve_state_daemon(state_dir: str | Path, socket_path: str | Path | None = None) -> None:
+    server = make_state_daemon(state_dir, socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        Path(server.server_address).unlink(missing_ok=True)
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     args = _build_parser().parse_args(argv)
+    if args.command == "daemon":
+        serve_state_daemon(args.state_dir, args.socket)
+        return 0
+    if args.command == "batch":
+        return run_batch(args.state_dir, sys.stdin, sys.stdout, stop_on_error=args.stop_on_error)
+    return _run_command(args)
+
+
+def _run_command(args: argparse.Namespace, *, refresh_handoff: bool = True) -> int:
     writer = RunStateWriter(args.state_dir)
 
     if args.command == "append":
@@ -623,6 +1307,12 @@ def main(argv: Sequence[str] | None = None) -> int:
         print(str(writer.handoff_md_file))
         return 0
 
+    if args.command == "flush-handoff":
+        if args.at is not None:
+            time.sleep(max(args.at - time.time(), 0.0))
+        flush_handoff_refresh(args.state_dir)
+        return 0
+
     if args.command == "refresh-handoff-from-conductor":
         notes = args.note if args.note else None
         writer.refresh_handoff_from_conductor(
@@ -632,98 +1322,213 @@ def main(argv: Sequence[str] | None = None) -> int:
         print(str(writer.handoff_md_file))
         return 0
 
-    conductor = ConductorStateStore(args.state_dir)
+    if args.command == "timings":
+        summary = summarize_checkpoint_timings(
+            args.state_dir,
+            worker_name=args.worker_name,
+            loop_type=args.loop_type,
+        )
+        print(json.dumps(summary, sort_keys=True))
+        return 0
 
-    if args.command == "put-worker":
-        checkpoint = _load_json_object(
-            args.checkpoint_json, arg_name="--checkpoint-json"
+    if args.command == "usage":
+        summary = summarize_checkpoint_resources(
+            args.state_dir,
+            worker_name=args.worker_name,
+            loop_type=args.loop_type,
+            sort=args.sort,
         )
-        metadata = _load_json_object(args.metadata_json, arg_name="--metadata-json")
-        existing = conductor.load_worker_state(args.worker_name) or {}
-        requested_run_id = (
-            _explicit_optional_string(args.run_id)
-            if args.run_id is not None
-            else existing.get("run_id")
+        print(json.dumps(summary, sort_keys=True))
+        return 0
+
+    if args.command == "metrics":
+        metrics = _state_module("metrics")
+        if args.serve:
+            metrics.serve_metrics(
+                args.state_dir,
+                host=metrics.DEFAULT_METRICS_HOST if args.host is None else args.host,
+                port=metrics.DEFAULT_METRICS_PORT if args.port is None else args.port,
+            )
+            return 0
+        sys.stdout.write(metrics.render_metrics(args.state_dir))
+        return 0
+
+    if args.command == "gc":
+        archive = _state_module("archive")
+        retention_seconds = (
+            archive.DEFAULT_RETENTION_SECONDS
+            if args.retention_hours is None
+            else args.retention_hours * 3600
         )
-        existing_run_id = _string_value(existing.get("run_id"))
-        existing_for_defaults = (
-            {}
-            if requested_run_id
-            and existing_run_id
-            and requested_run_id != existing_run_id
-            else existing
+        report = archive.collect_garbage(
+            args.state_dir,
+            retention_seconds=retention_seconds,
+            dry_run=args.dry_run,
         )
-        state = conductor.make_worker_state(
+        if refresh_handoff and not args.dry_run:
+            request_handoff_refresh(args.state_dir)
+        print(json.dumps(report, sort_keys=True))
+        return 0
+
+    if args.command == "archive-query":
+        for record in _state_module("archive").query_archive(
+            args.state_dir,
+            args.kind,
             worker_name=args.worker_name,
-            lifecycle_state=args.lifecycle_state,
-            updated_by=args.updated_by,
-            run_id=requested_run_id,
-            workspace=(
-                args.workspace
-                if args.workspace is not None
-                else existing_for_defaults.get("workspace")
-            ),
-            loop_type=(
-                args.loop_type
-                if args.loop_type is not None
-                else existing_for_defaults.get("loop_type")
-            ),
-            pid=args.pid if args.pid is not None else existing_for_defaults.get("pid"),
-            timeout_seconds=(
-                args.timeout_seconds
-                if args.timeout_seconds is not None
-                else existing_for_defaults.get("timeout_seconds")
-            ),
-            cron_job_id=(
-                _explicit_optional_string(args.cron_job_id)
-                if args.cron_job_id is not None
-                else existing_for_defaults.get("cron_job_id")
-            ),
-            current_task=(
-                args.current_task
-                if args.current_task is not None
-                else existing_for_defaults.get("current_task")
-            ),
-            stop_reason=(
-                _explicit_optional_string(args.stop_reason)
-                if args.stop_reason is not None
-                else existing_for_defaults.get("stop_reason")
-            ),
-            completion_requested_at=(
-                _explicit_optional_string(args.completion_requested_at)
-                if args.completion_requested_at is not None
-                else existing_for_defaults.get("completion_requested_at")
-            ),
-            terminal_at=(
-                _explicit_optional_string(args.terminal_at)
-                if args.terminal_at is not None
-                else existing_for_defaults.get("terminal_at")
-            ),
-            last_event_id=(
-                _explicit_optional_string(args.last_event_id)
-                if args.last_event_id is not None
-                else existing_for_defaults.get("last_event_id")
-            ),
-            last_event_at=(
-                _explicit_optional_string(args.last_event_at)
-                if args.last_event_at is not None
-                else existing_for_defaults.get("last_event_at")
-            ),
-            checkpoint=(
-                checkpoint if checkpoint is not None else existing_for_defaults.get("checkpoint")
-            ),
-            metadata=(
-                metadata if metadata is not None else existing_for_defaults.get("metadata")
-            ),
-            created_at=(
-                _explicit_optional_string(args.created_at)
-                if args.created_at is not None
-                else existing_for_defaults.get("created_at")
+            record_id=args.id,
+            delivery_state=args.delivery_state,
+        ):
+            print(json.dumps(record, sort_keys=True))
+        return 0
+
+    if args.command == "rebuild-projections":
+        result = _state_module("projections").rebuild_projections(args.state_dir, full=args.full)
+        print(
+            json.dumps(
+                {
+                    "start_offset": result["start_offset"],
+                    "offset": result["offset"],
+                    "events_folded": result["events_folded"],
+                    "workers": len(result["workers"]),
+                },
+                sort_keys=True,
+            )
+        )
+        return 0
+
+    if args.command == "check-projections":
+        report = _state_module("projections").check_projections(args.state_dir, repair=args.repair)
+        if refresh_handoff and report["repaired"]:
+            request_handoff_refresh(args.state_dir)
+        print(json.dumps(report, sort_keys=True))
+        return 0 if report["consistent"] or report["repaired"] else 1
+
+    if args.command == "migrate":
+        migrator = _state_module("migrator")
+        progress = migrator.migrate_records(
+            args.state_dir,
+            chunk_size=(
+                migrator.DEFAULT_CHUNK_SIZE if args.chunk_size is None else args.chunk_size
             ),
-            updated_at=args.updated_at,
+            max_chunks=args.max_chunks,
+            pause_seconds=args.pause_seconds,
+            on_progress=lambda chunk: print(json.dumps(chunk, sort_keys=True), file=sys.stderr),
+        )
+        print(json.dumps(progress, sort_keys=True))
+        return 0
+
+    conductor = ConductorStateStore(args.state_dir)
+
+    if args.command == "codec-bench":
+        records = [*conductor.list_worker_states(), *conductor.list_wakeups()]
+        if not records:
+            records = [
+                conductor.make_worker_state(
+                    worker_name="sample",
+                    lifecycle_state="running",
+                    updated_by="subturtle",
+                    checkpoint={"iteration": 1, "timings": {"phases": {"yolo": 12.5}}},
+                )
+            ]
+        results = _state_module("record_codecs").benchmark_codecs(
+            records, iterations=args.iterations
         )
-        written = conductor.write_worker_state(state)
-        writer.refresh_handoff_from_conductor()
+        print(json.dumps({"records": len(records), "codecs": results}, sort_keys=True))
+        return 0
+
+    if args.command == "put-worker":
+        checkpoint = _load_json_object(
+            args.checkpoint_json, arg_name="--checkpoint-json"
+        )
+        metadata = _load_json_object(args.metadata_json, arg_name="--metadata-json")
+
+        def build_state(existing: dict[str, Any]) -> dict[str, Any]:
+            requested_run_id = (
+                _explicit_optional_string(args.run_id)
+                if args.run_id is not None
+                else existing.get("run_id")
+            )
+            existing_run_id = _string_value(existing.get("run_id"))
+            existing_for_defaults = (
+                {}
+                if requested_run_id
+                and existing_run_id
+                and requested_run_id != existing_run_id
+                else existing
+            )
+            return conductor.make_worker_state(
+                worker_name=args.worker_name,
+                lifecycle_state=args.lifecycle_state,
+                updated_by=args.updated_by,
+                run_id=requested_run_id,
+                workspace=(
+                    args.workspace
+                    if args.workspace is not None
+                    else existing_for_defaults.get("workspace")
+                ),
+                loop_type=(
+                    args.loop_type
+                    if args.loop_type is not None
+                    else existing_for_defaults.get("loop_type")
+                ),
+                pid=args.pid if args.pid is not None else existing_for_defaults.get("pid"),
+                timeout_seconds=(
+                    args.timeout_seconds
+                    if args.timeout_seconds is not None
+                    else existing_for_defaults.get("timeout_seconds")
+                ),
+                cron_job_id=(
+                    _explicit_optional_string(args.cron_job_id)
+                    if args.cron_job_id is not None
+                    else existing_for_defaults.get("cron_job_id")
+                ),
+                current_task=(
+                    args.current_task
+                    if args.current_task is not None
+                    else existing_for_defaults.get("current_task")
+                ),
+                stop_reason=(
+                    _explicit_optional_string(args.stop_reason)
+                    if args.stop_reason is not None
+                    else existing_for_defaults.get("stop_reason")
+                ),
+                completion_requested_at=(
+                    _explicit_optional_string(args.completion_requested_at)
+                    if args.completion_requested_at is not None
+                    else existing_for_defaults.get("completion_requested_at")
+                ),
+                terminal_at=(
+                    _explicit_optional_string(args.terminal_at)
+                    if args.terminal_at is not None
+                    else existing_for_defaults.get("terminal_at")
+                ),
+                last_event_id=(
+                    _explicit_optional_string(args.last_event_id)
+                    if args.last_event_id is not None
+                    else existing_for_defaults.get("last_event_id")
+                ),
+                last_event_at=(
+                    _explicit_optional_string(args.last_event_at)
+                    if args.last_event_at is not None
+                    else existing_for_defaults.get("last_event_at")
+                ),
+                checkpoint=(
+                    checkpoint if checkpoint is not None else existing_for_defaults.get("checkpoint")
+                ),
+                metadata=(
+                    metadata if metadata is not None else existing_for_defaults.get("metadata")
+                ),
+                created_at=(
+                    _explicit_optional_string(args.created_at)
+                    if args.created_at is not None
+                    else existing_for_defaults.get("created_at")
+                ),
+                updated_at=args.updated_at,
+            )
+
+        written = conductor.update_worker_state(args.worker_name, build_state)
+        if refresh_handoff:
+            request_handoff_refresh(args.state_dir)
         print(json.dumps(written, sort_keys=True))
         return 0
 
@@ -760,7 +1565,30 @@ def main(argv: Sequence[str] | None = None) -> int:
             updated_at=args.updated_at,
         )
         written = conductor.write_wakeup(wakeup)
-        writer.refresh_handoff_from_conductor()
+        if refresh_handoff:
+            request_handoff_refresh(args.state_dir)
+        print(json.dumps(written, sort_keys=True))
+        return 0
+
+    if args.command == "claim-wakeup":
+        claim_options: dict[str, Any] = {"category": args.category, "claimed_by": args.claimed_by}
+        if args.lease_seconds is not None:
+            claim_options["lease_seconds"] = args.lease_seconds
+        claimed = conductor.claim_next(**claim_options)
+        if claimed is not None and refresh_handoff:
+            request_handoff_refresh(args.state_dir)
+        print(json.dumps(claimed, sort_keys=True))
+        return 0
+
+    if args.command in {"ack-wakeup", "nack-wakeup"}:
+        if args.command == "ack-wakeup":
+            written = conductor.ack(
+                args.wakeup_id, args.lease_id, delivery_state=args.delivery_state
+            )
+        else:
+            written = conductor.nack(args.wakeup_id, args.lease_id, retry=not args.fail)
+        if refresh_handoff:
+            request_handoff_refresh(args.state_dir)
         print(json.dumps(written, sort_keys=True))
         return 0
 
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import gzip
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+from super_turtle.state import archive
+from super_turtle.state.archive import (
+    collect_garbage,
+    maybe_collect_garbage,
+    query_archive,
+)
+from super_turtle.state.conductor_state import ConductorStateStore
+from super_turtle.state.run_state_writer import main
+
+NOW = datetime(2026, 3, 20, tzinfo=timezone.utc).timestamp()
+OLD = "2026-03-01T00:00:00Z"
+RECENT = "2026-03-19T12:00:00Z"
+
+
+def _seed_state(store: ConductorStateStore) -> None:
+    for wakeup_id, delivery_state, updated_at in (
+        ("wake_old_sent", "sent", OLD),
+        ("wake_old_failed", "failed", OLD),
+        ("wake_recent_sent", "sent", RECENT),
+        ("wake_old_pending", "pending", OLD),
+    ):
+        store.write_wakeup(
+            store.make_wakeup(
+                worker_name="gc-run",
+                category="notable",
+                summary=wakeup_id,
+                wakeup_id=wakeup_id,
+                delivery_state=delivery_state,
+                created_at=updated_at,
+                updated_at=updated_at,
+            )
+        )
+    for worker_name, lifecycle_state, updated_at in (
+        ("old-archived", "archived", OLD),
+        ("recent-archived", "archived", RECENT),
+        ("old-running", "running", OLD),
+    ):
+        store.write_worker_state(
+            store.make_worker_state(
+                worker_name=worker_name,
+                lifecycle_state=lifecycle_state,
+                updated_by="supervisor",
+                run_id=f"run-{worker_name}",
+                created_at=updated_at,
+                updated_at=updated_at,
+            )
+        )
+
+
+class ArchiveTests(unittest.TestCase):
+    def test_collect_garbage_archives_only_old_terminal_records(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            _seed_state(store)
+
+            report = collect_garbage(tmp_dir, retention_seconds=7 * 24 * 3600, now=NOW)
+
+            self.assertEqual(report["wakeups_archived"], 2)
+            self.assertEqual(report["workers_archived"], 1)
+            self.assertGreater(report["bytes_reclaimed"], report["archive_bytes_added"])
+            self.assertIn("listing_seconds_after", report)
+            self.assertEqual(
+                sorted(wakeup["id"] for wakeup in store.list_wakeups()),
+                ["wake_old_pending", "wake_recent_sent"],
+            )
+            self.assertIsNone(store.load_worker_state("old-archived"))
+            self.assertIsNotNone(store.load_worker_state("old-running"))
+
+            archived_wakeups = query_archive(tmp_dir, "wakeups", delivery_state="failed")
+            self.assertEqual([wakeup["id"] for wakeup in archived_wakeups], ["wake_old_failed"])
+            archived_workers = query_archive(tmp_dir, "workers", worker_name="old-archived")
+            self.assertEqual(archived_workers[0]["run_id"], "run-old-archived")
+
+    def test_collect_garbage_dry_run_moves_nothing(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            _seed_state(store)
+
+            report = collect_garbage(tmp_dir, now=NOW, dry_run=True)
+
+            self.assertEqual(report["wakeups_archived"], 2)
+            self.assertGreater(report["bytes_reclaimed"], 0)
+            self.assertEqual(len(store.list_wakeups()), 4)
+            self.assertEqual(query_archive(tmp_dir, "wakeups"), [])
+
+    def test_interrupted_archive_member_is_dropped_and_later_members_stay_readable(
+        self,
+    ) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            _seed_state(store)
+            collect_garbage(tmp_dir, now=NOW)
+            archive_file = Path(tmp_dir) / "archive" / "wakeups.jsonl.gz"
+            committed_size = archive_file.stat().st_size
+            member = gzip.compress(b'{"id": "half-written"}\n' * 50)
+            with archive_file.open("ab") as archive:
+                archive.write(member[: len(member) // 2])
+
+            self.assertEqual(len(query_archive(tmp_dir, "wakeups")), 2)
+
+            store.write_wakeup(
+                store.make_wakeup(
+                    worker_name="gc-run",
+                    category="notable",
+                    summary="later",
+                    wakeup_id="wake_later_sent",
+                    delivery_state="sent",
+                    created_at=OLD,
+                    updated_at=OLD,
+                )
+            )
+            collect_garbage(tmp_dir, now=NOW)
+
+            self.assertGreater(archive_file.stat().st_size, committed_size)
+            self.assertEqual(
+                sorted(wakeup["id"] for wakeup in query_archive(tmp_dir, "wakeups")),
+                ["wake_later_sent", "wake_old_failed", "wake_old_sent"],
+            )
+
+    def test_collect_garbage_keeps_worker_rewritten_during_pass(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            _seed_state(store)
+            append_member = archive._append_archive_member
+
+            def append_then_reuse_name(conductor, kind, records):
+                added = append_member(conductor, kind, records)
+                if kind == "workers":
+                    store.write_worker_state(
+                        store.make_worker_state(
+                            worker_name="old-archived",
+                            lifecycle_state="running",
+                            updated_by="supervisor",
+                            run_id="run-reused",
+                        )
+                    )
+                return added
+
+            with mock.patch.object(archive, "_append_archive_member", append_then_reuse_name):
+                collect_garbage(tmp_dir, now=NOW)
+
+            self.assertEqual(store.load_worker_state("old-archived")["run_id"], "run-reused")
+
+    def test_maybe_collect_garbage_respects_interval(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            _seed_state(ConductorStateStore(tmp_dir))
+
+            self.assertIsNotNone(maybe_collect_garbage(tmp_dir, interval_seconds=3600, now=NOW))
+            self.assertIsNone(maybe_collect_garbage(tmp_dir, interval_seconds=3600, now=NOW + 60))
+            self.assertIsNotNone(
+                maybe_collect_garbage(tmp_dir, interval_seconds=3600, now=NOW + 3601)
+            )
+
+    def test_gc_and_archive_query_cli_smoke(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            _seed_state(ConductorStateStore(tmp_dir))
+
+            self.assertEqual(main(["--state-dir", tmp_dir, "gc", "--retention-hours", "1"]), 0)
+            self.assertEqual(
+                main(["--state-dir", tmp_dir, "archive-query", "--kind", "wakeups", "--id", "wake_old_sent"]),
+                0,
+            )
+            self.assertEqual(len(query_archive(tmp_dir, "wakeups")), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
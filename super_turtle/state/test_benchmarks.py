@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from super_turtle.state.benchmarks import (
+    OPERATIONS,
+    Fleet,
+    compare_to_baseline,
+    load_baseline,
+    run_benchmarks,
+    seed_fleet,
+    update_baseline,
+)
+from super_turtle.state.conductor_state import ConductorStateStore
+
+TINY_FLEET = Fleet(workers=3, events=40, wakeups=6, samples=3)
+
+
+class StateBenchmarkTests(unittest.TestCase):
+    def test_seed_fleet_builds_a_readable_state_dir(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state_dir = Path(tmp_dir) / "state"
+            seed_fleet(state_dir, TINY_FLEET)
+            store = ConductorStateStore(state_dir)
+
+            self.assertEqual(len(store.list_worker_states()), 3)
+            self.assertEqual(len(store.list_wakeups()), 6)
+            self.assertEqual(sum(1 for _event in store.iter_events()), 40)
+
+    def test_run_benchmarks_reports_every_operation(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report = run_benchmarks(TINY_FLEET, scenario="tiny", work_dir=Path(tmp_dir))
+            self.assertEqual(list(Path(tmp_dir).iterdir()), [])
+
+        self.assertEqual(report["fleet"]["workers"], 3)
+        self.assertEqual(set(report["operations"]), {*OPERATIONS, "event_index_catch_up"})
+        for operation in OPERATIONS:
+            stats = report["operations"][operation]
+            self.assertEqual(stats["count"], 3)
+            self.assertLessEqual(stats["p50_ms"], stats["max_ms"])
+
+    def test_compare_to_baseline_flags_only_regressions_beyond_tolerance(self) -> None:
+        def report(p50_by_operation: dict[str, float]) -> dict:
+            return {
+                "scenario": "tiny",
+                "fleet": {},
+                "python": "3",
+                "platform": "test",
+                "operations": {
+                    operation: {"p50_ms": p50} for operation, p50 in p50_by_operation.items()
+                },
+            }
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            baseline_path = Path(tmp_dir) / "baseline.json"
+            update_baseline(baseline_path, report({"append_event": 1.0, "list_wakeups": 10.0}))
+            baseline = load_baseline(baseline_path)
+            self.assertIn("tiny", json.loads(baseline_path.read_text(encoding="utf-8"))["scenarios"])
+
+        comparison = compare_to_baseline(
+            report({"append_event": 1.2, "list_wakeups": 20.0, "list_worker_states": 1.0}),
+            baseline,
+            tolerance=0.25,
+        )
+
+        self.assertEqual(
+            [entry["operation"] for entry in comparison["regressions"]], ["list_wakeups"]
+        )
+        self.assertEqual(comparison["regressions"][0]["ratio"], 2.0)
+        self.assertEqual(comparison["missing"], ["list_worker_states"])
+
+    def test_compare_to_baseline_scales_by_host_calibration(self) -> None:
+        def report(calibration_p50: float, append_p50: float) -> dict:
+            return {
+                "scenario": "tiny",
+                "calibration": {"p50_ms": calibration_p50},
+                "operations": {"append_event": {"p50_ms": append_p50}},
+            }
+
+        baseline = {"scenarios": {"tiny": report(1.0, 1.0)}}
+
+        slower_host = compare_to_baseline(report(2.0, 2.1), baseline)
+        self.assertEqual(slower_host["host_scale"], 2.0)
+        self.assertEqual(slower_host["regressions"], [])
+        self.assertEqual(slower_host["improvements"], [])
+
+        regressed = compare_to_baseline(report(2.0, 3.0), baseline)
+        self.assertEqual(regressed["regressions"][0]["baseline_p50_ms"], 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import json
+import multiprocessing
+import sys
 import tempfile
 import unittest
 from pathlib import Path
@@ -12,6 +14,25 @@ from super_turtle.state.conductor_state import (
 )
 
 
+def _hammer_worker_state(state_dir: str, process_index: int, updates: int) -> None:
+    store = ConductorStateStore(state_dir)
+
+    def increment(existing: dict) -> dict:
+        metadata = dict(existing.get("metadata") or {})
+        metadata["counter"] = int(metadata.get("counter", 0)) + 1
+        metadata[f"process_{process_index}"] = int(metadata.get(f"process_{process_index}", 0)) + 1
+        return store.make_worker_state(
+            worker_name="hot-worker",
+            lifecycle_state="running",
+            updated_by="stress-test",
+            created_at=existing.get("created_at"),
+            metadata=metadata,
+        )
+
+    for _ in range(updates):
+        store.update_worker_state("hot-worker", increment)
+
+
 class ConductorStateStoreTests(unittest.TestCase):
     def test_ensure_conductor_state_paths_creates_layout(self) -> None:
         with tempfile.TemporaryDirectory() as tmp_dir:
@@ -86,6 +107,67 @@ class ConductorStateStoreTests(unittest.TestCase):
             self.assertEqual(parsed["emitted_by"], "supervisor")
             self.assertEqual(parsed["payload"]["pid"], 999)
 
+    def test_append_event_with_repeated_idempotency_key_returns_original(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+
+            first = store.append_event(
+                worker_name="beta-run",
+                event_type="worker.checkpoint",
+                emitted_by="subturtle",
+                payload={"iteration": 1},
+                idempotency_key="beta-run:run-1:checkpoint:1",
+            )
+            store.append_event(
+                worker_name="gamma-run",
+                event_type="worker.checkpoint",
+                emitted_by="subturtle",
+                idempotency_key="beta-run:run-1:checkpoint:1",
+            )
+            duplicate = store.append_event(
+                worker_name="beta-run",
+                event_type="worker.checkpoint",
+                emitted_by="subturtle",
+                payload={"iteration": 1, "retried": True},
+                idempotency_key="beta-run:run-1:checkpoint:1",
+            )
+            self.assertEqual(duplicate, first)
+
+            # The index is derived state and is rebuilt from the log.
+            for path in store.paths.event_keys_dir.iterdir():
+                path.unlink()
+            rebuilt = ConductorStateStore(tmp_dir).append_event(
+                worker_name="beta-run",
+                event_type="worker.checkpoint",
+                emitted_by="subturtle",
+                idempotency_key="beta-run:run-1:checkpoint:1",
+            )
+            self.assertEqual(rebuilt, first)
+
+            # Appends by other writers are picked up on the next lookup.
+            with store.paths.events_jsonl_file.open("a", encoding="utf-8") as handle:
+                handle.write(
+                    json.dumps(
+                        {
+                            "id": "evt_external",
+                            "worker_name": "beta-run",
+                            "event_type": "worker.completion_requested",
+                            "idempotency_key": "beta-run:run-1:completion_requested",
+                        }
+                    )
+                    + "\n"
+                )
+            external = store.append_event(
+                worker_name="beta-run",
+                event_type="worker.completion_requested",
+                emitted_by="subturtle",
+                idempotency_key="beta-run:run-1:completion_requested",
+            )
+            self.assertEqual(external["id"], "evt_external")
+
+            lines = store.paths.events_jsonl_file.read_text(encoding="utf-8").strip().splitlines()
+            self.assertEqual(len(lines), 3)
+
     def test_write_and_update_wakeup(self) -> None:
         with tempfile.TemporaryDirectory() as tmp_dir:
             store = ConductorStateStore(tmp_dir)
@@ -128,6 +210,248 @@ class ConductorStateStoreTests(unittest.TestCase):
                     updated_by="supervisor",
                 )
 
+    def test_claim_next_leases_by_priority_and_fifo(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            for wakeup_id, category, created_at in (
+                ("wake_notable_old", "notable", "2026-03-08T03:00:00Z"),
+                ("wake_notable_new", "notable", "2026-03-08T03:05:00Z"),
+                ("wake_critical", "critical", "2026-03-08T03:10:00Z"),
+                ("wake_sent", "critical", "2026-03-08T02:00:00Z"),
+            ):
+                store.write_wakeup(
+                    store.make_wakeup(
+                        worker_name="queue-run",
+                        category=category,
+                        summary=wakeup_id,
+                        wakeup_id=wakeup_id,
+                        delivery_state="sent" if wakeup_id == "wake_sent" else "pending",
+                        created_at=created_at,
+                    )
+                )
+
+            first = store.claim_next(lease_seconds=60, now=1000.0)
+            second = store.claim_next(lease_seconds=60, now=1000.0)
+            third = store.claim_next(category="notable", lease_seconds=60, now=1000.0)
+
+            self.assertEqual(first["id"], "wake_critical")
+            self.assertEqual(first["delivery_state"], "processing")
+            self.assertEqual(first["delivery"]["attempts"], 1)
+            self.assertIsNotNone(first["delivery"]["lease_id"])
+            self.assertEqual(second["id"], "wake_notable_old")
+            self.assertEqual(third["id"], "wake_notable_new")
+            self.assertIsNone(store.claim_next(lease_seconds=60, now=1000.0))
+
+    def test_ack_archives_and_nack_requeues_or_fails(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            for wakeup_id, created_at in (
+                ("wake_a", "2026-03-08T03:00:00Z"),
+                ("wake_b", "2026-03-08T03:00:01Z"),
+            ):
+                store.write_wakeup(
+                    store.make_wakeup(
+                        worker_name="queue-run",
+                        category="notable",
+                        summary=wakeup_id,
+                        wakeup_id=wakeup_id,
+                        created_at=created_at,
+                    )
+                )
+
+            claimed = store.claim_next(now=1000.0)
+            with self.assertRaises(ValueError):
+                store.ack(claimed["id"], "lease_wrong")
+            acked = store.ack(claimed["id"], claimed["delivery"]["lease_id"])
+
+            self.assertEqual(acked["delivery_state"], "sent")
+            self.assertFalse(store.wakeup_path("wake_a").exists())
+            self.assertTrue((store.paths.wakeups_archive_dir / "wake_a.json").exists())
+            self.assertEqual(store.load_wakeup("wake_a")["delivery_state"], "sent")
+            self.assertEqual(
+                [wakeup["id"] for wakeup in store.list_wakeups("sent", include_archived=True)],
+                ["wake_a"],
+            )
+
+            claimed = store.claim_next(now=1000.0)
+            requeued = store.nack(claimed["id"], claimed["delivery"]["lease_id"])
+            self.assertEqual(requeued["delivery_state"], "pending")
+            claimed = store.claim_next(now=1000.0)
+            self.assertEqual(claimed["delivery"]["attempts"], 2)
+            failed = store.nack(claimed["id"], claimed["delivery"]["lease_id"], retry=False)
+            self.assertEqual(failed["delivery_state"], "failed")
+            self.assertIsNone(store.claim_next(now=1000.0))
+
+    def test_updates_to_acked_wakeups_stay_in_archive_and_release_leases(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            for wakeup_id, created_at in (
+                ("wake_acked", "2026-03-08T03:00:00Z"),
+                ("wake_leased", "2026-03-08T03:00:01Z"),
+            ):
+                store.write_wakeup(
+                    store.make_wakeup(
+                        worker_name="queue-run",
+                        category="notable",
+                        summary=wakeup_id,
+                        wakeup_id=wakeup_id,
+                        created_at=created_at,
+                    )
+                )
+            claimed = store.claim_next(now=1000.0)
+            store.ack(claimed["id"], claimed["delivery"]["lease_id"])
+
+            with self.assertRaises(ValueError):
+                store.update_wakeup_delivery(wakeup_id=claimed["id"], delivery_state="pending")
+            store.update_wakeup_delivery(wakeup_id=claimed["id"], delivery_state="failed")
+            self.assertFalse(store.wakeup_path(claimed["id"]).exists())
+            self.assertEqual(store.load_wakeup(claimed["id"])["delivery_state"], "failed")
+
+            leased = store.claim_next(now=1000.0)
+            lease_path = store.paths.wakeup_queue_dir / "leased" / f"{leased['id']}.json"
+            self.assertTrue(lease_path.exists())
+            store.update_wakeup_delivery(wakeup_id=leased["id"], delivery_state="sent")
+            self.assertFalse(lease_path.exists())
+            self.assertEqual(store.expire_wakeup_leases(now=10_000.0), [])
+            self.assertEqual(store.load_wakeup(leased["id"])["delivery_state"], "sent")
+
+    def test_expired_lease_returns_wakeup_to_queue(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            store.write_wakeup(
+                store.make_wakeup(
+                    worker_name="queue-run",
+                    category="critical",
+                    summary="lease me",
+                    wakeup_id="wake_lease",
+                )
+            )
+
+            first = store.claim_next(lease_seconds=30, now=1000.0)
+            self.assertIsNone(store.claim_next(lease_seconds=30, now=1010.0))
+            second = store.claim_next(lease_seconds=30, now=1031.0)
+
+            self.assertEqual(second["id"], first["id"])
+            self.assertNotEqual(second["delivery"]["lease_id"], first["delivery"]["lease_id"])
+            with self.assertRaises(ValueError):
+                store.ack(first["id"], first["delivery"]["lease_id"])
+
+    def test_claim_next_indexes_wakeups_written_without_the_store(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            external = store.make_wakeup(
+                worker_name="queue-run",
+                category="notable",
+                summary="written by the bot supervisor",
+                wakeup_id="wake_external",
+            )
+            store.wakeup_path("wake_external").write_text(json.dumps(external), encoding="utf-8")
+
+            claimed = store.claim_next(now=1000.0)
+
+            self.assertIsNotNone(claimed)
+            self.assertEqual(claimed["id"], "wake_external")
+
+    def test_claim_next_requeues_wakeups_rewritten_to_pending_under_the_same_name(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            for wakeup_id, created_at in (
+                ("wake_acked", "2026-03-08T03:00:00Z"),
+                ("wake_leased", "2026-03-08T03:00:01Z"),
+            ):
+                store.write_wakeup(
+                    store.make_wakeup(
+                        worker_name="queue-run",
+                        category="notable",
+                        summary=wakeup_id,
+                        wakeup_id=wakeup_id,
+                        created_at=created_at,
+                    )
+                )
+            acked = store.claim_next(now=1000.0)
+            store.ack(acked["id"], acked["delivery"]["lease_id"])
+            leased = store.claim_next(now=1000.0)
+            self.assertIsNone(store.claim_next(now=1000.0))
+
+            # The bot supervisor recovers wakeups with a temp-file + rename of
+            # the same <id>.json, bypassing the queue markers.
+            for wakeup in (acked, leased):
+                requeued = {**wakeup, "delivery_state": "pending"}
+                tmp_path = store.paths.wakeups_dir / f".{wakeup['id']}.tmp"
+                tmp_path.write_text(json.dumps(requeued), encoding="utf-8")
+                tmp_path.replace(store.wakeup_path(wakeup["id"]))
+
+            reclaimed = [store.claim_next(now=1000.0), store.claim_next(now=1000.0)]
+
+            self.assertEqual([wakeup["id"] for wakeup in reclaimed], ["wake_acked", "wake_leased"])
+            self.assertIsNone(store.claim_next(now=1000.0))
+
+    def test_update_worker_state_applies_builder_to_latest_state(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            store.write_worker_state(
+                store.make_worker_state(
+                    worker_name="cas-run",
+                    lifecycle_state="running",
+                    updated_by="supervisor",
+                    pid=4321,
+                )
+            )
+            seen_pids = []
+
+            def build(existing: dict) -> dict:
+                seen_pids.append(existing.get("pid"))
+                if len(seen_pids) == 1:
+                    # A concurrent supervisor write lands between read and write.
+                    store.write_worker_state(
+                        store.make_worker_state(
+                            worker_name="cas-run",
+                            lifecycle_state="running",
+                            updated_by="supervisor",
+                            pid=9999,
+                            cron_job_id="cron-new",
+                        )
+                    )
+                return store.make_worker_state(
+                    worker_name="cas-run",
+                    lifecycle_state="running",
+                    updated_by="subturtle",
+                    pid=existing.get("pid"),
+                    cron_job_id=existing.get("cron_job_id"),
+                    current_task="checkpointed",
+                )
+
+            written = store.update_worker_state("cas-run", build)
+
+            self.assertEqual(seen_pids, [4321, 9999])
+            self.assertEqual(written["pid"], 9999)
+            self.assertEqual(written["cron_job_id"], "cron-new")
+            self.assertEqual(store.load_worker_state("cas-run"), written)
+
+    @unittest.skipUnless(sys.platform != "win32", "requires fork")
+    def test_concurrent_processes_do_not_lose_worker_updates(self) -> None:
+        processes_count = 8
+        updates_per_process = 25
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            context = multiprocessing.get_context("fork")
+            processes = [
+                context.Process(
+                    target=_hammer_worker_state,
+                    args=(tmp_dir, index, updates_per_process),
+                )
+                for index in range(processes_count)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join(timeout=60)
+                self.assertEqual(process.exitcode, 0)
+
+            metadata = ConductorStateStore(tmp_dir).load_worker_state("hot-worker")["metadata"]
+            self.assertEqual(metadata["counter"], processes_count * updates_per_process)
+            for index in range(processes_count):
+                self.assertEqual(metadata[f"process_{index}"], updates_per_process)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import tempfile
+import threading
+import unittest
+import urllib.request
+from pathlib import Path
+from unittest import mock
+
+from super_turtle.state import metrics
+from super_turtle.state.conductor_state import ConductorStateStore
+from super_turtle.state.metrics import (
+    METRICS_CACHE_FILENAME,
+    OPENMETRICS_CONTENT_TYPE,
+    MetricsAggregate,
+    make_metrics_server,
+    render_metrics,
+)
+
+
+def _seed_state(store: ConductorStateStore) -> None:
+    store.write_worker_state(
+        store.make_worker_state(
+            worker_name="alpha",
+            lifecycle_state="running",
+            updated_by="supervisor",
+            loop_type="slow",
+        )
+    )
+    store.write_worker_state(
+        store.make_worker_state(
+            worker_name="beta",
+            lifecycle_state="archived",
+            updated_by="supervisor",
+        )
+    )
+    store.write_wakeup(
+        store.make_wakeup(worker_name="alpha", category="critical", summary="alpha failed")
+    )
+    store.write_wakeup(
+        store.make_wakeup(
+            worker_name="beta",
+            category="notable",
+            summary="beta done",
+            delivery_state="sent",
+        )
+    )
+    store.append_event(
+        worker_name="alpha",
+        event_type="worker.checkpoint",
+        emitted_by="subturtle",
+        payload={
+            "loop_type": "slow",
+            "iteration": 3,
+            "timings": {"phases": {"planner": 12.5, "executor": 400.0}, "retries": 2},
+        },
+    )
+
+
+class MetricsTests(unittest.TestCase):
+    def test_render_metrics_emits_openmetrics_families(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            _seed_state(ConductorStateStore(tmp_dir))
+
+            text = render_metrics(tmp_dir)
+
+            self.assertIn('superturtle_workers{lifecycle_state="running"} 1', text)
+            self.assertIn('superturtle_workers{lifecycle_state="archived"} 1', text)
+            self.assertIn(
+                'superturtle_pending_wakeups{category="critical",delivery_state="pending"} 1',
+                text,
+            )
+            self.assertNotIn('category="notable"', text)
+            self.assertIn('superturtle_worker_iteration{worker="alpha"} 3', text)
+            self.assertIn('superturtle_agent_retries_total{loop_type="slow"} 2', text)
+            self.assertIn(
+                'superturtle_phase_duration_seconds_bucket{loop_type="slow",phase="planner",le="15"} 1',
+                text,
+            )
+            self.assertIn(
+                'superturtle_phase_duration_seconds_bucket{loop_type="slow",phase="executor",le="300"} 0',
+                text,
+            )
+            self.assertIn(
+                'superturtle_phase_duration_seconds_count{loop_type="slow",phase="executor"} 1',
+                text,
+            )
+            self.assertIn('superturtle_events_total{event_type="worker.checkpoint"} 1', text)
+            self.assertIn("superturtle_event_log_bytes ", text)
+            self.assertTrue(text.endswith("# EOF\n"))
+
+    def test_refresh_consumes_only_new_events_and_changed_files(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            _seed_state(store)
+            aggregate = MetricsAggregate(tmp_dir)
+            first = aggregate.refresh()
+            self.assertTrue((Path(tmp_dir) / METRICS_CACHE_FILENAME).exists())
+            self.assertEqual(first["events"]["offset"], store.paths.events_jsonl_file.stat().st_size)
+
+            store.append_event(
+                worker_name="alpha",
+                event_type="worker.checkpoint",
+                emitted_by="subturtle",
+                payload={"loop_type": "slow", "iteration": 4},
+            )
+            store.write_worker_state(
+                store.make_worker_state(
+                    worker_name="alpha",
+                    lifecycle_state="completed",
+                    updated_by="supervisor",
+                )
+            )
+
+            second = MetricsAggregate(tmp_dir).refresh()
+
+            self.assertEqual(second["events"]["checkpoints"], {"alpha": 2})
+            self.assertEqual(second["events"]["iterations"], {"alpha": 4})
+            self.assertEqual(second["workers"]["files"]["alpha.json"][1], ["completed"])
+
+    def test_idle_refresh_does_not_rewrite_the_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            _seed_state(store)
+            MetricsAggregate(tmp_dir).refresh()
+
+            with mock.patch.object(
+                metrics, "_atomic_write_json", wraps=metrics._atomic_write_json
+            ) as write:
+                idle = MetricsAggregate(tmp_dir).refresh()
+                self.assertEqual(write.call_count, 0)
+                self.assertEqual(idle["events"]["checkpoints"], {"alpha": 1})
+
+                store.append_event(
+                    worker_name="alpha",
+                    event_type="worker.checkpoint",
+                    emitted_by="subturtle",
+                    payload={"loop_type": "slow", "iteration": 5},
+                )
+                MetricsAggregate(tmp_dir).refresh()
+                self.assertEqual(write.call_count, 1)
+
+    def test_metrics_http_endpoint_serves_openmetrics(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            _seed_state(ConductorStateStore(tmp_dir))
+            server = make_metrics_server(tmp_dir, port=0)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                host, port = server.server_address[:2]
+                with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+                    body = response.read().decode("utf-8")
+                    content_type = response.headers["Content-Type"]
+            finally:
+                server.shutdown()
+                server.server_close()
+
+            self.assertEqual(content_type, OPENMETRICS_CONTENT_TYPE)
+            self.assertIn("superturtle_workers", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
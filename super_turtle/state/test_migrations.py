@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from super_turtle.state import conductor_state, migrator
+from super_turtle.state.conductor_state import ConductorStateStore
+from super_turtle.state.migrations import MIGRATIONS, MigrationRegistry
+from super_turtle.state.migrator import MIGRATION_PROGRESS_FILENAME, migrate_records
+
+
+def _add_priority(record: dict) -> dict:
+    record["priority"] = {"critical": 0}.get(record.get("category"), 1)
+    return record
+
+
+def _rename_task(record: dict) -> dict:
+    record["task"] = record.pop("current_task", None)
+    return record
+
+
+class MigrationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        MIGRATIONS.register("worker_state", 1)(_rename_task)
+        MIGRATIONS.register("wakeup", 1)(_add_priority)
+        MIGRATIONS.register("worker_event", 1)(lambda record: record)
+        self.addCleanup(MIGRATIONS.unregister, "worker_state", 1)
+        self.addCleanup(MIGRATIONS.unregister, "wakeup", 1)
+        self.addCleanup(MIGRATIONS.unregister, "worker_event", 1)
+
+    def _seed(self, store: ConductorStateStore, workers: int) -> None:
+        for index in range(workers):
+            store.write_worker_state(
+                store.make_worker_state(
+                    worker_name=f"worker-{index:02d}",
+                    lifecycle_state="running",
+                    updated_by="supervisor",
+                    current_task=f"task {index}",
+                )
+            )
+        store.write_wakeup(store.make_wakeup(worker_name="worker-00", category="critical", summary="boom"))
+
+    def test_registry_chains_steps_and_leaves_newer_records(self) -> None:
+        registry = MigrationRegistry()
+        registry.register("wakeup", 1)(lambda record: {**record, "a": 1})
+        registry.register("wakeup", 2)(lambda record: {**record, "b": 2})
+
+        upgraded = registry.upgrade({"schema_version": 1}, "wakeup", 3)
+        self.assertEqual(upgraded, {"schema_version": 3, "a": 1, "b": 2})
+        self.assertEqual(registry.upgrade({"schema_version": 4}, "wakeup", 3), {"schema_version": 4})
+        with self.assertRaises(ValueError):
+            registry.upgrade({}, "worker_state", 2)
+        with self.assertRaises(ValueError):
+            registry.register("wakeup", 1)(lambda record: record)
+
+    def test_records_are_upgraded_lazily_on_read(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            self._seed(store, workers=1)
+            store.append_event(worker_name="worker-00", event_type="worker.started", emitted_by="supervisor")
+
+            with mock.patch.object(conductor_state, "CONDUCTOR_SCHEMA_VERSION", 2):
+                worker = store.load_worker_state("worker-00")
+                self.assertEqual(worker["schema_version"], 2)
+                self.assertEqual(worker["task"], "task 0")
+                self.assertEqual(store.list_wakeups()[0]["priority"], 0)
+                self.assertEqual(next(store.iter_events())[1]["schema_version"], 2)
+
+            stored = json.loads(store.worker_state_path("worker-00").read_text(encoding="utf-8"))
+            self.assertEqual(stored["schema_version"], 1)
+
+    def test_bulk_migration_runs_in_resumable_chunks(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            self._seed(store, workers=5)
+
+            with mock.patch.object(conductor_state, "CONDUCTOR_SCHEMA_VERSION", 2), mock.patch.object(
+                migrator, "CONDUCTOR_SCHEMA_VERSION", 2
+            ):
+                reported: list[dict] = []
+                partial = migrate_records(tmp_dir, chunk_size=2, max_chunks=2, on_progress=reported.append)
+                self.assertFalse(partial["completed"])
+                self.assertEqual(partial["sources"]["workers"]["after"], "worker-03.json")
+                self.assertEqual(len(reported), 2)
+                self.assertTrue((store.paths.base_dir / MIGRATION_PROGRESS_FILENAME).exists())
+
+                finished = migrate_records(tmp_dir, chunk_size=2)
+                self.assertTrue(finished["completed"])
+                self.assertEqual(finished["sources"]["workers"]["scanned"], 5)
+                self.assertEqual(finished["sources"]["workers"]["migrated"], 5)
+                self.assertEqual(finished["sources"]["wakeups"]["migrated"], 1)
+
+            for path in store.paths.workers_dir.glob("*.json"):
+                stored = json.loads(path.read_text(encoding="utf-8"))
+                self.assertEqual(stored["schema_version"], 2)
+                self.assertNotIn("current_task", stored)
+
+
+if __name__ == "__main__":
+    unittest.main()
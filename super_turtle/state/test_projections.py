@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import tempfile
+import unittest
+
+from super_turtle.state.conductor_state import ConductorStateStore
+from super_turtle.state.projections import (
+    WorkerProjection,
+    check_projections,
+    rebuild_projections,
+)
+from super_turtle.state.run_state_writer import main as run_state_writer_main
+
+
+def _record(store: ConductorStateStore, worker_name: str, event_type: str, lifecycle_state: str, **payload):
+    # Mirrors the writers: append the event, then point worker state at it.
+    existing = store.load_worker_state(worker_name) or {}
+    event = store.append_event(
+        worker_name=worker_name,
+        event_type=event_type,
+        emitted_by="subturtle",
+        run_id="run-1",
+        lifecycle_state=lifecycle_state,
+        payload=payload,
+    )
+    store.write_worker_state(
+        store.make_worker_state(
+            worker_name=worker_name,
+            lifecycle_state=lifecycle_state,
+            updated_by="subturtle",
+            run_id="run-1",
+            created_at=existing.get("created_at"),
+            last_event_id=event["id"],
+            last_event_at=event["timestamp"],
+        )
+    )
+    return event
+
+
+class WorkerProjectionTests(unittest.TestCase):
+    def test_projection_folds_events_and_catches_up_from_snapshot(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            _record(store, "alpha", "worker.started", "running")
+            _record(store, "alpha", "worker.checkpoint", "running", kind="iteration_complete", iteration=1)
+
+            first = rebuild_projections(tmp_dir)
+            self.assertEqual(first["events_folded"], 2)
+            alpha = first["workers"]["alpha"]
+            self.assertEqual(alpha["lifecycle_state"], "running")
+            self.assertEqual(alpha["checkpoint"], {"iteration": 1})
+
+            completion = _record(store, "alpha", "worker.completion_requested", "completion_pending")
+            second = rebuild_projections(tmp_dir)
+            self.assertEqual(second["start_offset"], first["offset"])
+            self.assertEqual(second["events_folded"], 1)
+            alpha = second["workers"]["alpha"]
+            self.assertEqual(alpha["stop_reason"], "completed")
+            self.assertEqual(alpha["completion_requested_at"], completion["timestamp"])
+            self.assertEqual(alpha["event_count"], 3)
+
+            full = rebuild_projections(tmp_dir, full=True)
+            self.assertEqual(full["events_folded"], 3)
+            self.assertEqual(full["workers"], second["workers"])
+
+    def test_new_run_resets_run_scoped_fields(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            store.append_event(
+                worker_name="alpha",
+                event_type="worker.fatal_error",
+                emitted_by="subturtle",
+                run_id="run-1",
+                lifecycle_state="failure_pending",
+                payload={"kind": "fatal_error", "message": "boom"},
+            )
+            store.append_event(
+                worker_name="alpha",
+                event_type="worker.started",
+                emitted_by="supervisor",
+                run_id="run-2",
+                lifecycle_state="running",
+            )
+
+            alpha = WorkerProjection(tmp_dir).project()["alpha"]
+            self.assertEqual(alpha["run_id"], "run-2")
+            self.assertEqual(alpha["lifecycle_state"], "running")
+            self.assertIsNone(alpha["stop_reason"])
+            self.assertIsNone(alpha["last_error"])
+
+    def test_check_reports_and_repairs_divergence(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            _record(store, "alpha", "worker.started", "running")
+            self.assertTrue(check_projections(tmp_dir)["consistent"])
+
+            # A writer that dies between the event append and the state write.
+            event = store.append_event(
+                worker_name="alpha",
+                event_type="worker.completion_requested",
+                emitted_by="subturtle",
+                run_id="run-1",
+                lifecycle_state="completion_pending",
+            )
+
+            report = check_projections(tmp_dir)
+            self.assertFalse(report["consistent"])
+            fields = {difference["field"] for difference in report["differences"]}
+            self.assertTrue({"lifecycle_state", "last_event_id"} <= fields)
+
+            stdout = io.StringIO()
+            with contextlib.redirect_stdout(stdout):
+                exit_code = run_state_writer_main(["--state-dir", tmp_dir, "check-projections", "--repair"])
+            self.assertEqual(exit_code, 0)
+            self.assertEqual(json.loads(stdout.getvalue())["repaired"], ["alpha"])
+
+            repaired = store.load_worker_state("alpha")
+            self.assertEqual(repaired["lifecycle_state"], "completion_pending")
+            self.assertEqual(repaired["last_event_id"], event["id"])
+            self.assertTrue(check_projections(tmp_dir)["consistent"])
+
+    def test_replaced_log_triggers_full_replay(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            _record(store, "alpha", "worker.started", "running")
+            rebuild_projections(tmp_dir)
+
+            replacement = store.paths.events_jsonl_file.with_suffix(".new")
+            replacement.write_text("", encoding="utf-8")
+            replacement.replace(store.paths.events_jsonl_file)
+            _record(store, "beta", "worker.started", "running")
+
+            result = rebuild_projections(tmp_dir)
+            self.assertEqual(result["start_offset"], 0)
+            self.assertEqual(sorted(result["workers"]), ["beta"])
+
+
+if __name__ == "__main__":
+    unittest.main()
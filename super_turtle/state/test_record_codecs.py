@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from super_turtle.state.conductor_state import ConductorStateStore
+from super_turtle.state.metrics import METRICS_CACHE_FILENAME, MetricsAggregate
+from super_turtle.state.record_codecs import (
+    BINARY_MAGIC,
+    CODECS,
+    STATE_CODEC_ENV,
+    benchmark_codecs,
+    decode_record,
+    encode_event_line,
+    get_codec,
+)
+
+RECORD = {"worker_name": "alpha", "iteration": 3, "ratio": 0.5, "tags": ["a", None, True]}
+
+
+class RecordCodecTests(unittest.TestCase):
+    def test_every_codec_round_trips_with_auto_detection(self) -> None:
+        for codec in CODECS.values():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(decode_record(codec.encode(RECORD)), RECORD)
+        self.assertTrue(CODECS["binary"].encode(RECORD).startswith(BINARY_MAGIC))
+
+    def test_binary_layout_is_stable(self) -> None:
+        # Pins the on-disk layout; changing it needs a new BINARY_MAGIC version.
+        encoded = CODECS["binary"].encode({"n": 1, "big": 1 << 64, "s": "é", "l": [1.5, None]})
+        self.assertEqual(
+            encoded[len(BINARY_MAGIC) + 4 :].hex(),
+            "6d00000004"
+            "000000016e" "690000000000000001"
+            "00000003626967" "49000000143138343436373434303733373039353531363136"
+            "0000000173" "7300000002c3a9"
+            "000000016c" "6c00000002" "643ff8000000000000" "4e",
+        )
+        self.assertEqual(decode_record(encoded)["big"], 1 << 64)
+        with self.assertRaises(TypeError):
+            CODECS["binary"].encode({"when": object()})
+
+    def test_truncated_binary_record_is_rejected(self) -> None:
+        encoded = CODECS["binary"].encode(RECORD)
+        with self.assertRaises(ValueError):
+            decode_record(encoded[:-3])
+
+    def test_shared_records_fall_back_to_json(self) -> None:
+        self.assertEqual(get_codec("binary", shared=True).name, "compact")
+        with self.assertRaises(ValueError):
+            get_codec("yaml")
+        line = encode_event_line(RECORD, CODECS["binary"])
+        self.assertEqual(json.loads(line), RECORD)
+
+    def test_binary_codec_only_applies_to_private_files(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.dict(
+            os.environ, {STATE_CODEC_ENV: "binary"}
+        ):
+            store = ConductorStateStore(tmp_dir)
+            store.write_worker_state(
+                store.make_worker_state(
+                    worker_name="alpha",
+                    lifecycle_state="running",
+                    updated_by="subturtle",
+                )
+            )
+            store.append_event(worker_name="alpha", event_type="worker.started", emitted_by="supervisor")
+            MetricsAggregate(tmp_dir).render()
+
+            worker_text = store.worker_state_path("alpha").read_text(encoding="utf-8")
+            self.assertEqual(json.loads(worker_text)["worker_name"], "alpha")
+            self.assertNotIn("\n  ", worker_text)
+            cache_bytes = (store.paths.base_dir / METRICS_CACHE_FILENAME).read_bytes()
+            self.assertTrue(cache_bytes.startswith(BINARY_MAGIC))
+            self.assertEqual(store.load_worker_state("alpha")["lifecycle_state"], "running")
+
+    def test_benchmark_reports_every_codec(self) -> None:
+        results = benchmark_codecs([RECORD], iterations=2)
+        self.assertEqual(set(results), set(CODECS))
+        self.assertLess(results["compact"]["bytes_per_record"], results["pretty"]["bytes_per_record"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,32 @@
 from __future__ import annotations
 
+import io
 import json
+import socket
 import tempfile
+import threading
+import time
 import unittest
+from contextlib import redirect_stdout
 from pathlib import Path
+from unittest import mock
 
+from super_turtle.state import run_state_client, run_state_writer
+from super_turtle.state.conductor_state import ConductorStateStore
 from super_turtle.state.run_state_writer import (
+    DAEMON_SOCKET_FILENAME,
     DEFAULT_HANDOFF_NOTE,
+    HANDOFF_REFRESH_INTERVAL_ENV,
+    HANDOFF_REFRESH_STAMP_FILENAME,
     RunStateWriter,
     ensure_state_files,
+    flush_handoff_refresh,
     main,
+    make_state_daemon,
+    request_handoff_refresh,
+    run_batch,
+    summarize_checkpoint_resources,
+    summarize_checkpoint_timings,
 )
 
 
@@ -478,6 +495,322 @@ class RunStateWriterTests(unittest.TestCase):
             self.assertEqual(parsed["checkpoint"], {})
             self.assertEqual(parsed["metadata"], {})
 
+    def test_summarize_checkpoint_timings_reports_percentiles_per_phase(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            for worker_name, loop_type, planner_seconds in (
+                ("alpha", "slow", 1.0),
+                ("alpha", "slow", 3.0),
+                ("beta", "slow", 2.0),
+                ("gamma", "yolo", None),
+            ):
+                phases = {"planner": planner_seconds} if planner_seconds else {"yolo": 5.0}
+                store.append_event(
+                    worker_name=worker_name,
+                    event_type="worker.checkpoint",
+                    emitted_by="subturtle",
+                    payload={
+                        "loop_type": loop_type,
+                        "timings": {"phases": phases, "total_seconds": 6.0, "retries": 1},
+                    },
+                )
+            store.append_event(
+                worker_name="alpha",
+                event_type="worker.started",
+                emitted_by="supervisor",
+            )
+
+            summary = summarize_checkpoint_timings(tmp_dir)
+
+            self.assertEqual(summary["checkpoints"], 4)
+            self.assertEqual(summary["retries"], 4)
+            self.assertEqual(summary["phases"]["planner"]["count"], 3)
+            self.assertEqual(summary["phases"]["planner"]["p50"], 2.0)
+            self.assertEqual(summary["phases"]["planner"]["p95"], 3.0)
+            self.assertEqual(summary["by_loop_type"]["yolo"]["yolo"]["p50"], 5.0)
+            self.assertEqual(summary["by_worker"]["alpha"]["planner"]["count"], 2)
+            self.assertEqual(
+                summarize_checkpoint_timings(tmp_dir, worker_name="beta")["checkpoints"], 1
+            )
+            self.assertEqual(main(["--state-dir", tmp_dir, "timings", "--loop-type", "slow"]), 0)
+
+
+    def test_summarize_checkpoint_resources_ranks_workers_and_phases(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = ConductorStateStore(tmp_dir)
+            for worker_name, loop_type, phases in (
+                (
+                    "alpha",
+                    "slow",
+                    {
+                        "planner": {"calls": 1, "cpu_seconds": 2.0, "peak_rss_kb": 300},
+                        "executor": {"calls": 1, "cpu_seconds": 30.0, "peak_rss_kb": 900},
+                    },
+                ),
+                (
+                    "alpha",
+                    "slow",
+                    {"executor": {"calls": 2, "cpu_seconds": 10.0, "peak_rss_kb": 500}},
+                ),
+                ("beta", "yolo", {"yolo": {"calls": 1, "cpu_seconds": 5.0, "peak_rss_kb": 4000}}),
+            ):
+                store.append_event(
+                    worker_name=worker_name,
+                    event_type="worker.checkpoint",
+                    emitted_by="subturtle",
+                    payload={"loop_type": loop_type, "resources": {"phases": phases}},
+                )
+            store.append_event(
+                worker_name="gamma",
+                event_type="worker.checkpoint",
+                emitted_by="subturtle",
+                payload={"loop_type": "yolo", "timings": {"phases": {"yolo": 1.0}}},
+            )
+
+            summary = summarize_checkpoint_resources(tmp_dir)
+
+            self.assertEqual(summary["checkpoints"], 3)
+            self.assertEqual([row["worker"] for row in summary["workers"]], ["alpha", "beta"])
+            self.assertEqual(summary["workers"][0]["cpu_seconds"], 42.0)
+            self.assertEqual(summary["workers"][0]["calls"], 4)
+            self.assertEqual(summary["workers"][0]["peak_memory_kb"], 900)
+            self.assertEqual(
+                [row["phase"] for row in summary["phases"]], ["executor", "yolo", "planner"]
+            )
+            self.assertEqual(summary["totals"]["cpu_seconds"], 47.0)
+            by_memory = summarize_checkpoint_resources(tmp_dir, sort="memory")
+            self.assertEqual(by_memory["workers"][0]["worker"], "beta")
+            self.assertEqual(
+                summarize_checkpoint_resources(tmp_dir, loop_type="yolo")["checkpoints"], 1
+            )
+            self.assertEqual(main(["--state-dir", tmp_dir, "usage", "--sort", "memory"]), 0)
+
+
+    def test_wakeup_queue_cli_claims_acks_and_nacks(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for summary in ("first", "second"):
+                with redirect_stdout(io.StringIO()):
+                    main(
+                        [
+                            "--state-dir",
+                            tmp_dir,
+                            "enqueue-wakeup",
+                            "--worker-name",
+                            "alpha",
+                            "--category",
+                            "notable",
+                            "--summary",
+                            summary,
+                        ]
+                    )
+
+            def run(*argv: str) -> object:
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    self.assertEqual(main(["--state-dir", tmp_dir, *argv]), 0)
+                return json.loads(output.getvalue())
+
+            claimed = run("claim-wakeup", "--claimed-by", "bot")
+            lease_id = claimed["delivery"]["lease_id"]
+            acked = run("ack-wakeup", "--wakeup-id", claimed["id"], "--lease-id", lease_id)
+            self.assertEqual(acked["delivery_state"], "sent")
+
+            claimed = run("claim-wakeup", "--lease-seconds", "30")
+            lease_id = claimed["delivery"]["lease_id"]
+            failed = run(
+                "nack-wakeup", "--wakeup-id", claimed["id"], "--lease-id", lease_id, "--fail"
+            )
+            self.assertEqual(failed["delivery_state"], "failed")
+            self.assertIsNone(run("claim-wakeup"))
+
+    def test_daemon_runs_cli_commands_for_client(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            server = make_state_daemon(tmp_dir)
+            socket_path = str(Path(tmp_dir) / DAEMON_SOCKET_FILENAME)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                state_dir, argv = run_state_client.split_state_dir(
+                    [
+                        "--state-dir",
+                        tmp_dir,
+                        "put-worker",
+                        "--worker-name",
+                        "alpha",
+                        "--lifecycle-state",
+                        "running",
+                        "--updated-by",
+                        "test",
+                    ]
+                )
+                self.assertEqual(state_dir, tmp_dir)
+                response = run_state_client.request(socket_path, argv)
+                self.assertEqual(response["exit_code"], 0, response["stderr"])
+                self.assertEqual(json.loads(response["stdout"])["worker_name"], "alpha")
+                state = ConductorStateStore(tmp_dir).load_worker_state("alpha")
+                self.assertEqual(state["lifecycle_state"], "running")
+
+                invalid = run_state_client.request(socket_path, ["put-worker"])
+                self.assertEqual(invalid["exit_code"], 2)
+                self.assertIn("--worker-name", invalid["stderr"])
+                nested = run_state_client.request(socket_path, ["daemon"])
+                self.assertEqual(nested["exit_code"], 1)
+            finally:
+                server.shutdown()
+                server.server_close()
+            self.assertIsNone(run_state_client.request(socket_path + ".missing", ["timings"]))
+
+    def test_client_reports_a_dropped_reply_instead_of_rerunning_the_command(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            socket_path = str(Path(tmp_dir) / DAEMON_SOCKET_FILENAME)
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(socket_path)
+            listener.listen(1)
+
+            def drop_connection() -> None:
+                connection, _ = listener.accept()
+                connection.recv(65536)
+                connection.close()
+
+            thread = threading.Thread(target=drop_connection, daemon=True)
+            thread.start()
+            stderr = io.StringIO()
+            try:
+                with mock.patch.object(run_state_client.os, "execv") as execv, mock.patch.object(
+                    run_state_client.sys, "stderr", stderr
+                ):
+                    exit_code = run_state_client.main(["--state-dir", tmp_dir, "timings"])
+            finally:
+                thread.join(timeout=5)
+                listener.close()
+
+            self.assertEqual(exit_code, 1)
+            execv.assert_not_called()
+            self.assertIn("may have been applied", stderr.getvalue())
+
+            # The socket file outlives the listener; only a failed connect falls back.
+            self.assertIsNone(run_state_client.request(socket_path, ["timings"]))
+            with mock.patch.object(run_state_client.os, "execv") as execv:
+                execv.side_effect = SystemExit(0)
+                with self.assertRaises(SystemExit):
+                    run_state_client.main(["--state-dir", tmp_dir, "timings"])
+            self.assertEqual(
+                execv.call_args.args[1][1:],
+                [run_state_client.WRITER_PATH, "--state-dir", tmp_dir, "timings"],
+            )
+
+    def test_batch_applies_commands_in_order_and_refreshes_handoff_once(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            workspace = Path(tmp_dir) / "alpha"
+            workspace.mkdir()
+            commands = [
+                [
+                    "put-worker",
+                    "--worker-name",
+                    "alpha",
+                    "--lifecycle-state",
+                    "running",
+                    "--updated-by",
+                    "test",
+                    "--workspace",
+                    str(workspace),
+                ],
+                [
+                    "append-conductor-event",
+                    "--worker-name",
+                    "alpha",
+                    "--event-type",
+                    "worker.started",
+                    "--emitted-by",
+                    "supervisor",
+                ],
+                ["enqueue-wakeup", "--worker-name", "alpha", "--category", "notable"],
+                [
+                    "enqueue-wakeup",
+                    "--worker-name",
+                    "alpha",
+                    "--category",
+                    "notable",
+                    "--summary",
+                    "done",
+                ],
+            ]
+            lines = [json.dumps({"argv": argv}) + "\n" for argv in commands]
+            lines.insert(2, "not json\n")
+            output = io.StringIO()
+            with mock.patch.object(
+                run_state_writer,
+                "request_handoff_refresh",
+                wraps=run_state_writer.request_handoff_refresh,
+            ) as refresh:
+                exit_code = run_batch(tmp_dir, lines, output)
+
+            self.assertEqual(exit_code, 1)
+            self.assertEqual(refresh.call_count, 1)
+            results = [json.loads(line) for line in output.getvalue().splitlines()]
+            self.assertEqual([result["index"] for result in results], [0, 1, 2, 3, 4])
+            self.assertEqual([result["exit_code"] for result in results], [0, 0, 2, 2, 0])
+            self.assertIn("--summary", results[3]["stderr"])
+            self.assertEqual(json.loads(results[4]["stdout"])["summary"], "done")
+            handoff = (Path(tmp_dir) / "handoff.md").read_text(encoding="utf-8")
+            self.assertIn("alpha", handoff)
+
+            output = io.StringIO()
+            self.assertEqual(run_batch(tmp_dir, lines[2:], output, stop_on_error=True), 1)
+            self.assertEqual(len(output.getvalue().splitlines()), 1)
+
+
+    def test_handoff_refresh_coalesces_and_debounces_writers(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            handoff_md_file = Path(tmp_dir) / "handoff.md"
+            self.assertTrue(request_handoff_refresh(tmp_dir, interval_seconds=60))
+            first = handoff_md_file.read_text(encoding="utf-8")
+            self.assertNotIn("Last updated: not yet", first)
+
+            # Within the interval the write is only recorded as pending.
+            with mock.patch.object(run_state_writer.subprocess, "Popen") as popen:
+                self.assertFalse(request_handoff_refresh(tmp_dir, interval_seconds=60))
+                self.assertFalse(request_handoff_refresh(tmp_dir, interval_seconds=60))
+            popen.assert_called_once()
+            self.assertIn("flush-handoff", popen.call_args.args[0])
+            self.assertTrue(flush_handoff_refresh(tmp_dir))
+            self.assertFalse(flush_handoff_refresh(tmp_dir))
+
+            # A refresher that already rendered a writer's generation covers it.
+            stamp_file = Path(tmp_dir) / HANDOFF_REFRESH_STAMP_FILENAME
+            stamp = json.loads(stamp_file.read_text(encoding="utf-8"))
+            stamp["rendered_generation"] = stamp["generation"] + 1
+            stamp_file.write_text(json.dumps(stamp), encoding="utf-8")
+            self.assertFalse(request_handoff_refresh(tmp_dir, interval_seconds=0))
+
+            with mock.patch.dict("os.environ", {HANDOFF_REFRESH_INTERVAL_ENV: "0"}):
+                self.assertTrue(request_handoff_refresh(tmp_dir))
+
+    def test_deferred_handoff_refresh_is_rendered_after_the_interval(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            handoff_md_file = Path(tmp_dir) / "handoff.md"
+            workspace = Path(tmp_dir) / "alpha"
+            workspace.mkdir()
+            self.assertTrue(request_handoff_refresh(tmp_dir, interval_seconds=0.5))
+
+            store = ConductorStateStore(tmp_dir)
+            store.write_worker_state(
+                store.make_worker_state(
+                    worker_name="alpha",
+                    lifecycle_state="running",
+                    updated_by="test",
+                    workspace=str(workspace),
+                )
+            )
+            self.assertFalse(request_handoff_refresh(tmp_dir, interval_seconds=0.5))
+            self.assertNotIn("alpha", handoff_md_file.read_text(encoding="utf-8"))
+
+            deadline = time.monotonic() + 10
+            while "alpha" not in handoff_md_file.read_text(encoding="utf-8"):
+                self.assertLess(time.monotonic(), deadline, "deferred refresh never rendered")
+                time.sleep(0.05)
+            self.assertFalse(flush_handoff_refresh(tmp_dir))
+
 
 if __name__ == "__main__":
     unittest.main()
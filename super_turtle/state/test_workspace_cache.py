@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from super_turtle.state import workspace_cache
+from super_turtle.state.conductor_state import ConductorStateStore
+from super_turtle.state.workspace_cache import WorkspaceLivenessCache
+
+
+class WorkspaceLivenessCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.root = Path(tmp_dir.name)
+        self.state_dir = self.root / "state"
+        self.subturtles = self.root / "subturtles"
+        for name in ("alpha", "beta"):
+            (self.subturtles / name).mkdir(parents=True)
+        self.workspaces = {
+            "alpha": str(self.subturtles / "alpha"),
+            "beta": str(self.subturtles / "beta"),
+            "gone": str(self.subturtles / "gone"),
+        }
+
+    def _live(self, cache: WorkspaceLivenessCache, now: float) -> tuple[dict[str, bool], int]:
+        with mock.patch.object(Path, "exists", autospec=True, side_effect=Path.exists) as exists:
+            result = cache.live_workspaces(self.workspaces, now=now)
+        return result, exists.call_count
+
+    def test_cached_answers_skip_workspace_probes_until_parent_changes(self) -> None:
+        cache = WorkspaceLivenessCache(self.state_dir, ttl_seconds=60)
+        first, probes = self._live(cache, now=1000.0)
+        self.assertEqual(first, {"alpha": True, "beta": True, "gone": False})
+        self.assertEqual(probes, 3)
+
+        second, probes = self._live(WorkspaceLivenessCache(self.state_dir, ttl_seconds=60), now=1010.0)
+        self.assertEqual(second, first)
+        self.assertEqual(probes, 0)
+
+        shutil.rmtree(self.subturtles / "beta")
+        third, probes = self._live(cache, now=1020.0)
+        self.assertEqual(third, {"alpha": True, "beta": False, "gone": False})
+        self.assertEqual(probes, 3)
+
+    def test_ttl_expiry_and_stop_events_force_a_probe(self) -> None:
+        cache = WorkspaceLivenessCache(self.state_dir, ttl_seconds=60)
+        self._live(cache, now=1000.0)
+
+        _result, probes = self._live(cache, now=1100.0)
+        self.assertEqual(probes, 3)
+
+        ConductorStateStore(self.state_dir).append_event(
+            worker_name="alpha",
+            event_type="worker.stopped",
+            emitted_by="supervisor",
+            lifecycle_state="stopped",
+        )
+        _result, probes = self._live(cache, now=1101.0)
+        self.assertEqual(probes, 1)
+
+    def test_unchanged_refresh_does_not_rewrite_the_cache(self) -> None:
+        cache = WorkspaceLivenessCache(self.state_dir, ttl_seconds=60)
+        self._live(cache, now=1000.0)
+        written = cache.cache_path.read_bytes()
+
+        with mock.patch.object(
+            workspace_cache, "_atomic_write_json", wraps=workspace_cache._atomic_write_json
+        ) as write:
+            self._live(cache, now=1010.0)
+            ConductorStateStore(self.state_dir).append_event(
+                worker_name="alpha",
+                event_type="worker.checkpoint",
+                emitted_by="subturtle",
+            )
+            self._live(cache, now=1020.0)
+            self.assertEqual(write.call_count, 0)
+
+            shutil.rmtree(self.subturtles / "beta")
+            self._live(cache, now=1030.0)
+            self.assertEqual(write.call_count, 1)
+        self.assertNotEqual(cache.cache_path.read_bytes(), written)
+        self.assertEqual(list(cache.cache_path.parent.glob("*.tmp")), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
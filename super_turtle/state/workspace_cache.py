@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import copy
+import os
+import time
+from pathlib import Path
+from typing import Any, Mapping
+
+try:
+    from super_turtle.state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _exclusive_lock,
+        _load_record,
+    )
+except ModuleNotFoundError:
+    from state.conductor_state import (
+        ConductorStateStore,
+        _atomic_write_json,
+        _exclusive_lock,
+        _load_record,
+    )
+
+WORKSPACE_CACHE_FILENAME = "workspace_cache.json"
+WORKSPACE_CACHE_VERSION = 1
+WORKSPACE_CACHE_TTL_ENV = "SUPERTURTLE_WORKSPACE_CACHE_TTL_SECONDS"
+DEFAULT_WORKSPACE_CACHE_TTL_SECONDS = 60.0
+# When only the event cursor moved, the cache is rewritten once it trails by
+# this much; re-reading a shorter tail on the next refresh is cheaper.
+CURSOR_WRITE_THRESHOLD_BYTES = 64 * 1024
+# Events after which a worker's workspace is expected to move or vanish.
+INVALIDATING_EVENT_TYPES = frozenset(
+    {"worker.stopped", "worker.archived", "worker.cleanup_verified", "worker.started"}
+)
+
+
+def _empty_cache() -> dict[str, Any]:
+    return {
+        "version": WORKSPACE_CACHE_VERSION,
+        "events": {"inode": None, "offset": 0},
+        "entries": {},
+    }
+
+
+def _ttl_from_env() -> float:
+    raw = os.environ.get(WORKSPACE_CACHE_TTL_ENV, "").strip()
+    if not raw:
+        return DEFAULT_WORKSPACE_CACHE_TTL_SECONDS
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        return DEFAULT_WORKSPACE_CACHE_TTL_SECONDS
+
+
+class WorkspaceLivenessCache:
+    """Cached ``Path(workspace).exists()`` answers for handoff rendering.
+
+    An entry is reused while it is younger than the TTL and the workspace's
+    parent directory mtime is unchanged; SubTurtle workspaces share a parent,
+    and creating, archiving (``mv``) or deleting one bumps that mtime, so a
+    refresh costs one stat per parent instead of one per worker. Stop and
+    archive events in the log drop the affected worker's entry outright.
+    Refreshes update the cache under a lock and rewrite it (atomically) only
+    when an entry changed.
+    """
+
+    def __init__(self, state_dir: str | Path, *, ttl_seconds: float | None = None):
+        self.conductor = ConductorStateStore(state_dir)
+        self.cache_path = self.conductor.paths.base_dir / WORKSPACE_CACHE_FILENAME
+        self.ttl_seconds = _ttl_from_env() if ttl_seconds is None else ttl_seconds
+
+    def _load_cache(self) -> dict[str, Any]:
+        try:
+            loaded = _load_record(self.cache_path)
+        except (OSError, ValueError):
+            return _empty_cache()
+        if not isinstance(loaded, dict) or loaded.get("version") != WORKSPACE_CACHE_VERSION:
+            return _empty_cache()
+        return loaded
+
+    def _invalidate_from_events(self, cache: dict[str, Any]) -> None:
+        cursor = cache["events"]
+        stat_result = self.conductor.paths.events_jsonl_file.stat()
+        if cursor["inode"] != stat_result.st_ino or cursor["offset"] > stat_result.st_size:
+            cache.update(_empty_cache())
+            cache["events"]["inode"] = stat_result.st_ino
+            return
+        if cursor["offset"] == stat_result.st_size:
+            return
+
+        stale_workers: set[str] = set()
+        for offset, event in self.conductor.iter_events(cursor["offset"]):
+            cursor["offset"] = offset
+            if event.get("event_type") in INVALIDATING_EVENT_TYPES:
+                stale_workers.add(str(event.get("worker_name")))
+        if stale_workers:
+            cache["entries"] = {
+                workspace: entry
+                for workspace, entry in cache["entries"].items()
+                if entry.get("worker_name") not in stale_workers
+            }
+
+    def live_workspaces(
+        self,
+        workspaces: Mapping[str, str],
+        *,
+        now: float | None = None,
+    ) -> dict[str, bool]:
+        """Map worker name -> whether its workspace exists."""
+        if self.ttl_seconds <= 0:
+            return {worker_name: Path(workspace).exists() for worker_name, workspace in workspaces.items()}
+
+        now = time.time() if now is None else now
+        with _exclusive_lock(self.cache_path.with_suffix(".lock")):
+            cache = self._load_cache()
+            loaded = copy.deepcopy(cache)
+            self._invalidate_from_events(cache)
+            result = self._probe(cache, workspaces, now)
+            if cache["entries"] != loaded["entries"] or (
+                cache["events"]["inode"] != loaded["events"]["inode"]
+                or cache["events"]["offset"] - loaded["events"]["offset"]
+                >= CURSOR_WRITE_THRESHOLD_BYTES
+            ):
+                _atomic_write_json(self.cache_path, cache, shared=False)
+        return result
+
+    def _probe(
+        self, cache: dict[str, Any], workspaces: Mapping[str, str], now: float
+    ) -> dict[str, bool]:
+        entries = cache["entries"]
+        parent_mtimes: dict[str, int | None] = {}
+        result: dict[str, bool] = {}
+        for worker_name, workspace in workspaces.items():
+            parent = os.path.dirname(os.path.abspath(workspace))
+            if parent not in parent_mtimes:
+                try:
+                    parent_mtimes[parent] = os.stat(parent).st_mtime_ns
+                except OSError:
+                    parent_mtimes[parent] = None
+            parent_mtime_ns = parent_mtimes[parent]
+
+            entry = entries.get(workspace)
+            if (
+                entry is not None
+                and entry["worker_name"] == worker_name
+                and entry["parent_mtime_ns"] == parent_mtime_ns
+                and now - entry["checked_at"] < self.ttl_seconds
+            ):
+                result[worker_name] = entry["exists"]
+                continue
+
+            exists = parent_mtime_ns is not None and Path(workspace).exists()
+            entries[workspace] = {
+                "worker_name": worker_name,
+                "exists": exists,
+                "parent_mtime_ns": parent_mtime_ns,
+                "checked_at": now,
+            }
+            result[worker_name] = exists
+
+        requested = set(workspaces.values())
+        if len(entries) != len(requested):
+            cache["entries"] = {
+                workspace: entry for workspace, entry in entries.items() if workspace in requested
+            }
+        return result
+
+
+__all__ = [
+    "DEFAULT_WORKSPACE_CACHE_TTL_SECONDS",
+    "WORKSPACE_CACHE_FILENAME",
+    "WORKSPACE_CACHE_TTL_ENV",
+    "WorkspaceLivenessCache",
+]
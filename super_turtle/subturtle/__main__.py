@@ -1,9 +1,21 @@
 """CLI entrypoint for SubTurtle loop execution."""
 
 import argparse
+import os
+import signal
+import subprocess
+import sys
 from pathlib import Path
 
 from .loops import LOOP_TYPES, run_loop
+from .profiling import PROFILE_ENV, PROFILE_MODES
+from .worktrees import WORKTREE_ENV, WorktreePool
+
+
+def _exit_on_sigterm(signum: int, _frame: object) -> None:
+    # Agents run in their own process group, so a plain SIGTERM death would
+    # orphan them; unwinding lets the agent runner kill the group first.
+    raise SystemExit(128 + signum)
 
 
 def main() -> None:
@@ -34,9 +46,43 @@ def main() -> None:
         default=[],
         help="List of Claude Code skills to load (e.g. frontend testing)",
     )
+    parser.add_argument(
+        "--worktree",
+        action="store_true",
+        default=os.environ.get(WORKTREE_ENV, "").strip() not in ("", "0"),
+        help="Run agents in a pooled git worktree on branch subturtle/<name>",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILE_MODES,
+        help=(
+            "Profile each iteration (cpu: cProfile, memory: tracemalloc) into "
+            f"<state-dir>/profiles; defaults to ${PROFILE_ENV}"
+        ),
+    )
     args = parser.parse_args()
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    if args.profile:
+        os.environ[PROFILE_ENV] = args.profile
+
+    pool = WorktreePool(Path.cwd()) if args.worktree else None
+    if pool is not None:
+        worktree = pool.acquire(args.name, pid=os.getpid())
+        print(f"[subturtle:{args.name}] worktree: {worktree}")
 
-    run_loop(state_dir=Path(args.state_dir).resolve(), name=args.name, loop_type=args.type, skills=args.skills)
+    try:
+        run_loop(state_dir=Path(args.state_dir).resolve(), name=args.name, loop_type=args.type, skills=args.skills)
+    finally:
+        # Covers crashes, SIGTERM stops, and failed starts; `ctl stop` releases
+        # the lease of a worker that died without unwinding.
+        if pool is not None:
+            try:
+                pool.release(args.name)
+            except (subprocess.CalledProcessError, OSError) as error:
+                print(
+                    f"[subturtle:{args.name}] WARNING: failed to release worktree: {error}",
+                    file=sys.stderr,
+                )
 
 
 if __name__ == "__main__":
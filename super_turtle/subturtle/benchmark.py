@@ -0,0 +1,354 @@
+"""Measure SubTurtle loop orchestration overhead with stub agent CLIs.
+
+``python -m super_turtle.subturtle.benchmark`` runs each loop type in a
+throwaway git project with fake ``claude`` / ``codex`` executables on PATH.
+The stubs answer instantly (or after ``--latency-ms``) with a configurable
+volume of stream-json, so whatever time remains is the loop's own work.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager, redirect_stdout
+from pathlib import Path
+from typing import Any
+
+from . import gitmeta, loops, statefile
+from .subturtle_loop import agents
+from .subturtle_loop.agents import AGENT_USAGE_ENV
+
+try:
+    from super_turtle.state.conductor_state import ConductorStateStore
+except ModuleNotFoundError:
+    from state.conductor_state import ConductorStateStore
+
+AGENT_CALLS_PER_ITERATION = {"slow": 4, "yolo": 1, "yolo-codex": 1, "yolo-codex-spark": 1}
+BENCH_WORKER_NAME = "bench"
+# Loop-level costs, measured around the calls the loops make.
+TOP_LEVEL_SECTIONS = {
+    "stop_checks": (loops, "_should_stop"),
+    "prompt_budgeting": (loops, "_budgeted_phase_prompts"),
+    "checkpoint_write": (loops, "_record_checkpoint"),
+    "merge_queue": (loops, "_process_merge_queue"),
+    "tool_discovery": (agents, "_allowed_tools_arg"),
+}
+# Parts of ``checkpoint_write``.
+CHECKPOINT_SECTIONS = {
+    "git_head": (statefile, "git_head_sha"),
+    "git_metadata": (gitmeta, "checkpoint_git_metadata"),
+    "handoff_refresh": (statefile, "refresh_handoff"),
+    "conductor_append_event": (ConductorStateStore, "append_event"),
+    "conductor_update_worker_state": (ConductorStateStore, "update_worker_state"),
+}
+STATE_FILE_TEMPLATE = """# Current task
+
+Benchmark the loop driver <- current
+
+# End goal with specs
+
+Nothing; the agents are stubs.
+
+# Backlog
+
+- [ ] Benchmark the loop driver <- current
+"""
+
+_STUB_TEMPLATE = """#!/bin/sh
+# Benchmark stand-in for the {agent} CLI.
+case " $* " in
+  *" -p ok "*)
+    # claude tool-discovery probe
+    printf '%s\\n' '{{"type":"system","subtype":"init","tools":["Bash","Read"]}}'
+    exit 0 ;;
+esac
+for last in "$@"; do :; done
+if [ "$last" = "-p" ] || [ "$last" = "-" ]; then cat > /dev/null; fi
+{sleep}cat {output}
+calls=$(( $(cat {counter} 2>/dev/null || echo 0) + 1 ))
+echo "$calls" > {counter}
+if [ "$calls" -ge {stop_after} ]; then
+  printf '\\n## Loop Control\\nSTOP\\n' >> {state_file}
+fi
+"""
+
+
+def _filler(line_bytes: int) -> str:
+    return "x" * max(line_bytes - 80, 0)
+
+
+def agent_output(agent: str, lines: int, line_bytes: int) -> str:
+    """Return a stub's stream: ``lines`` progress events and a final result."""
+    filler = _filler(line_bytes)
+    if agent == "claude":
+        progress = {
+            "type": "assistant",
+            "message": {"content": [{"type": "text", "text": filler}]},
+        }
+        final = {
+            "type": "result",
+            "result": "Benchmark iteration done.",
+            "total_cost_usd": 0.001,
+            "usage": {"input_tokens": 100, "cache_read_input_tokens": 900, "output_tokens": 50},
+        }
+        events = [progress] * lines + [final]
+    else:
+        progress = {"type": "item.completed", "item": {"type": "reasoning", "text": filler}}
+        events = [progress] * lines + [
+            {"type": "item.completed", "item": {"type": "agent_message", "text": "done"}},
+            {
+                "type": "turn.completed",
+                "usage": {"input_tokens": 1000, "cached_input_tokens": 900, "output_tokens": 50},
+            },
+        ]
+    return "".join(json.dumps(event) + "\n" for event in events)
+
+
+def write_stub_agents(
+    bench_dir: Path,
+    state_file: Path,
+    stop_after: int,
+    *,
+    lines: int,
+    line_bytes: int,
+    latency_ms: float,
+) -> Path:
+    """Write stub ``claude``/``codex`` executables; returns their bin dir.
+
+    The stubs count their calls and write the STOP directive into
+    ``state_file`` on call ``stop_after``, which ends the loop cleanly.
+    """
+    bin_dir = bench_dir / "bin"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    counter = bench_dir / "calls"
+    sleep = f"sleep {latency_ms / 1000:.3f}\n" if latency_ms > 0 else ""
+    for agent in ("claude", "codex"):
+        output = bench_dir / f"{agent}.out"
+        output.write_text(agent_output(agent, lines, line_bytes), encoding="utf-8")
+        stub = bin_dir / agent
+        stub.write_text(
+            _STUB_TEMPLATE.format(
+                agent=agent,
+                sleep=sleep,
+                output=shlex.quote(str(output)),
+                counter=shlex.quote(str(counter)),
+                stop_after=stop_after,
+                state_file=shlex.quote(str(state_file)),
+            ),
+            encoding="utf-8",
+        )
+        stub.chmod(0o755)
+    return bin_dir
+
+
+class _SectionTimer:
+    """Accumulate wall time spent inside wrapped callables, by section."""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+
+    def wrap(self, section: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started_at = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds[section] = self.seconds.get(section, 0.0) + (
+                    time.perf_counter() - started_at
+                )
+                self.calls[section] = self.calls.get(section, 0) + 1
+
+        return timed
+
+
+@contextmanager
+def _patched(owner: Any, attribute: str, replacement: Any) -> Iterator[None]:
+    original = getattr(owner, attribute)
+    setattr(owner, attribute, replacement)
+    try:
+        yield
+    finally:
+        setattr(owner, attribute, original)
+
+
+@contextmanager
+def _environment(**overrides: str) -> Iterator[None]:
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _init_project(project_dir: Path) -> Path:
+    project_dir.mkdir(parents=True)
+    git_env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "bench",
+        "GIT_AUTHOR_EMAIL": "bench@example.com",
+        "GIT_COMMITTER_NAME": "bench",
+        "GIT_COMMITTER_EMAIL": "bench@example.com",
+    }
+    (project_dir / ".gitignore").write_text(".superturtle/\n", encoding="utf-8")
+    (project_dir / "README.md").write_text("benchmark project\n", encoding="utf-8")
+    for args in (["init", "-q"], ["add", "."], ["commit", "-q", "-m", "Initial commit"]):
+        subprocess.run(["git", *args], cwd=project_dir, check=True, env=git_env)
+    state_dir = project_dir / ".superturtle" / "subturtles" / BENCH_WORKER_NAME
+    state_dir.mkdir(parents=True)
+    (state_dir / "CLAUDE.md").write_text(STATE_FILE_TEMPLATE, encoding="utf-8")
+    return state_dir
+
+
+def _checkpoint_phase_seconds(project_dir: Path, phase: str) -> float:
+    # The loop already times its stats subprocess as a checkpoint phase.
+    store = ConductorStateStore(statefile.run_state_dir(project_dir))
+    seconds = 0.0
+    for _offset, event in store.iter_events():
+        if event.get("event_type") == "worker.checkpoint":
+            phases = (event.get("payload") or {}).get("timings", {}).get("phases", {})
+            seconds += float(phases.get(phase, 0.0))
+    return seconds
+
+
+def _per_iteration_ms(seconds: float, iterations: int) -> float:
+    return round(seconds / iterations * 1000, 3)
+
+
+def benchmark_loop(
+    loop_type: str,
+    *,
+    iterations: int = 5,
+    lines: int = 200,
+    line_bytes: int = 200,
+    latency_ms: float = 0.0,
+    work_dir: Path | None = None,
+) -> dict[str, Any]:
+    """Run ``iterations`` of ``loop_type`` against stub agents and report overhead.
+
+    ``overhead_ms`` is the per-iteration wall time outside agent calls;
+    ``sections_ms`` splits it by cause and ``unattributed_ms`` is the rest
+    (timers, prompt formatting, logging).
+    """
+    with tempfile.TemporaryDirectory(prefix="superturtle-loopbench-", dir=work_dir) as tmp:
+        bench_dir = Path(tmp)
+        project_dir = bench_dir / "project"
+        state_dir = _init_project(project_dir)
+        bin_dir = write_stub_agents(
+            bench_dir,
+            state_dir / "CLAUDE.md",
+            iterations * AGENT_CALLS_PER_ITERATION[loop_type],
+            lines=lines,
+            line_bytes=line_bytes,
+            latency_ms=latency_ms,
+        )
+        timer = _SectionTimer()
+        previous_cwd = Path.cwd()
+        with ExitStack() as stack:
+            stack.enter_context(
+                _environment(
+                    PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+                    **{AGENT_USAGE_ENV: "1"},
+                )
+            )
+            # Loops print plans and progress on stdout; keep it for the report.
+            stack.enter_context(redirect_stdout(sys.stderr))
+            stack.enter_context(_patched(loops, "_archive_workspace", lambda *_args: None))
+            sections = {**TOP_LEVEL_SECTIONS, **CHECKPOINT_SECTIONS}
+            sections["agent_calls"] = (agents, "_run_streaming")
+            for section, (owner, attribute) in sections.items():
+                wrapped = timer.wrap(section, getattr(owner, attribute))
+                stack.enter_context(_patched(owner, attribute, wrapped))
+            os.chdir(project_dir)
+            stack.callback(os.chdir, previous_cwd)
+            started_at = time.perf_counter()
+            loops.run_loop(state_dir, BENCH_WORKER_NAME, loop_type)
+            wall_seconds = time.perf_counter() - started_at
+        stats_seconds = _checkpoint_phase_seconds(project_dir, "stats")
+
+    agent_seconds = timer.seconds.get("agent_calls", 0.0)
+    overhead_seconds = wall_seconds - agent_seconds
+    top_level = {
+        section: _per_iteration_ms(timer.seconds.get(section, 0.0), iterations)
+        for section in TOP_LEVEL_SECTIONS
+    }
+    top_level["stats_script"] = _per_iteration_ms(stats_seconds, iterations)
+    return {
+        "loop_type": loop_type,
+        "iterations": iterations,
+        "agent_calls": timer.calls.get("agent_calls", 0),
+        "stream": {"lines": lines, "line_bytes": line_bytes, "latency_ms": latency_ms},
+        "wall_seconds": round(wall_seconds, 4),
+        "per_iteration": {
+            "total_ms": _per_iteration_ms(wall_seconds, iterations),
+            "agent_ms": _per_iteration_ms(agent_seconds, iterations),
+            "overhead_ms": _per_iteration_ms(overhead_seconds, iterations),
+            "sections_ms": top_level,
+            "checkpoint_sections_ms": {
+                section: _per_iteration_ms(timer.seconds.get(section, 0.0), iterations)
+                for section in CHECKPOINT_SECTIONS
+            },
+            "unattributed_ms": round(
+                _per_iteration_ms(overhead_seconds, iterations) - sum(top_level.values()), 3
+            ),
+        },
+    }
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="subturtle-benchmark",
+        description="Measure per-iteration loop overhead with stub claude/codex CLIs.",
+    )
+    parser.add_argument(
+        "--type",
+        dest="loop_types",
+        action="append",
+        choices=list(AGENT_CALLS_PER_ITERATION),
+        default=None,
+        help="Loop type to measure (repeatable; default: all).",
+    )
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument(
+        "--lines", type=int, default=200, help="Stream-json events per agent call."
+    )
+    parser.add_argument("--line-bytes", type=int, default=200, help="Approximate event size.")
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Stub delay before streaming."
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    results = [
+        benchmark_loop(
+            loop_type,
+            iterations=args.iterations,
+            lines=args.lines,
+            line_bytes=args.line_bytes,
+            latency_ms=args.latency_ms,
+        )
+        for loop_type in args.loop_types or list(AGENT_CALLS_PER_ITERATION)
+    ]
+    print(json.dumps({"loops": results}, sort_keys=True))
+    return 0
+
+
+__all__ = ["AGENT_CALLS_PER_ITERATION", "agent_output", "benchmark_loop", "write_stub_agents"]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,420 @@
+"""Fork-free git metadata for SubTurtle checkpoints."""
+
+from __future__ import annotations
+
+import atexit
+import difflib
+import subprocess
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+# Blobs larger than this are counted as changed files without line stats.
+MAX_DIFF_BLOB_BYTES = 256 * 1024
+MAX_DIFFSTAT_FILES = 20
+# Larger changes report file counts only; line counting reads every blob.
+MAX_LINE_COUNT_FILES = 200
+# History walked from HEAD looking for the previous checkpoint; a base that is
+# not found by then is treated as missing rather than diffed tree-to-tree.
+MAX_ANCESTRY_COMMITS = 1000
+# Requests written to cat-file before reading replies; keeps the request
+# side well under a pipe buffer so neither end can block the other.
+_BATCH_REQUESTS = 256
+_MAX_SYMREF_DEPTH = 5
+
+
+def find_git_dirs(project_dir: Path) -> tuple[Path, Path] | None:
+    """Return ``(git_dir, common_dir)`` for the repo containing ``project_dir``.
+
+    Linked worktrees keep HEAD in their own git dir but share refs and
+    packed-refs through the common dir.
+    """
+    for candidate in (project_dir, *project_dir.parents):
+        dot_git = candidate / ".git"
+        if dot_git.is_dir():
+            git_dir = dot_git
+        elif dot_git.is_file():
+            try:
+                pointer = dot_git.read_text(encoding="utf-8").strip()
+            except OSError:
+                return None
+            if not pointer.startswith("gitdir:"):
+                return None
+            git_dir = (candidate / pointer[len("gitdir:") :].strip()).resolve()
+        else:
+            continue
+        common_dir = git_dir
+        try:
+            common_pointer = (git_dir / "commondir").read_text(encoding="utf-8").strip()
+        except OSError:
+            common_pointer = ""
+        if common_pointer:
+            common_dir = (git_dir / common_pointer).resolve()
+        return git_dir, common_dir
+    return None
+
+
+def _packed_ref(common_dir: Path, ref: str) -> str | None:
+    try:
+        lines = (common_dir / "packed-refs").read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        if not line or line.startswith(("#", "^")):
+            continue
+        sha, _, name = line.partition(" ")
+        if name == ref:
+            return sha
+    return None
+
+
+def read_head_sha(project_dir: Path) -> str | None:
+    """Resolve HEAD from loose refs and packed-refs without running git."""
+    dirs = find_git_dirs(project_dir)
+    if dirs is None:
+        return None
+    git_dir, common_dir = dirs
+    try:
+        value = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+
+    for _ in range(_MAX_SYMREF_DEPTH):
+        if not value.startswith("ref:"):
+            return value if _looks_like_sha(value) else None
+        ref = value[len("ref:") :].strip()
+        # Per-worktree refs live in the worktree's git dir, branches and
+        # tags in the common dir.
+        for base in (git_dir, common_dir):
+            try:
+                value = (base / ref).read_text(encoding="utf-8").strip()
+                break
+            except OSError:
+                continue
+        else:
+            return _packed_ref(common_dir, ref)
+    return None
+
+
+def _looks_like_sha(value: str) -> bool:
+    return len(value) in {40, 64} and all(char in "0123456789abcdef" for char in value)
+
+
+class GitCatFile:
+    """Long-lived ``git cat-file --batch`` and ``--batch-check`` processes for a repository."""
+
+    def __init__(self, project_dir: Path):
+        self.project_dir = project_dir
+        self._processes: dict[str, subprocess.Popen[bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_process(self, option: str) -> subprocess.Popen[bytes]:
+        process = self._processes.get(option)
+        if process is None or process.poll() is not None:
+            process = self._processes[option] = subprocess.Popen(
+                ["git", "cat-file", option],
+                cwd=self.project_dir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return process
+
+    def _request(
+        self, option: str, names: Iterable[str], with_content: bool
+    ) -> list[tuple[str, int, bytes] | None]:
+        names = list(names)
+        results: list[tuple[str, int, bytes] | None] = []
+        with self._lock:
+            process = self._ensure_process(option)
+            assert process.stdin is not None and process.stdout is not None
+            try:
+                for start in range(0, len(names), _BATCH_REQUESTS):
+                    chunk = names[start : start + _BATCH_REQUESTS]
+                    process.stdin.write("".join(f"{name}\n" for name in chunk).encode("utf-8"))
+                    process.stdin.flush()
+                    for _name in chunk:
+                        header = process.stdout.readline().decode("utf-8").split()
+                        if len(header) != 3:
+                            results.append(None)
+                            continue
+                        size = int(header[2])
+                        content = b""
+                        if with_content:
+                            content = process.stdout.read(size)
+                            process.stdout.read(1)
+                        results.append((header[1], size, content))
+            except (BrokenPipeError, ValueError):
+                self.close_locked()
+                raise OSError(f"git cat-file {option} exited unexpectedly") from None
+        return results
+
+    def read_objects(self, names: Iterable[str]) -> list[tuple[str, bytes] | None]:
+        """Return ``(type, content)`` per name, or None for missing objects."""
+        return [
+            (result[0], result[2]) if result else None
+            for result in self._request("--batch", names, with_content=True)
+        ]
+
+    def read_sizes(self, names: Iterable[str]) -> list[int | None]:
+        """Return each object's size without reading it, or None when missing."""
+        return [
+            result[1] if result else None
+            for result in self._request("--batch-check", names, with_content=False)
+        ]
+
+    def close_locked(self) -> None:
+        processes, self._processes = list(self._processes.values()), {}
+        for process in processes:
+            if process.stdin is not None:
+                process.stdin.close()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def close(self) -> None:
+        with self._lock:
+            self.close_locked()
+
+
+_CAT_FILES: dict[Path, GitCatFile] = {}
+_CAT_FILES_LOCK = threading.Lock()
+
+
+def cat_file_for(project_dir: Path) -> GitCatFile:
+    key = project_dir.resolve()
+    with _CAT_FILES_LOCK:
+        cat_file = _CAT_FILES.get(key)
+        if cat_file is None:
+            cat_file = _CAT_FILES[key] = GitCatFile(key)
+        return cat_file
+
+
+@atexit.register
+def close_all() -> None:
+    with _CAT_FILES_LOCK:
+        cat_files = list(_CAT_FILES.values())
+        _CAT_FILES.clear()
+    for cat_file in cat_files:
+        cat_file.close()
+
+
+def _parse_commit(content: bytes) -> dict[str, Any]:
+    headers, _, message = content.partition(b"\n\n")
+    tree = None
+    parents: list[str] = []
+    for line in headers.decode("utf-8", "replace").splitlines():
+        key, _, value = line.partition(" ")
+        if key == "tree":
+            tree = value
+        elif key == "parent":
+            parents.append(value)
+    subject = message.decode("utf-8", "replace").strip().splitlines()
+    return {"tree": tree, "parents": parents, "subject": subject[0] if subject else ""}
+
+
+def _parse_tree(content: bytes, sha_bytes: int) -> dict[str, tuple[str, str]]:
+    entries: dict[str, tuple[str, str]] = {}
+    position = 0
+    while position < len(content):
+        space = content.index(b" ", position)
+        nul = content.index(b"\0", space)
+        mode = content[position:space].decode("ascii")
+        name = content[space + 1 : nul].decode("utf-8", "surrogateescape")
+        sha = content[nul + 1 : nul + 1 + sha_bytes].hex()
+        entries[name] = (mode, sha)
+        position = nul + 1 + sha_bytes
+    return entries
+
+
+def _is_tree(mode: str) -> bool:
+    return mode == "40000"
+
+
+def _changed_paths(
+    cat_file: GitCatFile,
+    old_tree: str | None,
+    new_tree: str,
+    sha_bytes: int,
+) -> list[tuple[str, str | None, str | None]]:
+    # Breadth-first tree diff; each level is one batched round trip.
+    changed: list[tuple[str, str | None, str | None]] = []
+    level: list[tuple[str, str | None, str | None]] = [("", old_tree, new_tree)]
+    while level:
+        names = [sha for _prefix, old, new in level for sha in (old, new) if sha]
+        objects = dict(zip(names, cat_file.read_objects(names)))
+        next_level: list[tuple[str, str | None, str | None]] = []
+        for prefix, old, new in level:
+            old_entries = _parse_tree(objects[old][1], sha_bytes) if old and objects.get(old) else {}
+            new_entries = _parse_tree(objects[new][1], sha_bytes) if new and objects.get(new) else {}
+            for name in sorted(set(old_entries) | set(new_entries)):
+                old_mode, old_sha = old_entries.get(name, (None, None))
+                new_mode, new_sha = new_entries.get(name, (None, None))
+                if old_sha == new_sha and old_mode == new_mode:
+                    continue
+                path = f"{prefix}{name}"
+                old_is_tree = old_mode is not None and _is_tree(old_mode)
+                new_is_tree = new_mode is not None and _is_tree(new_mode)
+                if old_is_tree or new_is_tree:
+                    next_level.append(
+                        (f"{path}/", old_sha if old_is_tree else None, new_sha if new_is_tree else None)
+                    )
+                if not old_is_tree or not new_is_tree:
+                    blob_old = old_sha if old_mode is not None and not old_is_tree else None
+                    blob_new = new_sha if new_mode is not None and not new_is_tree else None
+                    if blob_old or blob_new:
+                        changed.append((path, blob_old, blob_new))
+        level = next_level
+    return changed
+
+
+def _line_counts(old: bytes, new: bytes) -> tuple[int, int] | None:
+    if b"\0" in old[:8000] or b"\0" in new[:8000]:
+        return None
+    old_lines = old.decode("utf-8", "replace").splitlines()
+    new_lines = new.decode("utf-8", "replace").splitlines()
+    # Trim the shared head and tail first; SequenceMatcher is quadratic in
+    # the worst case and typical edits touch a small window of a file.
+    prefix = 0
+    limit = min(len(old_lines), len(new_lines))
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and old_lines[len(old_lines) - 1 - suffix] == new_lines[len(new_lines) - 1 - suffix]
+    ):
+        suffix += 1
+    old_lines = old_lines[prefix : len(old_lines) - suffix]
+    new_lines = new_lines[prefix : len(new_lines) - suffix]
+    insertions = deletions = 0
+    matcher = difflib.SequenceMatcher(a=old_lines, b=new_lines, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag in {"replace", "delete"}:
+            deletions += old_end - old_start
+        if tag in {"replace", "insert"}:
+            insertions += new_end - new_start
+    return insertions, deletions
+
+
+def _reaches(cat_file: GitCatFile, descendant_info: dict[str, Any], ancestor: str) -> bool:
+    # Breadth-first over parents, one cat-file batch per generation.
+    seen: set[str] = set()
+    frontier = list(descendant_info["parents"])
+    while frontier and len(seen) < MAX_ANCESTRY_COMMITS:
+        if ancestor in frontier:
+            return True
+        seen.update(frontier)
+        parents: list[str] = []
+        for commit in cat_file.read_objects(frontier):
+            if commit and commit[0] == "commit":
+                parents.extend(
+                    parent for parent in _parse_commit(commit[1])["parents"] if parent not in seen
+                )
+        frontier = list(dict.fromkeys(parents))
+    return False
+
+
+def diffstat(
+    project_dir: Path,
+    new_commit: str,
+    old_commit: str | None = None,
+) -> dict[str, Any] | None:
+    """Summarize ``old_commit..new_commit`` (default: against the first parent).
+
+    An ``old_commit`` that is missing (gc'd) or not an ancestor of
+    ``new_commit`` (rewritten history) yields ``base_missing`` and no file
+    stats instead of a diff of the whole tree.
+    """
+    cat_file = cat_file_for(project_dir)
+    sha_bytes = len(new_commit) // 2
+    commits = cat_file.read_objects([name for name in (new_commit, old_commit) if name])
+    if not commits[0] or commits[0][0] != "commit":
+        return None
+    new_info = _parse_commit(commits[0][1])
+    if old_commit is None:
+        old_commit = new_info["parents"][0] if new_info["parents"] else None
+        old_info = None
+        if old_commit is not None:
+            parent = cat_file.read_objects([old_commit])[0]
+            old_info = _parse_commit(parent[1]) if parent and parent[0] == "commit" else None
+    else:
+        old_info = _parse_commit(commits[1][1]) if commits[1] and commits[1][0] == "commit" else None
+        if old_info is None or not _reaches(cat_file, new_info, old_commit):
+            return {"base_sha": old_commit, "base_missing": True, "subject": new_info["subject"]}
+
+    changed = _changed_paths(
+        cat_file,
+        old_info["tree"] if old_info else None,
+        new_info["tree"],
+        sha_bytes,
+    )
+    blob_names = [sha for _path, old_sha, new_sha in changed for sha in (old_sha, new_sha) if sha]
+    blobs: dict[str, bytes] = {}
+    if len(changed) <= MAX_LINE_COUNT_FILES:
+        # Size-check first so oversized blobs are never read off the pipe.
+        blob_names = [
+            sha
+            for sha, size in zip(blob_names, cat_file.read_sizes(blob_names))
+            if size is not None and size <= MAX_DIFF_BLOB_BYTES
+        ]
+        for sha, blob in zip(blob_names, cat_file.read_objects(blob_names)):
+            if blob:
+                blobs[sha] = blob[1]
+
+    insertions = deletions = 0
+    files: list[dict[str, Any]] = []
+    for path, old_sha, new_sha in changed:
+        counts = None
+        if (old_sha is None or old_sha in blobs) and (new_sha is None or new_sha in blobs):
+            counts = _line_counts(blobs.get(old_sha or "", b""), blobs.get(new_sha or "", b""))
+        if counts is not None:
+            insertions += counts[0]
+            deletions += counts[1]
+        if len(files) < MAX_DIFFSTAT_FILES:
+            entry: dict[str, Any] = {"path": path}
+            if counts is not None:
+                entry["insertions"], entry["deletions"] = counts
+            else:
+                entry["binary_or_large"] = True
+            files.append(entry)
+
+    return {
+        "base_sha": old_commit,
+        "subject": new_info["subject"],
+        "files_changed": len(changed),
+        "insertions": insertions,
+        "deletions": deletions,
+        "files": files,
+    }
+
+
+def checkpoint_git_metadata(
+    project_dir: Path,
+    head_sha: str,
+    previous_head_sha: str | None = None,
+) -> dict[str, Any] | None:
+    """Return commit subject and diffstat for the commits since the last checkpoint."""
+    if previous_head_sha == head_sha:
+        return {"commits_since_checkpoint": False}
+    try:
+        stats = diffstat(project_dir, head_sha, previous_head_sha)
+    except (OSError, ValueError):
+        return None
+    if stats is None:
+        return None
+    return {"commits_since_checkpoint": True, **stats}
+
+
+__all__ = [
+    "GitCatFile",
+    "cat_file_for",
+    "checkpoint_git_metadata",
+    "close_all",
+    "diffstat",
+    "find_git_dirs",
+    "read_head_sha",
+]
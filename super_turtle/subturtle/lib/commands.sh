@@ -159,6 +159,23 @@ skills_to_json() {
   printf '%s\n' "$@" | "$PYTHON" -c 'import json, sys; print(json.dumps([line.strip() for line in sys.stdin if line.strip()]))' 2>/dev/null || echo '[]'
 }
 
+release_worktree() {
+  local name="$1"
+  [[ -d "${PROJECT_DIR}/.superturtle/worktrees" ]] || return 0
+
+  "$PYTHON" - "$PROJECT_DIR" "$name" <<'PY' || echo "[subturtle:${name}] WARNING: failed to release worktree" >&2
+import sys
+from pathlib import Path
+
+try:
+    from super_turtle.subturtle.worktrees import WorktreePool
+except ModuleNotFoundError:
+    from subturtle.worktrees import WorktreePool
+
+WorktreePool(Path(sys.argv[1])).release(sys.argv[2])
+PY
+}
+
 finalize_stop_and_archive() {
   local name="$1"
   local run_status="$2"
@@ -173,6 +190,8 @@ finalize_stop_and_archive() {
   append_conductor_event "$name" "worker.stopped" "supervisor" "stopped" "{\"reason\":\"${stop_reason}\"}" || true
   write_conductor_worker_state "$name" "stopped" "supervisor" "$stop_reason" "" "$stopped_at" || true
   rm -f "$(pid_file "$name")"
+  # A killed worker never unwinds, so its worktree lease is released here.
+  release_worktree "$name"
   do_archive "$name"
 }
 
@@ -188,6 +207,7 @@ do_start() {
       --timeout) timeout_str="${2:?missing timeout value}"; shift 2 ;;
       --type)    loop_type="${2:?missing type value}"; shift 2 ;;
       --skill)   skills+=("${2:?missing skill name}"); shift 2 ;;
+      --worktree) export SUPERTURTLE_WORKTREE=1; shift ;;
       *) echo "Unknown option: $1" >&2; exit 1 ;;
     esac
   done
@@ -578,6 +598,7 @@ do_spawn() {
   local loop_type="yolo-codex"
   local cron_interval="10m"
   local state_file=""
+  local worktree=0
   local -a skills=()
 
   shift || true
@@ -588,6 +609,7 @@ do_spawn() {
       --state-file) state_file="${2:?missing state file path}"; shift 2 ;;
       --cron-interval) cron_interval="${2:?missing cron interval}"; shift 2 ;;
       --skill)   skills+=("${2:?missing skill name}"); shift 2 ;;
+      --worktree) worktree=1; shift ;;
       *) echo "Unknown option: $1" >&2; exit 1 ;;
     esac
   done
@@ -637,6 +659,9 @@ do_spawn() {
       start_args+=(--skill "$skill")
     done
   fi
+  if (( worktree )); then
+    start_args+=(--worktree)
+  fi
   do_start "${start_args[@]}"
 
   local cron_job_id
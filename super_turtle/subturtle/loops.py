@@ -7,12 +7,21 @@ import shutil
 import subprocess
 import sys
 import time
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-
-from . import prompts
-from . import statefile
-from .subturtle_loop.agents import Claude, Codex
+from typing import Any
+
+from . import mergequeue, prompts, statefile, worktrees
+from .profiling import IterationProfiler, profiled_iteration
+from .subturtle_loop.agents import (
+    AgentTimeout,
+    Claude,
+    Codex,
+    prompt_transport,
+    usage_budgets_from_env,
+)
+from .subturtle_loop.resources import limits_from_env, merge_resources
 
 # Package root (super_turtle/), used for resolving skills directory.
 _SUPER_TURTLE_DIR = os.environ.get(
@@ -25,16 +34,271 @@ STATS_SCRIPT = Path(__file__).resolve().parent / "claude-md-guard" / "stats.sh"
 RETRY_DELAY = 10  # seconds to wait after an agent crash before retrying
 MAX_CONSECUTIVE_FAILURES = 5
 MAX_FAILURES_MESSAGE = "max consecutive failures reached"
+USAGE_BUDGET_ERROR_TYPE = "UsageBudgetExceeded"
+# Full planner output, written next to CLAUDE.md when a phase gets a trimmed plan.
+PLAN_FILENAME = "PLAN.md"
 LoopExecutor = Callable[[str], str]
 
+_record_agent_timeout = statefile.record_agent_timeout
 _record_checkpoint = statefile.record_checkpoint
 _record_completion_pending = statefile.record_completion_pending
 _record_failure_pending = statefile.record_failure_pending
+_worker_usage_totals = statefile.worker_usage_totals
 _record_fatal_error = statefile.record_fatal_error
 _resolve_state_ref = statefile.resolve_state_ref
 _should_stop = statefile.should_stop
 
 
+class IterationTimer:
+    """Accumulate monotonic phase timings between two successful checkpoints.
+
+    Failed attempts are folded into retry totals so the per-phase numbers only
+    describe the attempt that produced the checkpoint.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._started_at = clock()
+        self.phases: dict[str, float] = {}
+        self.retries = 0
+        self.failed_attempt_seconds = 0.0
+        self.retry_sleep_seconds = 0.0
+        self.last_checkpoint_write_seconds: float | None = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time one phase of the current attempt."""
+        started_at = self._clock()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (self._clock() - started_at)
+
+    @contextmanager
+    def retry(self) -> Iterator[None]:
+        """Discard the failed attempt's phases and time the retry backoff."""
+        self.retries += 1
+        self.failed_attempt_seconds += sum(self.phases.values())
+        self.phases = {}
+        started_at = self._clock()
+        try:
+            yield
+        finally:
+            self.retry_sleep_seconds += self._clock() - started_at
+
+    def as_payload(self) -> dict[str, Any]:
+        """Return the JSON-ready ``timings`` block for a checkpoint."""
+        payload: dict[str, Any] = {
+            "clock": "monotonic",
+            "total_seconds": round(self._clock() - self._started_at, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "retries": self.retries,
+            "failed_attempt_seconds": round(self.failed_attempt_seconds, 6),
+            "retry_sleep_seconds": round(self.retry_sleep_seconds, 6),
+        }
+        if self.last_checkpoint_write_seconds is not None:
+            payload["last_checkpoint_write_seconds"] = round(
+                self.last_checkpoint_write_seconds, 6
+            )
+        return payload
+
+
+class _PhaseMeter:
+    """Base for meters that file agent-hook reports under the current loop phase."""
+
+    def __init__(self) -> None:
+        self._phase: str | None = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        previous, self._phase = self._phase, name
+        try:
+            yield
+        finally:
+            self._phase = previous
+
+
+class UsageMeter(_PhaseMeter):
+    """Sum agent-reported token usage and cost between two checkpoints.
+
+    Pass ``record`` as an agent's ``on_usage`` hook. Usage is only reported
+    when ``SUPERTURTLE_AGENT_USAGE`` or a worker budget switches agents to
+    JSON output.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.agents: dict[str, dict[str, int | float]] = {}
+        self.phases: dict[str, dict[str, int | float]] = {}
+
+    def record(self, agent: str, usage: dict[str, int | float]) -> None:
+        _add_usage(self.agents.setdefault(agent, {}), usage)
+        _add_usage(self.phases.setdefault(self._phase or agent, {}), usage)
+
+    def reset(self) -> None:
+        self.agents = {}
+        self.phases = {}
+
+    def as_payload(self) -> dict[str, Any] | None:
+        """Return the checkpoint ``usage`` block, or None when nothing was reported."""
+        if not self.agents:
+            return None
+        totals: dict[str, int | float] = {}
+        for usage in self.agents.values():
+            _add_usage(totals, usage)
+        input_tokens = totals.get("input_tokens", 0)
+        return {
+            "agents": {agent: dict(usage) for agent, usage in self.agents.items()},
+            "phases": {phase: dict(usage) for phase, usage in self.phases.items()},
+            "totals": totals,
+            "cached_input_ratio": round(totals.get("cached_input_tokens", 0) / input_tokens, 4)
+            if input_tokens
+            else 0.0,
+        }
+
+
+def _add_usage(totals: dict[str, int | float], usage: dict[str, int | float]) -> None:
+    for key, value in usage.items():
+        total = totals.get(key, 0) + value
+        totals[key] = round(total, 6) if isinstance(total, float) else total
+
+
+class ResourceMeter(_PhaseMeter):
+    """Aggregate per-call agent rusage by loop phase between two checkpoints.
+
+    Pass ``record`` as an agent's ``on_resources`` hook and wrap agent calls
+    in ``phase()``; calls outside a phase are filed under the agent name.
+    Failed attempts are kept, since their CPU was spent all the same.
+    """
+
+    def __init__(self, limits: dict[str, float] | None = None) -> None:
+        super().__init__()
+        self.limits = limits or {}
+        self.phases: dict[str, dict[str, Any]] = {}
+
+    def record(self, agent: str, resources: dict[str, Any]) -> None:
+        totals = self.phases.setdefault(self._phase or agent, {"calls": 0})
+        totals["calls"] += 1
+        merge_resources(totals, resources)
+
+    def reset(self) -> None:
+        self.phases = {}
+
+    def as_payload(self) -> dict[str, Any] | None:
+        """Return the checkpoint ``resources`` block, or None when no call finished."""
+        if not self.phases:
+            return None
+        totals: dict[str, Any] = {}
+        for phase_totals in self.phases.values():
+            merge_resources(totals, phase_totals)
+        payload: dict[str, Any] = {
+            "phases": {name: dict(phase) for name, phase in self.phases.items()},
+            "totals": totals,
+        }
+        if self.limits:
+            payload["limits"] = dict(self.limits)
+        return payload
+
+
+@contextmanager
+def _metered_phase(name: str, timer: IterationTimer, *meters: _PhaseMeter) -> Iterator[None]:
+    """Attribute one loop phase's wall time, tokens and rusage to ``name``."""
+    with timer.phase(name), ExitStack() as stack:
+        for meter in meters:
+            stack.enter_context(meter.phase(name))
+        yield
+
+
+def _checkpoint_with_timings(
+    state_dir: Path,
+    name: str,
+    project_dir: Path,
+    loop_type: str,
+    iteration: int,
+    timer: IterationTimer,
+    extra_details: dict[str, Any] | None = None,
+) -> IterationTimer:
+    """Record a checkpoint carrying ``timer`` and return the next iteration's timer.
+
+    The conductor write cannot time itself into its own payload, so its duration
+    is carried into the following checkpoint as ``last_checkpoint_write_seconds``.
+    Non-empty ``extra_details`` blocks (prompt sizes, usage, resources) ride along.
+    """
+    details: dict[str, Any] = {"timings": timer.as_payload()}
+    if extra_details:
+        details.update({key: value for key, value in extra_details.items() if value})
+    write_started_at = time.monotonic()
+    _record_checkpoint(
+        state_dir,
+        name,
+        project_dir,
+        loop_type,
+        iteration,
+        details=details,
+    )
+    next_timer = IterationTimer()
+    next_timer.last_checkpoint_write_seconds = time.monotonic() - write_started_at
+    _process_merge_queue(name, project_dir)
+    return next_timer
+
+
+def _process_merge_queue(name: str, project_dir: Path) -> None:
+    """Land checkpointed worktree commits when a merge target is configured."""
+    try:
+        result = mergequeue.process_merge_queue(project_dir, statefile.run_state_dir(project_dir))
+    except (subprocess.CalledProcessError, OSError, ValueError, RuntimeError) as error:
+        print(f"[subturtle:{name}] WARNING: merge queue failed: {error}", file=sys.stderr)
+        return
+    if result and result.get("target_checkout"):
+        print(
+            f"[subturtle:{name}] WARNING: merge queue target is checked out at "
+            f"{result['target_checkout']}; nothing was merged",
+            file=sys.stderr,
+        )
+    elif result and result["merged"]:
+        merged = ", ".join(result["merged"])
+        print(f"[subturtle:{name}] merge queue landed: {merged}")
+
+
+def _prompt_record(prompt: str) -> dict[str, Any]:
+    """Return the checkpoint size record for one prompt as sent."""
+    return {**prompts.prompt_size(prompt), "transport": prompt_transport(prompt)}
+
+
+def _budgeted_phase_prompts(
+    prompt_bundle: dict[str, str],
+    plan: str,
+    stats: str,
+    state_dir: Path,
+    state_ref: str,
+) -> tuple[dict[str, str], dict[str, Any]]:
+    """Render the plan-bearing slow-loop prompts within their plan budgets.
+
+    Returns the prompts and their size records. When any phase gets a trimmed
+    plan, the full plan is written to ``PLAN.md`` beside the state file and
+    the trimmed copy points there.
+    """
+    plan_ref = str(Path(state_ref).with_name(PLAN_FILENAME))
+    rendered: dict[str, str] = {}
+    sizes: dict[str, Any] = {}
+    trimmed = False
+    for phase in ("groomer", "executor", "reviewer"):
+        phase_plan = prompts.compress_plan(plan, prompts.plan_token_budget(phase), plan_ref)
+        trimmed = trimmed or phase_plan != plan
+        fields = {"plan": phase_plan, "stats": stats} if phase == "groomer" else {"plan": phase_plan}
+        rendered[phase] = prompt_bundle[phase].format(**fields)
+        sizes[phase] = {
+            **_prompt_record(rendered[phase]),
+            "static_prefix_chars": len(prompts.static_prefix(prompt_bundle[phase])),
+            "plan_chars": len(phase_plan),
+        }
+    if trimmed:
+        (state_dir / PLAN_FILENAME).write_text(plan, encoding="utf-8")
+    else:
+        (state_dir / PLAN_FILENAME).unlink(missing_ok=True)
+    return rendered, sizes
+
+
 def _require_cli(name: str, cli_name: str) -> None:
     """Exit with a clear error when a required CLI is missing from PATH."""
     if shutil.which(cli_name) is not None:
@@ -49,6 +313,8 @@ def _require_cli(name: str, cli_name: str) -> None:
 
 def _agent_error_detail(error: subprocess.CalledProcessError | OSError) -> str:
     """Return a compact description for a subprocess or launch failure."""
+    if isinstance(error, AgentTimeout):
+        return f"{error.kind} timeout after {error.elapsed_seconds:.0f}s"
     if isinstance(error, subprocess.CalledProcessError):
         return f"exit {error.returncode}"
     return f"{type(error).__name__}: {error}"
@@ -72,6 +338,19 @@ def _handle_agent_failure(
     consecutive_failures: int,
 ) -> tuple[int, bool]:
     """Track consecutive failures and decide whether the loop must stop."""
+    if isinstance(error, AgentTimeout):
+        _record_agent_timeout(
+            state_dir,
+            name,
+            project_dir,
+            loop_type,
+            {
+                "timeout_kind": error.kind,
+                "limit_seconds": error.limit_seconds,
+                "elapsed_seconds": round(error.elapsed_seconds, 3),
+                "command": Path(str(error.cmd[0])).name if error.cmd else None,
+            },
+        )
     consecutive_failures += 1
     if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
         print(
@@ -94,6 +373,33 @@ def _handle_agent_failure(
     return consecutive_failures, False
 
 
+def _usage_budget_exceeded(state_dir: Path, name: str, project_dir: Path, loop_type: str) -> bool:
+    """Stop the worker via failure_pending once its running usage reaches a budget."""
+    budgets = usage_budgets_from_env()
+    if not budgets:
+        return False
+    totals = _worker_usage_totals(project_dir, name)
+    spent = {
+        "tokens": totals.get("input_tokens", 0) + totals.get("output_tokens", 0),
+        "cost_usd": totals.get("cost_usd", 0.0),
+    }
+    for key, budget in budgets.items():
+        if spent[key] < budget:
+            continue
+        message = f"{key} budget exhausted: spent {spent[key]:g} of {budget:g}"
+        print(f"[subturtle:{name}] FATAL: {message}; stopping loop", file=sys.stderr)
+        _record_failure_pending(
+            state_dir,
+            name,
+            project_dir,
+            loop_type,
+            message,
+            error_type=USAGE_BUDGET_ERROR_TYPE,
+        )
+        return True
+    return False
+
+
 def _archive_workspace(state_dir: Path, name: str) -> None:
     """Finalize a self-stopped SubTurtle workspace via ctl stop."""
     ctl_path = Path(__file__).resolve().with_name("ctl")
@@ -130,6 +436,20 @@ def _skill_dirs(skills: list[str]) -> list[str]:
     return [_SKILLS_DIR] if skills else []
 
 
+def _agent_dir(name: str) -> Path:
+    """Return the worktree leased to this SubTurtle, or the project directory."""
+    project_dir = Path.cwd()
+    return worktrees.leased_worktree(project_dir, name) or project_dir
+
+
+def _agent_add_dirs(state_dir: Path, name: str, skills: list[str]) -> list[str]:
+    """Return extra dirs agents may touch; a worktree agent also needs its state."""
+    add_dirs = _skill_dirs(skills)
+    if _agent_dir(name) != Path.cwd():
+        add_dirs.append(str(state_dir))
+    return add_dirs
+
+
 def _log_loop_start(
     name: str,
     loop_description: str,
@@ -166,14 +486,23 @@ def _run_single_agent_loop(
     loop_description: str,
     skills: list[str],
     execute_iteration: LoopExecutor,
+    usage_meter: UsageMeter | None = None,
+    resource_meter: ResourceMeter | None = None,
 ) -> None:
     """Run the shared retry/checkpoint loop used by single-agent variants."""
-    state_file, state_ref = _resolve_state_ref(state_dir, name)
+    state_file, state_ref = _resolve_state_ref(state_dir, name, _agent_dir(name))
     prompt = prompts.YOLO_PROMPT.format(state_file=state_ref)
+    prompt_sizes = {"phases": {"yolo": _prompt_record(prompt)}}
+    if usage_meter is None:
+        usage_meter = UsageMeter()
+    if resource_meter is None:
+        resource_meter = ResourceMeter()
     project_dir = Path.cwd()
     iteration = 0
     consecutive_failures = 0
     stopped_by_directive = False
+    timer = IterationTimer()
+    profiler = IterationProfiler.from_env(state_dir)
 
     _log_loop_start(name, loop_description, state_ref, skills)
 
@@ -184,18 +513,38 @@ def _run_single_agent_loop(
         iteration += 1
         print(f"[subturtle:{name}] === {loop_type} iteration {iteration} ===")
         try:
-            execute_iteration(prompt)
-            _record_checkpoint(state_dir, name, project_dir, loop_type, iteration)
+            with profiled_iteration(profiler, iteration) as profile:
+                with _metered_phase("yolo", timer, usage_meter, resource_meter):
+                    execute_iteration(prompt)
+                timer = _checkpoint_with_timings(
+                    state_dir,
+                    name,
+                    project_dir,
+                    loop_type,
+                    iteration,
+                    timer,
+                    {
+                        "prompts": prompt_sizes,
+                        "usage": usage_meter.as_payload(),
+                        "resources": resource_meter.as_payload(),
+                        "profile": profile,
+                    },
+                )
+            usage_meter.reset()
+            resource_meter.reset()
             consecutive_failures = 0
+            if _usage_budget_exceeded(state_dir, name, project_dir, loop_type):
+                break
         except (subprocess.CalledProcessError, OSError) as error:
-            consecutive_failures, should_stop = _handle_agent_failure(
-                state_dir,
-                name,
-                project_dir,
-                loop_type,
-                error,
-                consecutive_failures,
-            )
+            with timer.retry():
+                consecutive_failures, should_stop = _handle_agent_failure(
+                    state_dir,
+                    name,
+                    project_dir,
+                    loop_type,
+                    error,
+                    consecutive_failures,
+                )
             if should_stop:
                 break
 
@@ -213,18 +562,30 @@ def run_slow_loop(state_dir: Path, name: str, skills: list[str] | None = None) -
     _require_cli(name, "claude")
     _require_cli(name, "codex")
 
-    state_file, state_ref = _resolve_state_ref(state_dir, name)
+    agent_dir = _agent_dir(name)
+    state_file, state_ref = _resolve_state_ref(state_dir, name, agent_dir)
     prompt_bundle = prompts.build_prompts(state_ref)
 
     _log_loop_start(name, "slow loop: plan -> groom -> execute -> review", state_ref, skills)
 
-    add_dirs = _skill_dirs(skills)
-    claude = Claude(add_dirs=add_dirs)
-    codex = Codex(add_dirs=add_dirs)
+    add_dirs = _agent_add_dirs(state_dir, name, skills)
+    usage_meter = UsageMeter()
+    resource_meter = ResourceMeter(limits_from_env("slow"))
+    agent_options = {
+        "cwd": agent_dir,
+        "add_dirs": add_dirs,
+        "on_usage": usage_meter.record,
+        "limits": resource_meter.limits,
+        "on_resources": resource_meter.record,
+    }
+    claude = Claude(**agent_options)
+    codex = Codex(**agent_options)
     project_dir = Path.cwd()
     iteration = 0
     consecutive_failures = 0
     stopped_by_directive = False
+    timer = IterationTimer()
+    profiler = IterationProfiler.from_env(state_dir)
 
     while True:
         if _should_stop(state_file, name):
@@ -233,27 +594,58 @@ def run_slow_loop(state_dir: Path, name: str, skills: list[str] | None = None) -
         iteration += 1
         print(f"[subturtle:{name}] === slow iteration {iteration} ===")
         try:
-            plan = claude.plan(prompt_bundle["planner"])
-
-            stats = subprocess.check_output(
-                ["bash", str(STATS_SCRIPT), str(state_file)], text=True
-            )
-            claude.execute(prompt_bundle["groomer"].format(stats=stats, plan=plan))
-
-            codex.execute(prompt_bundle["executor"].format(plan=plan))
-
-            claude.execute(prompt_bundle["reviewer"].format(plan=plan))
-            _record_checkpoint(state_dir, name, project_dir, "slow", iteration)
+            with profiled_iteration(profiler, iteration) as profile:
+                with _metered_phase("planner", timer, usage_meter, resource_meter):
+                    plan = claude.plan(prompt_bundle["planner"])
+
+                with timer.phase("stats"):
+                    stats = subprocess.check_output(
+                        ["bash", str(STATS_SCRIPT), str(state_file)], text=True
+                    )
+                phase_prompts, phase_sizes = _budgeted_phase_prompts(
+                    prompt_bundle, plan, stats, state_dir, state_ref
+                )
+                with _metered_phase("groomer", timer, usage_meter, resource_meter):
+                    claude.execute(phase_prompts["groomer"])
+
+                with _metered_phase("executor", timer, usage_meter, resource_meter):
+                    codex.execute(phase_prompts["executor"])
+
+                with _metered_phase("reviewer", timer, usage_meter, resource_meter):
+                    claude.execute(phase_prompts["reviewer"])
+                prompt_sizes = {
+                    "plan_chars": len(plan),
+                    "phases": {"planner": _prompt_record(prompt_bundle["planner"]), **phase_sizes},
+                }
+                timer = _checkpoint_with_timings(
+                    state_dir,
+                    name,
+                    project_dir,
+                    "slow",
+                    iteration,
+                    timer,
+                    {
+                        "prompts": prompt_sizes,
+                        "usage": usage_meter.as_payload(),
+                        "resources": resource_meter.as_payload(),
+                        "profile": profile,
+                    },
+                )
+            usage_meter.reset()
+            resource_meter.reset()
             consecutive_failures = 0
+            if _usage_budget_exceeded(state_dir, name, project_dir, "slow"):
+                break
         except (subprocess.CalledProcessError, OSError) as error:
-            consecutive_failures, should_stop = _handle_agent_failure(
-                state_dir,
-                name,
-                project_dir,
-                "slow",
-                error,
-                consecutive_failures,
-            )
+            with timer.retry():
+                consecutive_failures, should_stop = _handle_agent_failure(
+                    state_dir,
+                    name,
+                    project_dir,
+                    "slow",
+                    error,
+                    consecutive_failures,
+                )
             if should_stop:
                 break
 
@@ -270,7 +662,15 @@ def run_yolo_loop(state_dir: Path, name: str, skills: list[str] | None = None) -
         skills = []
     _require_cli(name, "claude")
 
-    claude = Claude(add_dirs=_skill_dirs(skills))
+    usage_meter = UsageMeter()
+    resource_meter = ResourceMeter(limits_from_env("yolo"))
+    claude = Claude(
+        cwd=_agent_dir(name),
+        add_dirs=_agent_add_dirs(state_dir, name, skills),
+        on_usage=usage_meter.record,
+        limits=resource_meter.limits,
+        on_resources=resource_meter.record,
+    )
     _run_single_agent_loop(
         state_dir=state_dir,
         name=name,
@@ -278,6 +678,8 @@ def run_yolo_loop(state_dir: Path, name: str, skills: list[str] | None = None) -
         loop_description="yolo loop: claude",
         skills=skills,
         execute_iteration=claude.execute,
+        usage_meter=usage_meter,
+        resource_meter=resource_meter,
     )
 
 
@@ -289,7 +691,15 @@ def run_yolo_codex_loop(
         skills = []
     _require_cli(name, "codex")
 
-    codex = Codex(add_dirs=_skill_dirs(skills))
+    usage_meter = UsageMeter()
+    resource_meter = ResourceMeter(limits_from_env("yolo-codex"))
+    codex = Codex(
+        cwd=_agent_dir(name),
+        add_dirs=_agent_add_dirs(state_dir, name, skills),
+        on_usage=usage_meter.record,
+        limits=resource_meter.limits,
+        on_resources=resource_meter.record,
+    )
     _run_single_agent_loop(
         state_dir=state_dir,
         name=name,
@@ -297,6 +707,8 @@ def run_yolo_codex_loop(
         loop_description="yolo-codex loop: codex",
         skills=skills,
         execute_iteration=codex.execute,
+        usage_meter=usage_meter,
+        resource_meter=resource_meter,
     )
 
 
@@ -308,7 +720,16 @@ def run_yolo_codex_spark_loop(
         skills = []
     _require_cli(name, "codex")
 
-    codex = Codex(add_dirs=_skill_dirs(skills), model="gpt-5.3-codex-spark")
+    usage_meter = UsageMeter()
+    resource_meter = ResourceMeter(limits_from_env("yolo-codex-spark"))
+    codex = Codex(
+        cwd=_agent_dir(name),
+        add_dirs=_agent_add_dirs(state_dir, name, skills),
+        model="gpt-5.3-codex-spark",
+        on_usage=usage_meter.record,
+        limits=resource_meter.limits,
+        on_resources=resource_meter.record,
+    )
     _run_single_agent_loop(
         state_dir=state_dir,
         name=name,
@@ -316,6 +737,8 @@ def run_yolo_codex_spark_loop(
         loop_description="yolo-codex-spark loop: codex spark",
         skills=skills,
         execute_iteration=codex.execute,
+        usage_meter=usage_meter,
+        resource_meter=resource_meter,
     )
 
 
@@ -353,9 +776,13 @@ def run_loop(
 __all__ = [
     "Claude",
     "Codex",
+    "IterationTimer",
     "LOOP_TYPES",
     "MAX_CONSECUTIVE_FAILURES",
     "MAX_FAILURES_MESSAGE",
+    "USAGE_BUDGET_ERROR_TYPE",
+    "ResourceMeter",
+    "UsageMeter",
     "run_loop",
     "run_slow_loop",
     "run_yolo_loop",
@@ -0,0 +1,327 @@
+"""Merge queue folding SubTurtle worktree checkpoints onto a target branch."""
+
+from __future__ import annotations
+
+import fcntl
+import functools
+import hashlib
+import itertools
+import json
+import os
+import subprocess
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+try:
+    from super_turtle.state.conductor_state import ConductorStateStore
+except ModuleNotFoundError:
+    from state.conductor_state import ConductorStateStore
+
+MERGE_TARGET_ENV = "SUPERTURTLE_MERGE_TARGET"
+MERGE_QUEUE_FILENAME = "merge_queue.json"
+MERGE_QUEUE_VERSION = 1
+# ``git merge-tree --write-tree`` first shipped in git 2.38.
+MIN_GIT_VERSION = (2, 38)
+
+
+@functools.lru_cache(maxsize=1)
+def git_version() -> tuple[int, ...]:
+    """Return the installed git's version, e.g. ``(2, 39, 5)``."""
+    words = subprocess.run(
+        ["git", "version"], check=True, capture_output=True, text=True
+    ).stdout.split()
+    # "git version 2.39.5", "... 2.37.1 (Apple Git-137.1)", "... 2.41.0.windows.1"
+    parts = words[2].split(".") if len(words) > 2 else []
+    return tuple(int(part) for part in itertools.takewhile(str.isdigit, parts))
+
+
+def require_merge_tree() -> None:
+    """Raise RuntimeError when git is too old for ``merge-tree --write-tree``."""
+    version = git_version()
+    if version < MIN_GIT_VERSION:
+        found = ".".join(map(str, version)) or "unknown"
+        needed = ".".join(map(str, MIN_GIT_VERSION))
+        raise RuntimeError(f"the merge queue needs git >= {needed} (found {found})")
+
+
+def merge_target_from_env() -> str | None:
+    """Return the configured target branch, or None when the queue is off."""
+    return os.environ.get(MERGE_TARGET_ENV, "").strip() or None
+
+
+def _empty_queue() -> dict[str, Any]:
+    return {
+        "version": MERGE_QUEUE_VERSION,
+        "events": {"inode": None, "offset": 0},
+        "pending": {},
+        "merged": {},
+        "conflicts": {},
+    }
+
+
+class MergeQueue:
+    """Merge checkpointed worker branches onto ``target`` in bare git plumbing.
+
+    ``worker.checkpoint`` events that carry a ``branch`` (set for workers in
+    a pooled worktree) and a ``head_sha`` enqueue that head; a later
+    checkpoint from the same worker supersedes the earlier one since it
+    contains it. ``process()`` merges every pending head in event order with
+    ``git merge-tree --write-tree`` (git 2.38 or newer) and ``commit-tree``,
+    then moves the target once with a compare-and-swap ``update-ref``, so
+    clean heads land as one batch. No checkout is touched, so a target that
+    is checked out in any worktree is never moved (its index and files would
+    silently revert the batch): the heads stay queued, the result names the
+    checkout under ``target_checkout`` and a critical wakeup asks for a
+    dedicated integration branch. A conflicting head is dropped from the
+    batch and reported as a critical wakeup; the worker's next checkpoint
+    queues it again.
+    """
+
+    def __init__(self, project_dir: Path, state_dir: Path, target: str):
+        self.project_dir = project_dir
+        self.conductor = ConductorStateStore(state_dir)
+        self.target = target
+        self.queue_path = self.conductor.paths.base_dir / MERGE_QUEUE_FILENAME
+
+    def _git(self, *args: str, check: bool = True) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(
+            ["git", *args],
+            cwd=self.project_dir,
+            check=check,
+            capture_output=True,
+            text=True,
+        )
+
+    @contextmanager
+    def _try_lock(self) -> Iterator[bool]:
+        self.queue_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.queue_path.with_suffix(".lock").open("a") as lock_file:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _load_queue(self) -> dict[str, Any]:
+        try:
+            loaded = json.loads(self.queue_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return _empty_queue()
+        if not isinstance(loaded, dict) or loaded.get("version") != MERGE_QUEUE_VERSION:
+            return _empty_queue()
+        return loaded
+
+    def _save_queue(self, queue: dict[str, Any]) -> None:
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", delete=False, dir=self.queue_path.parent
+        ) as tmp_file:
+            json.dump(queue, tmp_file, indent=2, sort_keys=True)
+            tmp_file.write("\n")
+        Path(tmp_file.name).replace(self.queue_path)
+
+    def _enqueue_checkpoints(self, queue: dict[str, Any]) -> None:
+        cursor = queue["events"]
+        events_path = self.conductor.paths.events_jsonl_file
+        if not events_path.exists():
+            return
+        stat_result = events_path.stat()
+        if cursor["inode"] != stat_result.st_ino or cursor["offset"] > stat_result.st_size:
+            cursor.update({"inode": stat_result.st_ino, "offset": 0})
+        for offset, event in self.conductor.iter_events(cursor["offset"]):
+            cursor["offset"] = offset
+            if event.get("event_type") != "worker.checkpoint":
+                continue
+            payload = event.get("payload") or {}
+            head_sha = payload.get("head_sha")
+            if not payload.get("branch") or not head_sha:
+                continue
+            worker_name = event["worker_name"]
+            if queue["merged"].get(worker_name) == head_sha:
+                continue
+            queue["pending"][worker_name] = {
+                "head_sha": head_sha,
+                "branch": payload["branch"],
+                "event_id": event.get("id"),
+                "run_id": event.get("run_id"),
+                "offset": offset,
+            }
+
+    def _report_conflict(self, worker_name: str, entry: dict[str, Any], files: list[str]) -> None:
+        digest = hashlib.sha256(f"{worker_name}:{entry['head_sha']}".encode()).hexdigest()
+        wakeup_id = f"wake_merge_{digest[:12]}"
+        if self.conductor.load_wakeup(wakeup_id) is not None:
+            return
+        self.conductor.write_wakeup(
+            self.conductor.make_wakeup(
+                worker_name=worker_name,
+                category="critical",
+                summary=(
+                    f"SubTurtle {worker_name} conflicts with {self.target} "
+                    f"at {entry['head_sha'][:12]} and needs a manual merge."
+                ),
+                reason_event_id=entry.get("event_id"),
+                run_id=entry.get("run_id"),
+                wakeup_id=wakeup_id,
+                payload={
+                    "kind": "merge_conflict",
+                    "branch": entry["branch"],
+                    "head_sha": entry["head_sha"],
+                    "target": self.target,
+                    "files": files,
+                },
+            )
+        )
+
+    def _report_checked_out_target(self, checkout: Path, old_tip: str, pending: list[str]) -> None:
+        digest = hashlib.sha256(f"{self.target}:{checkout}:{old_tip}".encode()).hexdigest()
+        wakeup_id = f"wake_merge_{digest[:12]}"
+        if self.conductor.load_wakeup(wakeup_id) is not None:
+            return
+        self.conductor.write_wakeup(
+            self.conductor.make_wakeup(
+                worker_name=pending[0],
+                category="critical",
+                summary=(
+                    f"Merge queue target {self.target} is checked out at {checkout}; "
+                    f"{len(pending)} SubTurtle head(s) are waiting. Point "
+                    f"{MERGE_TARGET_ENV} at a branch that is not checked out."
+                ),
+                wakeup_id=wakeup_id,
+                payload={
+                    "kind": "merge_target_checked_out",
+                    "target": self.target,
+                    "checkout": str(checkout),
+                    "workers": pending,
+                },
+            )
+        )
+
+    def _checked_out_at(self, ref: str) -> Path | None:
+        listing = self._git("worktree", "list", "--porcelain").stdout
+        worktree: str | None = None
+        for line in listing.splitlines():
+            if line.startswith("worktree "):
+                worktree = line[len("worktree ") :]
+            elif line == f"branch {ref}" and worktree is not None:
+                return Path(worktree)
+        return None
+
+    def _is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        merge_base = self._git("merge-base", "--is-ancestor", ancestor, descendant, check=False)
+        return merge_base.returncode == 0
+
+    def _advance_target(self, ref: str, old_tip: str, tip: str) -> None:
+        # Compare-and-swap: fails rather than clobbering a concurrent update.
+        self._git("update-ref", "-m", "superturtle merge queue", ref, tip, old_tip)
+
+    def process(self) -> dict[str, Any]:
+        """Merge pending heads; returns ``{"merged", "conflicts", "skipped", "tip"}``.
+
+        ``target_checkout`` is set instead of merging when the target is
+        checked out.
+        """
+        result: dict[str, Any] = {"merged": [], "conflicts": [], "skipped": False}
+        with self._try_lock() as acquired:
+            if not acquired:
+                # Another worker is merging; the next checkpoint's call catches up.
+                result["skipped"] = True
+                return result
+            queue = self._load_queue()
+            self._enqueue_checkpoints(queue)
+            if not queue["pending"]:
+                self._save_queue(queue)
+                return result
+
+            require_merge_tree()
+            ref = f"refs/heads/{self.target}"
+            old_tip = self._git("rev-parse", "--verify", "--quiet", ref, check=False).stdout.strip()
+            if not old_tip:
+                raise RuntimeError(f"merge target branch not found: {self.target}")
+            tip = old_tip
+            checkout = self._checked_out_at(ref)
+            if checkout is not None:
+                ordered_workers = [
+                    worker_name
+                    for worker_name, _entry in sorted(
+                        queue["pending"].items(), key=lambda item: item[1]["offset"]
+                    )
+                ]
+                self._report_checked_out_target(checkout, old_tip, ordered_workers)
+                result["target_checkout"] = str(checkout)
+                self._save_queue(queue)
+                result["tip"] = tip
+                return result
+            landed: dict[str, str] = {}
+            ordered = sorted(queue["pending"].items(), key=lambda item: item[1]["offset"])
+            for worker_name, entry in ordered:
+                head_sha = entry["head_sha"]
+                if self._is_ancestor(head_sha, tip):
+                    landed[worker_name] = head_sha
+                    continue
+                if self._is_ancestor(tip, head_sha):
+                    tip = head_sha
+                    landed[worker_name] = head_sha
+                    result["merged"].append(worker_name)
+                    continue
+                merged_tree = self._git(
+                    "merge-tree", "--write-tree", "--name-only", "--no-messages", tip, head_sha,
+                    check=False,
+                )
+                lines = merged_tree.stdout.splitlines()
+                if merged_tree.returncode == 1:
+                    files = [line for line in lines[1:] if line]
+                    self._report_conflict(worker_name, entry, files)
+                    queue["conflicts"][worker_name] = head_sha
+                    result["conflicts"].append(worker_name)
+                    continue
+                if merged_tree.returncode != 0:
+                    raise subprocess.CalledProcessError(
+                        merged_tree.returncode,
+                        merged_tree.args,
+                        merged_tree.stdout,
+                        merged_tree.stderr,
+                    )
+                tip = self._git(
+                    "commit-tree", lines[0], "-p", tip, "-p", head_sha,
+                    "-m", f"Merge {entry['branch']} ({head_sha[:12]}) into {self.target}",
+                ).stdout.strip()
+                landed[worker_name] = head_sha
+                result["merged"].append(worker_name)
+
+            if tip != old_tip:
+                self._advance_target(ref, old_tip, tip)
+            for worker_name, head_sha in landed.items():
+                queue["merged"][worker_name] = head_sha
+                queue["conflicts"].pop(worker_name, None)
+            for worker_name in (*landed, *result["conflicts"]):
+                queue["pending"].pop(worker_name, None)
+            self._save_queue(queue)
+        result["tip"] = tip
+        return result
+
+
+def process_merge_queue(project_dir: Path, state_dir: Path) -> dict[str, Any] | None:
+    """Run the merge queue when ``SUPERTURTLE_MERGE_TARGET`` is set."""
+    target = merge_target_from_env()
+    if target is None:
+        return None
+    return MergeQueue(project_dir, state_dir, target).process()
+
+
+__all__ = [
+    "MERGE_QUEUE_FILENAME",
+    "MERGE_TARGET_ENV",
+    "MIN_GIT_VERSION",
+    "MergeQueue",
+    "git_version",
+    "merge_target_from_env",
+    "process_merge_queue",
+    "require_merge_tree",
+]
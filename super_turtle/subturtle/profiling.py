@@ -0,0 +1,136 @@
+"""Opt-in per-iteration cProfile and tracemalloc capture for SubTurtle loops."""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, ContextManager
+
+# "cpu", "memory", or "all"/"1" for both; unset or "0" disables profiling.
+PROFILE_ENV = "SUPERTURTLE_PROFILE"
+PROFILE_MODES = ("cpu", "memory", "all")
+PROFILES_DIRNAME = "profiles"
+TOP_ALLOCATION_SITES = 25
+TRACEMALLOC_FRAMES = 1
+
+
+def profile_mode_from_env() -> str | None:
+    """Return the configured mode, or None when profiling is off."""
+    raw = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if raw in ("", "0"):
+        return None
+    if raw == "1":
+        return "all"
+    if raw not in PROFILE_MODES:
+        raise ValueError(f"{PROFILE_ENV} must be one of {', '.join(PROFILE_MODES)}: {raw!r}")
+    return raw
+
+
+def _site(stat: tracemalloc.Statistic | tracemalloc.StatisticDiff) -> str:
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+class IterationProfiler:
+    """Profile loop iterations into ``<state_dir>/profiles``.
+
+    CPU: one ``iteration-NNNN.prof`` per iteration (load with ``pstats``).
+    Memory: tracemalloc runs for the whole loop; each iteration writes
+    ``iteration-NNNN-memory.json`` with the top allocation sites and their
+    growth since the previous iteration.
+    """
+
+    def __init__(self, state_dir: Path, mode: str, top: int = TOP_ALLOCATION_SITES) -> None:
+        self.profiles_dir = state_dir / PROFILES_DIRNAME
+        self.cpu = mode in ("cpu", "all")
+        self.memory = mode in ("memory", "all")
+        self.top = top
+        self._previous_snapshot: tracemalloc.Snapshot | None = None
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    @classmethod
+    def from_env(cls, state_dir: Path) -> IterationProfiler | None:
+        mode = profile_mode_from_env()
+        return cls(state_dir, mode) if mode else None
+
+    def paths(self, iteration: int) -> dict[str, str]:
+        stem = self.profiles_dir / f"iteration-{iteration:04d}"
+        paths = {}
+        if self.cpu:
+            paths["cpu_profile"] = f"{stem}.prof"
+        if self.memory:
+            paths["memory_top"] = f"{stem}-memory.json"
+        return paths
+
+    @contextmanager
+    def iteration(self, iteration: int) -> Iterator[dict[str, Any]]:
+        """Profile one iteration; yields the checkpoint record of its file paths.
+
+        The files are written when the block exits, also for failed
+        attempts, so the paths are known before the checkpoint is.
+        """
+        record: dict[str, Any] = self.paths(iteration)
+        self.profiles_dir.mkdir(parents=True, exist_ok=True)
+        profile = cProfile.Profile() if self.cpu else None
+        if self.memory:
+            tracemalloc.reset_peak()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(record["cpu_profile"])
+            if self.memory:
+                self._dump_memory(Path(record["memory_top"]))
+
+    def _dump_memory(self, path: Path) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        report: dict[str, Any] = {
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top_sites": [
+                {"site": _site(stat), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in snapshot.statistics("lineno")[: self.top]
+            ],
+        }
+        if self._previous_snapshot is not None:
+            report["top_growth"] = [
+                {
+                    "site": _site(stat),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count_diff": stat.count_diff,
+                }
+                for stat in snapshot.compare_to(self._previous_snapshot, "lineno")[: self.top]
+                if stat.size_diff
+            ]
+        self._previous_snapshot = snapshot
+        path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+def profiled_iteration(
+    profiler: IterationProfiler | None, iteration: int
+) -> ContextManager[dict[str, Any] | None]:
+    """Return ``profiler.iteration(iteration)``, or a no-op yielding None when off."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.iteration(iteration)
+
+
+__all__ = [
+    "PROFILE_ENV",
+    "PROFILE_MODES",
+    "IterationProfiler",
+    "profile_mode_from_env",
+    "profiled_iteration",
+]
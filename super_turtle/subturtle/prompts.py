@@ -1,5 +1,18 @@
 """Prompt templates for SubTurtle loop variants."""
 
+import os
+import re
+
+# Rough English-text ratio; only used to size budgets, never for billing.
+CHARS_PER_TOKEN = 4
+PLAN_BUDGET_ENV_PREFIX = "SUPERTURTLE_PLAN_TOKEN_BUDGET"
+# Plan budgets are opt-in. The global budget only covers phases that read the
+# plan as context; the executor works from it and needs its own override.
+GLOBAL_PLAN_BUDGET_PHASES = ("groomer", "reviewer")
+_CODE_OMITTED = "[code omitted]\n"
+_CODE_FENCE_RE = re.compile(r"^```.*?^```[ \t]*$\n?", re.MULTILINE | re.DOTALL)
+_BLANK_RUN_RE = re.compile(r"\n{3,}")
+
 PLANNER_PROMPT = """\
 Read {state_file}. Understand the current task, end goal, and backlog.
 
@@ -16,16 +29,15 @@ worth of focused work. The plan must:
 Output the plan as structured markdown.
 """
 
+# Phase templates keep their instructions first and the per-iteration content
+# (stats, plan) last, so repeated calls share a stable prefix that providers
+# can serve from their prompt cache.
 GROOMER_PROMPT = """\
 Your only job is to update {state_file}. Do not write code or touch other files.
 
-## Current {state_file} stats
-
-{{stats}}
-
 ## Instructions
 
-1. Read {state_file} fully.
+1. Read {state_file} fully, using the stats below to size your edits.
 2. Read the plan below.
 3. Update the **Current Task** section:
    - Replace it with a one-liner summary of what the plan describes.
@@ -43,6 +55,10 @@ Your only job is to update {state_file}. Do not write code or touch other files.
 5. Do NOT touch End Goal, Roadmap (Completed), or Roadmap (Upcoming).
 6. Do NOT create or modify any other files.
 
+## Current {state_file} stats
+
+{{stats}}
+
 ## The plan
 
 {{plan}}
@@ -133,6 +149,81 @@ Do ONE commit's worth of focused work on the current task. Follow this sequence:
 """
 
 
+def estimate_tokens(text: str) -> int:
+    """Return a cheap token estimate for budgeting prompt text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def prompt_size(text: str) -> dict[str, int]:
+    """Return the size record stored in checkpoints for one prompt."""
+    return {
+        "chars": len(text),
+        "bytes": len(text.encode("utf-8")),
+        "est_tokens": estimate_tokens(text),
+    }
+
+
+def plan_token_budget(phase: str) -> int | None:
+    """Return the plan budget for a slow-loop phase; None means unlimited.
+
+    Plans are never trimmed unless configured. ``SUPERTURTLE_PLAN_TOKEN_BUDGET_<PHASE>``
+    sets one phase and ``SUPERTURTLE_PLAN_TOKEN_BUDGET`` sets the groomer and
+    reviewer when they have no override of their own; values <= 0 disable it.
+    """
+    keys = [f"{PLAN_BUDGET_ENV_PREFIX}_{phase.upper()}"]
+    if phase in GLOBAL_PLAN_BUDGET_PHASES:
+        keys.append(PLAN_BUDGET_ENV_PREFIX)
+    for key in keys:
+        raw = os.environ.get(key, "").strip()
+        if raw:
+            try:
+                budget = int(raw)
+            except ValueError:
+                continue
+            return budget if budget > 0 else None
+    return None
+
+
+def compress_plan(plan: str, token_budget: int | None, full_plan_ref: str | None = None) -> str:
+    """Fit ``plan`` into ``token_budget`` estimated tokens.
+
+    Blank runs go first, then code fences from the largest down, only until
+    the plan fits; fences that fit are kept. If that is not enough, the plan
+    is cut at a line boundary and a marker points to ``full_plan_ref``.
+    """
+    if token_budget is None or estimate_tokens(plan) <= token_budget:
+        return plan
+    compact = _BLANK_RUN_RE.sub("\n\n", plan).strip()
+    excess = len(compact) - token_budget * CHARS_PER_TOKEN
+    fences = sorted(_CODE_FENCE_RE.finditer(compact), key=lambda m: len(m.group()), reverse=True)
+    dropped = set()
+    for fence in fences:
+        if excess <= 0:
+            break
+        dropped.add(fence.start())
+        excess -= len(fence.group()) - len(_CODE_OMITTED)
+    compact = _CODE_FENCE_RE.sub(
+        lambda fence: _CODE_OMITTED if fence.start() in dropped else fence.group(), compact
+    )
+    if estimate_tokens(compact) <= token_budget:
+        return compact
+
+    marker = f"\n\n[plan truncated from {len(plan)} chars"
+    marker += f"; read the full plan in {full_plan_ref}]" if full_plan_ref else "]"
+    limit = max(token_budget * CHARS_PER_TOKEN - len(marker), 0)
+    cut = compact.rfind("\n", 0, limit)
+    return compact[: cut if cut > 0 else limit].rstrip() + marker
+
+
+def static_prefix(template: str) -> str:
+    """Return the part of a built phase template before its first placeholder."""
+    cut = min(
+        (index for index in (template.find("{stats}"), template.find("{plan}")) if index >= 0),
+        default=len(template),
+    )
+    return template[:cut]
+
+
 def build_prompts(state_file: str) -> dict[str, str]:
     """Build slow-loop prompts with the state-file path baked in."""
     return {
@@ -149,5 +240,11 @@ __all__ = [
     "EXECUTOR_PROMPT",
     "REVIEWER_PROMPT",
     "YOLO_PROMPT",
+    "GLOBAL_PLAN_BUDGET_PHASES",
     "build_prompts",
+    "compress_plan",
+    "estimate_tokens",
+    "plan_token_budget",
+    "prompt_size",
+    "static_prefix",
 ]
@@ -4,23 +4,43 @@ from __future__ import annotations
 
 import datetime
 import json
+import os
 import re
 import subprocess
 import sys
+from collections.abc import Mapping
 from pathlib import Path
+from typing import Any
+
+from . import gitmeta, worktrees
 
 try:
+    from super_turtle.state.archive import (
+        DEFAULT_RETENTION_SECONDS,
+        maybe_collect_garbage,
+    )
     from super_turtle.state.conductor_state import ConductorStateStore
-    from super_turtle.state.run_state_writer import refresh_handoff_from_conductor
+    from super_turtle.state.run_state_writer import request_handoff_refresh
 except ModuleNotFoundError:
+    from state.archive import DEFAULT_RETENTION_SECONDS, maybe_collect_garbage
     from state.conductor_state import ConductorStateStore
-    from state.run_state_writer import refresh_handoff_from_conductor
+    from state.run_state_writer import request_handoff_refresh
 
 STOP_DIRECTIVE = "## Loop Control\nSTOP"
+# Opt-in background GC: when set, refresh_handoff archives old terminal
+# records at most once per interval before re-rendering.
+STATE_GC_INTERVAL_ENV = "SUPERTURTLE_STATE_GC_INTERVAL_SECONDS"
+STATE_GC_RETENTION_ENV = "SUPERTURTLE_STATE_GC_RETENTION_SECONDS"
+
 
+def resolve_state_ref(
+    state_dir: Path, name: str, agent_dir: Path | None = None
+) -> tuple[Path, str]:
+    """Return the state file path and the reference agents see, or exit on error.
 
-def resolve_state_ref(state_dir: Path, name: str) -> tuple[Path, str]:
-    """Return the state file path and display reference, or exit on error."""
+    The reference is relative to ``agent_dir`` (default: the cwd) when the
+    state file lives under it, and absolute otherwise.
+    """
     state_file = state_dir / "CLAUDE.md"
 
     if not state_file.exists():
@@ -32,7 +52,7 @@ def resolve_state_ref(state_dir: Path, name: str) -> tuple[Path, str]:
         sys.exit(1)
 
     try:
-        rel_state = state_file.relative_to(Path.cwd())
+        rel_state = state_file.relative_to(agent_dir or Path.cwd())
         state_ref = str(rel_state)
     except ValueError:
         state_ref = str(state_file)
@@ -80,10 +100,40 @@ def extract_current_task(state_file: Path) -> str | None:
     return None
 
 
+def _env_seconds(name: str) -> float | None:
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+def maybe_collect_state_garbage(project_dir: Path, name: str) -> None:
+    """Run the opt-in periodic conductor GC when its interval has elapsed."""
+    interval_seconds = _env_seconds(STATE_GC_INTERVAL_ENV)
+    if interval_seconds is None:
+        return
+    try:
+        maybe_collect_garbage(
+            run_state_dir(project_dir),
+            interval_seconds=interval_seconds,
+            retention_seconds=_env_seconds(STATE_GC_RETENTION_ENV) or DEFAULT_RETENTION_SECONDS,
+        )
+    except (OSError, ValueError) as error:
+        print(
+            f"[subturtle:{name}] WARNING: conductor state gc failed: {error}",
+            file=sys.stderr,
+        )
+
+
 def refresh_handoff(project_dir: Path, name: str) -> None:
-    """Re-render handoff artifacts from canonical conductor state."""
+    """Re-render handoff artifacts from conductor state, coalesced across writers."""
+    maybe_collect_state_garbage(project_dir, name)
     try:
-        refresh_handoff_from_conductor(run_state_dir(project_dir))
+        request_handoff_refresh(run_state_dir(project_dir))
     except (OSError, ValueError, json.JSONDecodeError, RuntimeError) as error:
         print(
             f"[subturtle:{name}] WARNING: failed to refresh handoff: {error}",
@@ -93,6 +143,10 @@ def refresh_handoff(project_dir: Path, name: str) -> None:
 
 def git_head_sha(project_dir: Path) -> str | None:
     """Return the current git HEAD SHA for checkpoint metadata when available."""
+    sha = gitmeta.read_head_sha(project_dir)
+    if sha:
+        return sha
+    # Ref layouts the direct reader does not handle (e.g. reftable).
     try:
         sha = subprocess.check_output(
             ["git", "rev-parse", "HEAD"],
@@ -104,12 +158,67 @@ def git_head_sha(project_dir: Path) -> str | None:
     return sha or None
 
 
+def event_idempotency_key(name: str, run_id: Any, *parts: Any) -> str | None:
+    """Return a deterministic event key scoped to one worker run, if known.
+
+    Each spawn gets a fresh ``run_id``, so keys never collide across restarts,
+    while a retried record path within a run reuses the original event.
+    """
+    if not run_id:
+        return None
+    return ":".join(str(part) for part in (name, run_id, *parts))
+
+
+def _write_wakeup_once(store: ConductorStateStore, event: Mapping[str, Any], **wakeup_fields: Any) -> None:
+    # Keyed events yield the same event id on retry; deriving the wakeup id
+    # from it keeps the wakeup idempotent too.
+    wakeup_id = None
+    if event.get("idempotency_key"):
+        wakeup_id = f"wake_{event['id']}"
+        if store.load_wakeup(wakeup_id) is not None:
+            return
+    store.write_wakeup(
+        store.make_wakeup(reason_event_id=event["id"], wakeup_id=wakeup_id, **wakeup_fields)
+    )
+
+
+# Worker-state fields a subturtle write keeps unless it overrides them.
+_CARRIED_WORKER_FIELDS = (
+    "lifecycle_state",
+    "run_id",
+    "workspace",
+    "loop_type",
+    "pid",
+    "timeout_seconds",
+    "cron_job_id",
+    "current_task",
+    "stop_reason",
+    "completion_requested_at",
+    "terminal_at",
+    "last_event_id",
+    "last_event_at",
+    "created_at",
+)
+
+
+def _carry_forward_worker_state(
+    store: ConductorStateStore, existing: Mapping[str, Any], **overrides: Any
+) -> dict[str, Any]:
+    """Rebuild ``existing`` through ``make_worker_state`` with ``overrides`` applied."""
+    fields = {key: existing.get(key) for key in _CARRIED_WORKER_FIELDS}
+    for key in ("checkpoint", "metadata"):
+        fields[key] = existing.get(key) if isinstance(existing.get(key), dict) else None
+    fields.update(overrides)
+    return store.make_worker_state(**fields)
+
+
 def record_completion_pending(state_dir: Path, name: str, project_dir: Path) -> None:
     """Persist a self-stop completion request and enqueue reconciliation."""
     state_file = state_dir / "CLAUDE.md"
     store = ConductorStateStore(run_state_dir(project_dir))
     existing = store.load_worker_state(name) or {}
     completion_requested_at = utc_now_iso()
+    current_task = extract_current_task(state_file)
 
     event = store.append_event(
         worker_name=name,
@@ -118,61 +227,96 @@ def record_completion_pending(state_dir: Path, name: str, project_dir: Path) ->
         run_id=existing.get("run_id"),
         lifecycle_state="completion_pending",
         payload={"kind": "self_stop", "stop_directive": True},
+        idempotency_key=event_idempotency_key(name, existing.get("run_id"), "completion_requested"),
     )
 
-    state = store.make_worker_state(
-        worker_name=name,
-        lifecycle_state="completion_pending",
-        updated_by="subturtle",
-        run_id=existing.get("run_id"),
-        workspace=existing.get("workspace") or str(state_dir),
-        loop_type=existing.get("loop_type"),
-        pid=existing.get("pid"),
-        timeout_seconds=existing.get("timeout_seconds"),
-        cron_job_id=existing.get("cron_job_id"),
-        current_task=extract_current_task(state_file) or existing.get("current_task"),
-        stop_reason="completed",
-        completion_requested_at=completion_requested_at,
-        terminal_at=existing.get("terminal_at"),
-        created_at=existing.get("created_at"),
-        last_event_id=event["id"],
-        last_event_at=event["timestamp"],
-        checkpoint=existing.get("checkpoint")
-        if isinstance(existing.get("checkpoint"), dict)
-        else None,
-        metadata=existing.get("metadata")
-        if isinstance(existing.get("metadata"), dict)
-        else None,
-    )
-    store.write_worker_state(state)
+    def build_state(existing: dict[str, Any]) -> dict[str, Any]:
+        return _carry_forward_worker_state(
+            store,
+            existing,
+            worker_name=name,
+            lifecycle_state="completion_pending",
+            updated_by="subturtle",
+            workspace=existing.get("workspace") or str(state_dir),
+            current_task=current_task or existing.get("current_task"),
+            stop_reason="completed",
+            completion_requested_at=completion_requested_at,
+            last_event_id=event["id"],
+            last_event_at=event["timestamp"],
+        )
+
+    store.update_worker_state(name, build_state)
 
-    wakeup = store.make_wakeup(
+    _write_wakeup_once(
+        store,
+        event,
         worker_name=name,
         category="notable",
         summary=f"SubTurtle {name} completed and needs reconciliation.",
-        reason_event_id=event["id"],
         run_id=existing.get("run_id"),
         payload={"kind": "completion_requested"},
     )
-    store.write_wakeup(wakeup)
     refresh_handoff(project_dir, name)
 
 
+def _add_usage_totals(
+    metadata: Any, usage_totals: Mapping[str, Any] | None, event: Mapping[str, Any]
+) -> dict[str, Any] | None:
+    # Running totals live in worker metadata so budgets survive loop restarts.
+    metadata = dict(metadata) if isinstance(metadata, dict) else None
+    if not usage_totals:
+        return metadata
+    metadata = metadata or {}
+    previous = metadata.get("usage_totals")
+    totals = dict(previous) if isinstance(previous, dict) else {}
+    for key, value in usage_totals.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            total = totals.get(key, 0) + value
+            totals[key] = round(total, 6) if isinstance(total, float) else total
+    totals["checkpoints"] = int(totals.get("checkpoints", 0)) + 1
+    totals["updated_at"] = event["timestamp"]
+    metadata["usage_totals"] = totals
+    return metadata
+
+
+def worker_usage_totals(project_dir: Path, name: str) -> dict[str, Any]:
+    """Return the worker's running token/cost totals, or ``{}`` when none were recorded."""
+    try:
+        state = ConductorStateStore(run_state_dir(project_dir)).load_worker_state(name) or {}
+    except (OSError, ValueError) as error:
+        print(
+            f"[subturtle:{name}] WARNING: failed to read usage totals: {error}",
+            file=sys.stderr,
+        )
+        return {}
+    metadata = state.get("metadata")
+    totals = metadata.get("usage_totals") if isinstance(metadata, dict) else None
+    return dict(totals) if isinstance(totals, dict) else {}
+
+
 def record_checkpoint(
     state_dir: Path,
     name: str,
     project_dir: Path,
     loop_type: str,
     iteration: int,
+    details: Mapping[str, Any] | None = None,
 ) -> None:
-    """Persist the latest successful iteration checkpoint for a worker."""
+    """Persist the latest successful iteration checkpoint for a worker.
+
+    ``details`` carries loop-collected measurements (for example ``timings``)
+    that are merged into the checkpoint and the ``worker.checkpoint`` event.
+    """
     state_file = state_dir / "CLAUDE.md"
     store = ConductorStateStore(run_state_dir(project_dir))
 
     try:
         existing = store.load_worker_state(name) or {}
         current_task = extract_current_task(state_file) or existing.get("current_task")
-        head_sha = git_head_sha(project_dir)
+        # A worker in a pooled worktree commits on its own branch there.
+        worktree = worktrees.leased_worktree(project_dir, name)
+        git_dir = worktree or project_dir
+        head_sha = git_head_sha(git_dir)
         checkpoint = {
             "recorded_at": utc_now_iso(),
             "iteration": iteration,
@@ -180,8 +324,22 @@ def record_checkpoint(
         }
         if head_sha:
             checkpoint["head_sha"] = head_sha
+            if worktree is not None:
+                # Marks the head for the merge queue.
+                checkpoint["branch"] = worktrees.worker_branch(name)
+            previous_checkpoint = existing.get("checkpoint")
+            previous_head_sha = (
+                previous_checkpoint.get("head_sha") if isinstance(previous_checkpoint, dict) else None
+            )
+            git = gitmeta.checkpoint_git_metadata(git_dir, head_sha, previous_head_sha)
+            if git:
+                checkpoint["git"] = git
         if current_task:
             checkpoint["current_task"] = current_task
+        if details:
+            checkpoint.update(details)
+        usage = checkpoint.get("usage")
+        usage_totals = usage.get("totals") if isinstance(usage, dict) else None
 
         event = store.append_event(
             worker_name=name,
@@ -190,35 +348,83 @@ def record_checkpoint(
             run_id=existing.get("run_id"),
             lifecycle_state="running",
             payload={"kind": "iteration_complete", **checkpoint},
+            idempotency_key=event_idempotency_key(name, existing.get("run_id"), "checkpoint", iteration),
         )
 
-        state = store.make_worker_state(
+        def build_state(existing: dict[str, Any]) -> dict[str, Any]:
+            return _carry_forward_worker_state(
+                store,
+                existing,
+                worker_name=name,
+                lifecycle_state="running",
+                updated_by="subturtle",
+                workspace=existing.get("workspace") or str(state_dir),
+                loop_type=existing.get("loop_type") or loop_type,
+                current_task=current_task,
+                last_event_id=event["id"],
+                last_event_at=event["timestamp"],
+                checkpoint=checkpoint,
+                metadata=_add_usage_totals(existing.get("metadata"), usage_totals, event),
+            )
+
+        store.update_worker_state(name, build_state)
+        refresh_handoff(project_dir, name)
+    except (OSError, ValueError, json.JSONDecodeError, RuntimeError) as error:
+        print(
+            f"[subturtle:{name}] WARNING: failed to record checkpoint: {error}",
+            file=sys.stderr,
+        )
+
+
+def record_agent_timeout(
+    state_dir: Path,
+    name: str,
+    project_dir: Path,
+    loop_type: str,
+    timeout: Mapping[str, Any],
+) -> None:
+    """Record that the watchdog killed a hung agent call.
+
+    The worker keeps running (the loop retries), so this only appends a
+    ``worker.agent_timeout`` event and notes it in the worker's metadata.
+    """
+    store = ConductorStateStore(run_state_dir(project_dir))
+
+    try:
+        existing = store.load_worker_state(name) or {}
+        payload = {"kind": "agent_timeout", **timeout}
+        event = store.append_event(
             worker_name=name,
-            lifecycle_state="running",
-            updated_by="subturtle",
+            event_type="worker.agent_timeout",
+            emitted_by="subturtle",
             run_id=existing.get("run_id"),
-            workspace=existing.get("workspace") or str(state_dir),
-            loop_type=existing.get("loop_type") or loop_type,
-            pid=existing.get("pid"),
-            timeout_seconds=existing.get("timeout_seconds"),
-            cron_job_id=existing.get("cron_job_id"),
-            current_task=current_task,
-            stop_reason=existing.get("stop_reason"),
-            completion_requested_at=existing.get("completion_requested_at"),
-            terminal_at=existing.get("terminal_at"),
-            created_at=existing.get("created_at"),
-            last_event_id=event["id"],
-            last_event_at=event["timestamp"],
-            checkpoint=checkpoint,
-            metadata=existing.get("metadata")
-            if isinstance(existing.get("metadata"), dict)
-            else None,
+            payload=payload,
         )
-        store.write_worker_state(state)
-        refresh_handoff(project_dir, name)
+
+        def build_state(existing: dict[str, Any]) -> dict[str, Any]:
+            metadata = (
+                dict(existing.get("metadata"))
+                if isinstance(existing.get("metadata"), dict)
+                else {}
+            )
+            metadata["last_agent_timeout"] = {**payload, "recorded_at": event["timestamp"]}
+            return _carry_forward_worker_state(
+                store,
+                existing,
+                worker_name=name,
+                lifecycle_state=existing.get("lifecycle_state") or "running",
+                updated_by="subturtle",
+                workspace=existing.get("workspace") or str(state_dir),
+                loop_type=existing.get("loop_type") or loop_type,
+                last_event_id=event["id"],
+                last_event_at=event["timestamp"],
+                metadata=metadata,
+            )
+
+        store.update_worker_state(name, build_state)
     except (OSError, ValueError, json.JSONDecodeError, RuntimeError) as error:
         print(
-            f"[subturtle:{name}] WARNING: failed to record checkpoint: {error}",
+            f"[subturtle:{name}] WARNING: failed to record agent timeout: {error}",
             file=sys.stderr,
         )
 
@@ -251,51 +457,47 @@ def record_failure_pending(
             run_id=existing.get("run_id"),
             lifecycle_state="failure_pending",
             payload=error_payload,
+            idempotency_key=event_idempotency_key(
+                name, existing.get("run_id"), "fatal_error", error_type
+            ),
         )
 
-        metadata = (
-            dict(existing.get("metadata"))
-            if isinstance(existing.get("metadata"), dict)
-            else {}
-        )
-        metadata["last_error"] = {
-            **error_payload,
-            "recorded_at": event["timestamp"],
-        }
-
-        state = store.make_worker_state(
-            worker_name=name,
-            lifecycle_state="failure_pending",
-            updated_by="subturtle",
-            run_id=existing.get("run_id"),
-            workspace=existing.get("workspace") or str(state_dir),
-            loop_type=existing.get("loop_type") or loop_type,
-            pid=existing.get("pid"),
-            timeout_seconds=existing.get("timeout_seconds"),
-            cron_job_id=existing.get("cron_job_id"),
-            current_task=current_task,
-            stop_reason="fatal_error",
-            completion_requested_at=existing.get("completion_requested_at"),
-            terminal_at=existing.get("terminal_at"),
-            created_at=existing.get("created_at"),
-            last_event_id=event["id"],
-            last_event_at=event["timestamp"],
-            checkpoint=existing.get("checkpoint")
-            if isinstance(existing.get("checkpoint"), dict)
-            else None,
-            metadata=metadata,
-        )
-        store.write_worker_state(state)
-
-        wakeup = store.make_wakeup(
+        def build_state(existing: dict[str, Any]) -> dict[str, Any]:
+            metadata = (
+                dict(existing.get("metadata"))
+                if isinstance(existing.get("metadata"), dict)
+                else {}
+            )
+            metadata["last_error"] = {
+                **error_payload,
+                "recorded_at": event["timestamp"],
+            }
+            return _carry_forward_worker_state(
+                store,
+                existing,
+                worker_name=name,
+                lifecycle_state="failure_pending",
+                updated_by="subturtle",
+                workspace=existing.get("workspace") or str(state_dir),
+                loop_type=existing.get("loop_type") or loop_type,
+                current_task=current_task,
+                stop_reason="fatal_error",
+                last_event_id=event["id"],
+                last_event_at=event["timestamp"],
+                metadata=metadata,
+            )
+
+        store.update_worker_state(name, build_state)
+
+        _write_wakeup_once(
+            store,
+            event,
             worker_name=name,
             category="critical",
             summary=f"SubTurtle {name} hit a fatal error and needs reconciliation.",
-            reason_event_id=event["id"],
             run_id=existing.get("run_id"),
             payload=error_payload,
         )
-        store.write_wakeup(wakeup)
         refresh_handoff(project_dir, name)
     except (OSError, ValueError, json.JSONDecodeError, RuntimeError) as record_error:
         print(
@@ -344,6 +546,7 @@ __all__ = [
     "STOP_DIRECTIVE",
     "extract_current_task",
     "git_head_sha",
+    "maybe_collect_state_garbage",
     "record_checkpoint",
     "record_completion_pending",
     "record_failure_pending",
@@ -353,4 +556,5 @@ __all__ = [
     "run_state_dir",
     "should_stop",
     "utc_now_iso",
+    "worker_usage_totals",
 ]
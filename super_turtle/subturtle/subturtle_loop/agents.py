@@ -2,12 +2,40 @@
 
 import json
 import os
+import signal
 import subprocess
 import sys
+import threading
+import time
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any
 
+from .resources import AgentCgroup, rlimits_for, rusage_summary, wrap_command
 
 MAX_CAPTURE_CHARS = 500_000
+# Prompts above this many UTF-8 bytes go through stdin: argv is capped by
+# ARG_MAX (and MAX_ARG_STRLEN per argument) and copied into every exec.
+ARGV_PROMPT_MAX_BYTES_ENV = "SUPERTURTLE_ARGV_PROMPT_MAX_BYTES"
+DEFAULT_ARGV_PROMPT_MAX_BYTES = 32 * 1024
+# Opt-in: run agents with JSON event output so token usage can be reported.
+AGENT_USAGE_ENV = "SUPERTURTLE_AGENT_USAGE"
+# Per-worker budgets; setting either one also turns on usage reporting.
+# Tokens count input (cached included) plus output.
+TOKEN_BUDGET_ENV = "SUPERTURTLE_WORKER_TOKEN_BUDGET"
+COST_BUDGET_ENV = "SUPERTURTLE_WORKER_COST_BUDGET_USD"
+# USD per million tokens for agents that do not report a cost, e.g.
+# SUPERTURTLE_AGENT_PRICE_PER_MTOK_CODEX="input=1.25,cached_input=0.125,output=10".
+AGENT_PRICE_ENV = "SUPERTURTLE_AGENT_PRICE_PER_MTOK"
+UsageHook = Callable[[str, dict[str, int | float]], None]
+ResourceHook = Callable[[str, dict[str, Any]], None]
+# Watchdog limits per agent call; 0 disables a limit. The idle limit is off
+# unless set, since agents can legitimately go quiet through long builds.
+AGENT_IDLE_TIMEOUT_ENV = "SUPERTURTLE_AGENT_IDLE_TIMEOUT_SECONDS"
+AGENT_WALL_TIMEOUT_ENV = "SUPERTURTLE_AGENT_WALL_TIMEOUT_SECONDS"
+DEFAULT_AGENT_IDLE_TIMEOUT_SECONDS = 0
+DEFAULT_AGENT_WALL_TIMEOUT_SECONDS = 3 * 60 * 60
+KILL_GRACE_SECONDS = 10.0
 CLAUDE_FALLBACK_ALLOWED_TOOLS = [
     "Agent",
     "Task",
@@ -100,21 +128,411 @@ def _allowed_tools_arg(cwd: Path) -> str:
     return resolved
 
 
-def _run_streaming(cmd: list[str], cwd: Path) -> str:
+def _argv_prompt_max_bytes() -> int:
+    raw = os.environ.get(ARGV_PROMPT_MAX_BYTES_ENV, "").strip()
+    try:
+        return int(raw) if raw else DEFAULT_ARGV_PROMPT_MAX_BYTES
+    except ValueError:
+        return DEFAULT_ARGV_PROMPT_MAX_BYTES
+
+
+def prompt_transport(prompt: str) -> str:
+    """Return ``"argv"`` or ``"stdin"`` for how a prompt will reach the CLI."""
+    if len(prompt.encode("utf-8")) > _argv_prompt_max_bytes():
+        return "stdin"
+    return "argv"
+
+
+def usage_budgets_from_env() -> dict[str, float]:
+    """Return the configured ``tokens`` / ``cost_usd`` budgets; empty means none."""
+    budgets: dict[str, float] = {}
+    for key, env_name in (("tokens", TOKEN_BUDGET_ENV), ("cost_usd", COST_BUDGET_ENV)):
+        raw = os.environ.get(env_name, "").strip()
+        if raw:
+            try:
+                budget = float(raw)
+            except ValueError:
+                raise ValueError(f"{env_name} must be a number: {raw!r}") from None
+            if budget > 0:
+                budgets[key] = budget
+    return budgets
+
+
+def usage_reporting_enabled() -> bool:
+    """Return whether agents should emit JSON events carrying token usage."""
+    if os.environ.get(AGENT_USAGE_ENV, "").strip() not in ("", "0"):
+        return True
+    return bool(usage_budgets_from_env())
+
+
+def _agent_prices(agent: str) -> dict[str, float] | None:
+    spec = os.environ.get(f"{AGENT_PRICE_ENV}_{agent.upper()}", "").strip()
+    if not spec:
+        return None
+    prices: dict[str, float] = {}
+    for part in spec.split(","):
+        key, sep, raw = part.partition("=")
+        key = key.strip()
+        if not sep or key not in ("input", "cached_input", "output"):
+            raise ValueError(f"invalid {AGENT_PRICE_ENV}_{agent.upper()} entry: {part!r}")
+        prices[key] = float(raw)
+    return prices
+
+
+def estimate_cost_usd(usage: dict[str, int | float], prices: dict[str, float]) -> float:
+    """Price token usage with per-million-token ``prices``.
+
+    Cached input falls back to the input price when it has none of its own.
+    """
+    cached_price = prices.get("cached_input", prices.get("input", 0.0))
+    cost = (
+        usage.get("uncached_input_tokens", 0) * prices.get("input", 0.0)
+        + usage.get("cached_input_tokens", 0) * cached_price
+        + usage.get("output_tokens", 0) * prices.get("output", 0.0)
+    )
+    return round(cost / 1_000_000, 6)
+
+
+class _UsageScanner:
+    """Collect token usage and the final message from agent JSON event lines.
+
+    Understands Claude ``stream-json`` ``result`` events and Codex ``--json``
+    ``turn.completed`` / ``item.completed`` events. Input totals include
+    cached tokens, so ``uncached_input_tokens`` is what was billed at full rate.
+    Only Claude reports a cost (``total_cost_usd``).
+    """
+
+    def __init__(self) -> None:
+        self.input_tokens = 0
+        self.cached_input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd: float | None = None
+        self.seen = False
+        self.text: str | None = None
+
+    def __call__(self, line: str) -> None:
+        line = line.strip()
+        if not line.startswith("{"):
+            return
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        usage = event.get("usage") if isinstance(event.get("usage"), dict) else {}
+        event_type = event.get("type")
+        if event_type == "result":
+            cached = int(usage.get("cache_read_input_tokens") or 0)
+            self._add(
+                int(usage.get("input_tokens") or 0)
+                + int(usage.get("cache_creation_input_tokens") or 0)
+                + cached,
+                cached,
+                int(usage.get("output_tokens") or 0),
+            )
+            if isinstance(event.get("result"), str):
+                self.text = event["result"]
+            cost = event.get("total_cost_usd")
+            if isinstance(cost, (int, float)) and not isinstance(cost, bool):
+                self.cost_usd = (self.cost_usd or 0.0) + float(cost)
+        elif event_type == "turn.completed":
+            self._add(
+                int(usage.get("input_tokens") or 0),
+                int(usage.get("cached_input_tokens") or 0),
+                int(usage.get("output_tokens") or 0),
+            )
+        elif event_type == "item.completed":
+            item = event.get("item")
+            if (
+                isinstance(item, dict)
+                and item.get("type") == "agent_message"
+                and isinstance(item.get("text"), str)
+            ):
+                self.text = item["text"]
+
+    def _add(self, input_tokens: int, cached_input_tokens: int, output_tokens: int) -> None:
+        self.seen = True
+        self.input_tokens += input_tokens
+        self.cached_input_tokens += cached_input_tokens
+        self.output_tokens += output_tokens
+
+    def report(self) -> dict[str, int | float] | None:
+        if not self.seen:
+            return None
+        usage: dict[str, int | float] = {
+            "input_tokens": self.input_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "uncached_input_tokens": self.input_tokens - self.cached_input_tokens,
+            "output_tokens": self.output_tokens,
+        }
+        if self.cost_usd is not None:
+            usage["cost_usd"] = round(self.cost_usd, 6)
+        return usage
+
+
+class AgentTimeout(subprocess.CalledProcessError):
+    """An agent call killed by the watchdog.
+
+    Subclasses ``CalledProcessError`` so the loops' retry policy handles it
+    like any other failed agent run.
+    """
+
+    def __init__(
+        self,
+        returncode: int,
+        cmd: list[str],
+        kind: str,
+        limit_seconds: float,
+        elapsed_seconds: float,
+    ) -> None:
+        super().__init__(returncode, cmd)
+        self.kind = kind
+        self.limit_seconds = limit_seconds
+        self.elapsed_seconds = elapsed_seconds
+
+    def __str__(self) -> str:
+        return (
+            f"agent {self.kind} timeout: no completion after {self.elapsed_seconds:.0f}s "
+            f"(limit {self.limit_seconds:g}s)"
+        )
+
+
+def _timeout_from_env(name: str, default: float) -> float | None:
+    raw = os.environ.get(name, "").strip()
+    try:
+        value = float(raw) if raw else default
+    except ValueError:
+        value = default
+    return value if value > 0 else None
+
+
+def _watchdog_limits(streams_progress: bool) -> dict[str, float | None]:
+    """Return the watchdog kwargs for one agent call.
+
+    The idle limit only applies to CLIs that print while they work; text-mode
+    ``claude -p`` is silent until it finishes, so it only gets the wall limit.
+    """
+    return {
+        "idle_timeout": _timeout_from_env(AGENT_IDLE_TIMEOUT_ENV, DEFAULT_AGENT_IDLE_TIMEOUT_SECONDS)
+        if streams_progress
+        else None,
+        "wall_timeout": _timeout_from_env(AGENT_WALL_TIMEOUT_ENV, DEFAULT_AGENT_WALL_TIMEOUT_SECONDS),
+    }
+
+
+def _terminate_process_group(pgid: int, grace_seconds: float = KILL_GRACE_SECONDS) -> None:
+    """SIGTERM a process group, then SIGKILL whatever is left after ``grace_seconds``.
+
+    Liveness is polled with signal 0 instead of waiting, so the streaming
+    thread stays the only one reaping the agent and collecting its rusage.
+    """
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    deadline = time.monotonic() + grace_seconds
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            os.killpg(pgid, 0)
+        except ProcessLookupError:
+            return
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class _Watchdog:
+    """Kill an agent that goes quiet for ``idle`` or runs past ``wall`` seconds."""
+
+    def __init__(
+        self,
+        proc: subprocess.Popen,
+        idle: float | None,
+        wall: float | None,
+        cgroup: AgentCgroup | None = None,
+    ) -> None:
+        self.proc = proc
+        self.cgroup = cgroup
+        self.idle = idle
+        self.wall = wall
+        self.started_at = time.monotonic()
+        self.last_output_at = self.started_at
+        self.expired: tuple[str, float, float] | None = None
+        self._done = threading.Event()
+        limits = [limit for limit in (idle, wall) if limit]
+        self._poll_seconds = min([1.0, *(limit / 4 for limit in limits)])
+        self._thread = threading.Thread(target=self._run, daemon=True) if limits else None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            self._thread.start()
+
+    def touch(self) -> None:
+        self.last_output_at = time.monotonic()
+
+    def stop(self) -> None:
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._done.wait(self._poll_seconds):
+            now = time.monotonic()
+            if self.wall and now - self.started_at >= self.wall:
+                self.expired = ("wall", self.wall, now - self.started_at)
+            elif self.idle and now - self.last_output_at >= self.idle:
+                self.expired = ("idle", self.idle, now - self.started_at)
+            else:
+                continue
+            _terminate_process_group(self.proc.pid)
+            if self.cgroup is not None:
+                self.cgroup.kill()
+            return
+
+
+def _write_stdin(proc: subprocess.Popen, data: bytes) -> None:
+    try:
+        proc.stdin.write(data)
+    except OSError:
+        # The child exited early; its return code reports the failure.
+        pass
+    finally:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+
+
+def _run_streaming(
+    cmd: list[str],
+    cwd: Path,
+    stdin_text: str | None = None,
+    on_line: Callable[[str], None] | None = None,
+    idle_timeout: float | None = None,
+    wall_timeout: float | None = None,
+    limits: dict[str, float] | None = None,
+    on_resources: Callable[[dict[str, Any]], None] | None = None,
+) -> str:
     """Run a command, stream stdout line-by-line to stderr, return captured stdout.
 
     Streams to stderr so that the return value (stdout capture) stays clean
     for programmatic use, while the operator still sees progress in the terminal.
+    ``stdin_text`` is fed from a thread so a large prompt cannot deadlock
+    against the child's output. ``on_line`` sees every line, including any
+    past the capture limit.
+
+    The agent runs in its own session so a watchdog expiry, or an exception
+    here, can take down the whole process group it spawned. ``limits`` are
+    applied through a per-call cgroup when one is configured, otherwise as
+    rlimits. ``on_resources`` receives the call's CPU and peak memory, also
+    for failed calls.
 
-    Raises subprocess.CalledProcessError on non-zero exit.
+    Raises AgentTimeout when the watchdog fires and
+    subprocess.CalledProcessError on other non-zero exits.
     """
-    proc = subprocess.Popen(
-        cmd,
-        cwd=cwd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=False,
-    )
+    limits = limits or {}
+    cgroup = AgentCgroup.from_env(limits)
+    if cgroup is not None:
+        try:
+            cgroup.create()
+        except OSError as error:
+            print(f"[agent] cgroup unavailable, using rlimits ({error})", file=sys.stderr)
+            cgroup = None
+    try:
+        proc = _spawn_agent(cmd, cwd, stdin_text is not None, rlimits_for(limits, cgroup), cgroup)
+    except BaseException:
+        if cgroup is not None:
+            cgroup.remove()
+        raise
+    watchdog = _Watchdog(proc, idle_timeout, wall_timeout, cgroup)
+    watchdog.start()
+    try:
+        output, rusage = _stream_output(proc, stdin_text, on_line, watchdog)
+        resources = rusage_summary(rusage)
+        if cgroup is not None:
+            resources.update(cgroup.stats())
+    except BaseException:
+        _terminate_process_group(proc.pid, grace_seconds=1.0)
+        if cgroup is not None:
+            cgroup.kill()
+        proc.wait()
+        raise
+    finally:
+        watchdog.stop()
+        if cgroup is not None:
+            cgroup.remove()
+    if on_resources is not None:
+        on_resources(resources)
+    if watchdog.expired is not None:
+        kind, limit_seconds, elapsed_seconds = watchdog.expired
+        raise AgentTimeout(proc.returncode, cmd, kind, limit_seconds, elapsed_seconds)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return output
+
+
+def _spawn_agent(
+    cmd: list[str],
+    cwd: Path,
+    with_stdin: bool,
+    rlimits: list[tuple[int, int]],
+    cgroup: AgentCgroup | None,
+) -> subprocess.Popen:
+    # Limits go through an exec wrapper rather than a preexec_fn, and the
+    # parent moves the child into the cgroup while the wrapper waits on a gate
+    # pipe, so nothing the agent spawns can start outside the cgroup.
+    gate_read = gate_write = None
+    if cgroup is not None:
+        gate_read, gate_write = os.pipe()
+    if rlimits or cgroup is not None:
+        cmd = wrap_command(cmd, rlimits, gate_read)
+    try:
+        proc = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdin=subprocess.PIPE if with_stdin else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=False,
+            start_new_session=True,
+            pass_fds=(gate_read,) if gate_read is not None else (),
+        )
+    except BaseException:
+        if gate_write is not None:
+            os.close(gate_write)
+        raise
+    finally:
+        if gate_read is not None:
+            os.close(gate_read)
+    if cgroup is None or gate_write is None:
+        return proc
+    try:
+        cgroup.attach(proc.pid)
+        os.write(gate_write, b"1")
+    except OSError:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        os.close(gate_write)
+    return proc
+
+
+def _stream_output(
+    proc: subprocess.Popen,
+    stdin_text: str | None,
+    on_line: Callable[[str], None] | None,
+    watchdog: _Watchdog,
+) -> tuple[str, Any]:
+    writer = None
+    if stdin_text is not None:
+        writer = threading.Thread(
+            target=_write_stdin, args=(proc, stdin_text.encode("utf-8")), daemon=True
+        )
+        writer.start()
     chunks: list[str] = []
     captured_chars = 0
     if proc.stdout is None:
@@ -122,9 +540,12 @@ def _run_streaming(cmd: list[str], cwd: Path) -> str:
     for raw_line in proc.stdout:
         # Codex can emit binary/null-filled chunks on reconnect paths.
         # Decode defensively so the SubTurtle loop keeps retrying instead of crashing.
+        watchdog.touch()
         line = raw_line.decode("utf-8", errors="replace").replace("\x00", "")
         sys.stderr.write(line)
         sys.stderr.flush()
+        if on_line is not None:
+            on_line(line)
         if captured_chars < MAX_CAPTURE_CHARS:
             remaining = MAX_CAPTURE_CHARS - captured_chars
             if len(line) <= remaining:
@@ -133,18 +554,73 @@ def _run_streaming(cmd: list[str], cwd: Path) -> str:
             else:
                 chunks.append(line[:remaining])
                 captured_chars = MAX_CAPTURE_CHARS
-    proc.wait()
-    if proc.returncode != 0:
-        raise subprocess.CalledProcessError(proc.returncode, cmd)
-    return "".join(chunks).strip()
+    # wait4 instead of proc.wait() so the call's rusage is not lost.
+    _pid, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if writer is not None:
+        writer.join()
+    return "".join(chunks).strip(), rusage
+
+
+def _finish_usage(
+    agent: str, scanner: _UsageScanner | None, result: str, on_usage: UsageHook | None
+) -> str:
+    """Report scanned usage and return the agent's final text."""
+    if scanner is None:
+        return result
+    usage = scanner.report()
+    if usage is not None and "cost_usd" not in usage:
+        prices = _agent_prices(agent)
+        if prices:
+            usage["cost_usd"] = estimate_cost_usd(usage, prices)
+    if usage is not None and on_usage is not None:
+        on_usage(agent, usage)
+    return scanner.text if scanner.text is not None else result
+
+
+def _resource_reporter(
+    agent: str, on_resources: ResourceHook | None
+) -> Callable[[dict[str, Any]], None] | None:
+    if on_resources is None:
+        return None
+    return lambda resources: on_resources(agent, resources)
 
 
 class Claude:
     """Claude Code agent -- planning mode."""
 
-    def __init__(self, cwd: str | Path = ".", add_dirs: list[str] | None = None) -> None:
+    def __init__(
+        self,
+        cwd: str | Path = ".",
+        add_dirs: list[str] | None = None,
+        on_usage: UsageHook | None = None,
+        limits: dict[str, float] | None = None,
+        on_resources: ResourceHook | None = None,
+    ) -> None:
         self.cwd = Path(cwd).resolve()
         self.add_dirs = add_dirs or []
+        self.on_usage = on_usage
+        self.limits = limits or {}
+        self.on_resources = on_resources
+
+    def _run_prompt(self, cmd: list[str], prompt: str) -> str:
+        scanner = None
+        if usage_reporting_enabled():
+            scanner = _UsageScanner()
+            cmd = [*cmd, "--output-format", "stream-json", "--verbose"]
+        options = {
+            **_watchdog_limits(streams_progress=scanner is not None),
+            "limits": self.limits,
+            "on_resources": _resource_reporter("claude", self.on_resources),
+        }
+        # `claude -p` without a prompt argument reads the prompt from stdin.
+        if prompt_transport(prompt) == "stdin":
+            result = _run_streaming(
+                [*cmd, "-p"], self.cwd, stdin_text=prompt, on_line=scanner, **options
+            )
+        else:
+            result = _run_streaming([*cmd, "-p", prompt], self.cwd, on_line=scanner, **options)
+        return _finish_usage("claude", scanner, result, self.on_usage)
 
     def plan(self, prompt: str) -> str:
         """Generate an implementation plan from a prompt. Returns the plan text."""
@@ -159,8 +635,7 @@ class Claude:
         ]
         for add_dir in self.add_dirs:
             cmd.extend(["--add-dir", add_dir])
-        cmd.extend(["-p", prompt])
-        result = _run_streaming(cmd, self.cwd)
+        result = self._run_prompt(cmd, prompt)
         print(f"[claude] plan ready ({len(result)} chars)")
         print(result)
         return result
@@ -176,8 +651,7 @@ class Claude:
         ]
         for add_dir in self.add_dirs:
             cmd.extend(["--add-dir", add_dir])
-        cmd.extend(["-p", prompt])
-        result = _run_streaming(cmd, self.cwd)
+        result = self._run_prompt(cmd, prompt)
         print(f"[claude] executed ready ({len(result)} chars)")
         return result
 
@@ -190,10 +664,16 @@ class Codex:
         cwd: str | Path = ".",
         add_dirs: list[str] | None = None,
         model: str | None = None,
+        on_usage: UsageHook | None = None,
+        limits: dict[str, float] | None = None,
+        on_resources: ResourceHook | None = None,
     ) -> None:
         self.cwd = Path(cwd).resolve()
         self.add_dirs = add_dirs or []
         self.model = model
+        self.on_usage = on_usage
+        self.limits = limits or {}
+        self.on_resources = on_resources
 
     def execute(self, prompt: str) -> str:
         """Execute a prompt with full auto-approval. Returns agent output."""
@@ -203,7 +683,22 @@ class Codex:
             cmd.extend(["--model", self.model])
         for add_dir in self.add_dirs:
             cmd.extend(["--add-dir", add_dir])
-        cmd.append(prompt)
-        result = _run_streaming(cmd, self.cwd)
+        scanner = None
+        if usage_reporting_enabled():
+            scanner = _UsageScanner()
+            cmd.append("--json")
+        options = {
+            **_watchdog_limits(streams_progress=True),
+            "limits": self.limits,
+            "on_resources": _resource_reporter("codex", self.on_resources),
+        }
+        if prompt_transport(prompt) == "stdin":
+            # `codex exec -` reads the prompt from stdin.
+            result = _run_streaming(
+                [*cmd, "-"], self.cwd, stdin_text=prompt, on_line=scanner, **options
+            )
+        else:
+            result = _run_streaming([*cmd, prompt], self.cwd, on_line=scanner, **options)
+        result = _finish_usage("codex", scanner, result, self.on_usage)
         print("[codex] done")
         return result
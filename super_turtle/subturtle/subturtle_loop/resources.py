@@ -0,0 +1,227 @@
+"""Resource limits and accounting for agent process trees."""
+
+import json
+import os
+import re
+import resource
+import secrets
+import sys
+from pathlib import Path
+from typing import Any
+
+# Limits spec, e.g. "memory=8g,pids=512,cpus=2,cpu_seconds=3600".
+# SUPERTURTLE_AGENT_LIMITS_<LOOP_TYPE> (upper-cased, "-" -> "_") overrides
+# SUPERTURTLE_AGENT_LIMITS for one loop type. memory, pids and cpus are meant
+# for a cgroup (see below); without one they fall back to coarse rlimits, see
+# rlimits_for().
+AGENT_LIMITS_ENV = "SUPERTURTLE_AGENT_LIMITS"
+# A delegated, writable cgroup v2 directory. When set, each agent call runs in
+# its own child cgroup, which bounds and accounts for the whole process tree.
+AGENT_CGROUP_PARENT_ENV = "SUPERTURTLE_AGENT_CGROUP_PARENT"
+CGROUP_PREFIX = "subturtle-"
+CPU_PERIOD_USEC = 100_000
+_SIZE_RE = re.compile(r"^(\d+(?:\.\d+)?)([kmgt]?)b?$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+LIMIT_KEYS = ("cpu_seconds", "memory", "pids", "cpus")
+
+
+def _parse_size(raw: str) -> int:
+    match = _SIZE_RE.match(raw.strip())
+    if match is None:
+        raise ValueError(f"invalid size: {raw!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).lower()])
+
+
+def parse_limits(spec: str) -> dict[str, float]:
+    """Parse a ``key=value`` limits spec; raises ValueError on unknown keys."""
+    limits: dict[str, float] = {}
+    for part in spec.replace(";", ",").split(","):
+        if not part.strip():
+            continue
+        key, sep, raw = part.partition("=")
+        key = key.strip().lower()
+        if not sep or key not in LIMIT_KEYS:
+            raise ValueError(f"invalid agent limit: {part.strip()!r}")
+        limits[key] = _parse_size(raw) if key == "memory" else float(raw)
+    return limits
+
+
+def limits_from_env(loop_type: str | None = None) -> dict[str, float]:
+    """Return the configured limits for ``loop_type``; empty means unlimited."""
+    keys = [AGENT_LIMITS_ENV]
+    if loop_type:
+        keys.insert(0, f"{AGENT_LIMITS_ENV}_{loop_type.upper().replace('-', '_')}")
+    for key in keys:
+        spec = os.environ.get(key, "").strip()
+        if spec:
+            return parse_limits(spec)
+    return {}
+
+
+class AgentCgroup:
+    """A per-invocation cgroup v2 child used to bound and measure one agent call."""
+
+    def __init__(self, parent: Path, limits: dict[str, float]) -> None:
+        self.parent = parent
+        self.path = parent / f"{CGROUP_PREFIX}{os.getpid()}-{secrets.token_hex(3)}"
+        self.limits = limits
+
+    @classmethod
+    def from_env(cls, limits: dict[str, float]) -> "AgentCgroup | None":
+        parent = os.environ.get(AGENT_CGROUP_PARENT_ENV, "").strip()
+        if not parent:
+            return None
+        return cls(Path(parent), limits)
+
+    def create(self) -> None:
+        _sweep_empty_cgroups(self.parent)
+        self.path.mkdir()
+        if "memory" in self.limits:
+            (self.path / "memory.max").write_text(str(int(self.limits["memory"])))
+        if "pids" in self.limits:
+            (self.path / "pids.max").write_text(str(int(self.limits["pids"])))
+        if "cpus" in self.limits:
+            quota = int(self.limits["cpus"] * CPU_PERIOD_USEC)
+            (self.path / "cpu.max").write_text(f"{quota} {CPU_PERIOD_USEC}")
+
+    def attach(self, pid: int) -> None:
+        """Move ``pid`` into the cgroup; its later children stay inside."""
+        (self.path / "cgroup.procs").write_text(str(pid))
+
+    def kill(self) -> None:
+        """Kill every process in the cgroup, including ones that left the group."""
+        try:
+            (self.path / "cgroup.kill").write_text("1")
+        except OSError:
+            pass
+
+    def stats(self) -> dict[str, Any]:
+        stats: dict[str, Any] = {}
+        try:
+            stats["cgroup_peak_memory_bytes"] = int((self.path / "memory.peak").read_text())
+        except (OSError, ValueError):
+            pass
+        try:
+            for line in (self.path / "cpu.stat").read_text().splitlines():
+                key, _, value = line.partition(" ")
+                if key == "usage_usec":
+                    stats["cgroup_cpu_seconds"] = round(int(value) / 1_000_000, 3)
+        except (OSError, ValueError):
+            pass
+        return stats
+
+    def remove(self) -> None:
+        """Remove the cgroup if empty; a later call sweeps it otherwise."""
+        try:
+            self.path.rmdir()
+        except OSError:
+            pass
+
+
+def _sweep_empty_cgroups(parent: Path) -> None:
+    # Agents may leave background processes behind on a clean exit; their
+    # cgroup is kept until those exit and is removed here afterwards.
+    for child in parent.glob(f"{CGROUP_PREFIX}*"):
+        try:
+            child.rmdir()
+        except OSError:
+            continue
+
+
+def rlimits_for(limits: dict[str, float], cgroup: AgentCgroup | None) -> list[tuple[int, int]]:
+    """Map limits to setrlimit calls; cgroup-enforced ones are skipped.
+
+    Without a cgroup, memory and pids fall back to rlimits with different
+    semantics: RLIMIT_AS caps virtual address space, which runtimes such as
+    node/V8 reserve far beyond their resident use, and RLIMIT_NPROC counts
+    every process of the user, not just the agent's. Set these only on hosts
+    without a delegated cgroup, and size them generously. cpus has no rlimit
+    equivalent and is ignored there.
+    """
+    rlimits: list[tuple[int, int]] = []
+    if "cpu_seconds" in limits:
+        rlimits.append((resource.RLIMIT_CPU, int(limits["cpu_seconds"])))
+    if cgroup is None and "memory" in limits:
+        rlimits.append((resource.RLIMIT_AS, int(limits["memory"])))
+    if cgroup is None and "pids" in limits:
+        rlimits.append((resource.RLIMIT_NPROC, int(limits["pids"])))
+    return rlimits
+
+
+# Runs in the child between fork and the agent's exec: waits for the parent
+# to place it in the cgroup (when a gate fd is passed), applies rlimits, then
+# execs the agent in place so pid, process group and rusage are unchanged.
+_EXEC_WRAPPER = """\
+import json, os, resource, sys
+spec = json.loads(sys.argv[1])
+if spec["gate_fd"] is not None:
+    if os.read(spec["gate_fd"], 1) != b"1":
+        sys.exit(125)
+    os.close(spec["gate_fd"])
+for limit, value in spec["rlimits"]:
+    resource.setrlimit(limit, (value, value))
+os.execvp(sys.argv[2], sys.argv[2:])
+"""
+
+
+def wrap_command(cmd: list[str], rlimits: list[tuple[int, int]], gate_fd: int | None) -> list[str]:
+    """Prefix ``cmd`` with the exec wrapper that applies rlimits in the child.
+
+    Used instead of a ``preexec_fn``, which is unsafe while the parent runs
+    threads. With ``gate_fd`` the child blocks until the parent writes b"1"
+    to the other end of that pipe, after moving the child into its cgroup.
+    """
+    spec = json.dumps({"rlimits": rlimits, "gate_fd": gate_fd})
+    return [sys.executable, "-c", _EXEC_WRAPPER, spec, *cmd]
+
+
+# Peak values combine with max() across calls; every other counter is summed.
+PEAK_RESOURCE_KEYS = ("peak_rss_kb", "cgroup_peak_memory_bytes")
+
+
+def rusage_summary(rusage: resource.struct_rusage) -> dict[str, Any]:
+    """Return the checkpoint record for one agent call's ``wait4`` rusage.
+
+    The child's rusage includes every descendant it reaped, so CPU, block
+    I/O and context switches cover the tree; ``peak_rss_kb`` is the largest
+    single process.
+    """
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS.
+    peak_rss_kb = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    return {
+        "cpu_seconds": round(rusage.ru_utime + rusage.ru_stime, 3),
+        "user_cpu_seconds": round(rusage.ru_utime, 3),
+        "system_cpu_seconds": round(rusage.ru_stime, 3),
+        "peak_rss_kb": peak_rss_kb,
+        "block_input_ops": rusage.ru_inblock,
+        "block_output_ops": rusage.ru_oublock,
+        "voluntary_context_switches": rusage.ru_nvcsw,
+        "involuntary_context_switches": rusage.ru_nivcsw,
+    }
+
+
+def merge_resources(total: dict[str, Any], sample: dict[str, Any]) -> None:
+    """Fold one call's resource record into ``total`` in place."""
+    for key, value in sample.items():
+        if not isinstance(value, (int, float)):
+            continue
+        if key in PEAK_RESOURCE_KEYS:
+            total[key] = max(total.get(key, 0), value)
+        elif isinstance(value, float):
+            total[key] = round(total.get(key, 0) + value, 3)
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+__all__ = [
+    "AGENT_CGROUP_PARENT_ENV",
+    "AGENT_LIMITS_ENV",
+    "PEAK_RESOURCE_KEYS",
+    "AgentCgroup",
+    "limits_from_env",
+    "merge_resources",
+    "parse_limits",
+    "rlimits_for",
+    "rusage_summary",
+    "wrap_command",
+]
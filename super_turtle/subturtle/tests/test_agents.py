@@ -1,6 +1,11 @@
+import os
+import sys
+import time
 from pathlib import Path
 
-from super_turtle.subturtle.subturtle_loop import agents
+import pytest
+
+from super_turtle.subturtle.subturtle_loop import agents, resources
 
 
 class _CompletedProcess:
@@ -26,3 +31,249 @@ def test_allowed_tools_arg_merges_discovered_and_fallback(monkeypatch, tmp_path)
     assert "SlashCommand" in allowed
     assert "Read" in allowed
     assert "Write" in allowed
+
+
+def test_large_prompts_are_sent_on_stdin(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv(agents.ARGV_PROMPT_MAX_BYTES_ENV, "16")
+    calls = []
+
+    def fake_run_streaming(cmd, cwd, stdin_text=None, on_line=None, **_limits):
+        calls.append((cmd, stdin_text))
+        return "ok"
+
+    monkeypatch.setattr(agents, "_run_streaming", fake_run_streaming)
+    monkeypatch.setattr(agents, "_allowed_tools_arg", lambda _cwd: "Bash")
+
+    agents.Claude(cwd=tmp_path).execute("short")
+    agents.Claude(cwd=tmp_path).execute("a much longer prompt")
+    agents.Codex(cwd=tmp_path).execute("a much longer prompt")
+
+    assert calls[0][0][-2:] == ["-p", "short"]
+    assert calls[0][1] is None
+    assert calls[1][0][-1] == "-p"
+    assert calls[1][1] == "a much longer prompt"
+    assert calls[2][0][-1] == "-"
+    assert calls[2][1] == "a much longer prompt"
+
+
+def test_run_streaming_feeds_stdin_larger_than_pipe_buffer(tmp_path) -> None:
+    text = "x" * 1_000_000
+
+    output = agents._run_streaming(
+        [sys.executable, "-c", "import sys; print(len(sys.stdin.read()))"],
+        tmp_path,
+        stdin_text=text,
+    )
+
+    assert output == str(len(text))
+
+
+def test_usage_mode_reports_cached_tokens_and_returns_final_text(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv(agents.AGENT_USAGE_ENV, "1")
+    monkeypatch.setattr(agents, "_allowed_tools_arg", lambda _cwd: "Bash")
+    claude_lines = [
+        '{"type":"system","subtype":"init"}\n',
+        '{"type":"result","result":"the plan","usage":{"input_tokens":10,'
+        '"cache_creation_input_tokens":90,"cache_read_input_tokens":900,"output_tokens":50}}\n',
+    ]
+    codex_lines = [
+        '{"type":"item.completed","item":{"type":"agent_message","text":"done"}}\n',
+        '{"type":"turn.completed","usage":{"input_tokens":400,"cached_input_tokens":300,"output_tokens":7}}\n',
+    ]
+    commands = []
+
+    def fake_run_streaming(cmd, cwd, stdin_text=None, on_line=None, **_limits):
+        commands.append(cmd)
+        for line in claude_lines if cmd[0] == "claude" else codex_lines:
+            on_line(line)
+        return "raw json"
+
+    monkeypatch.setattr(agents, "_run_streaming", fake_run_streaming)
+    reported = []
+
+    def record(agent, usage):
+        reported.append((agent, usage))
+
+    assert agents.Claude(cwd=tmp_path, on_usage=record).plan("prompt") == "the plan"
+    assert agents.Codex(cwd=tmp_path, on_usage=record).execute("prompt") == "done"
+
+    assert "stream-json" in commands[0]
+    assert "--json" in commands[1]
+    assert reported == [
+        (
+            "claude",
+            {"input_tokens": 1000, "cached_input_tokens": 900, "uncached_input_tokens": 100, "output_tokens": 50},
+        ),
+        (
+            "codex",
+            {"input_tokens": 400, "cached_input_tokens": 300, "uncached_input_tokens": 100, "output_tokens": 7},
+        ),
+    ]
+
+
+def test_usage_reports_claude_cost_and_prices_codex_tokens(monkeypatch, tmp_path) -> None:
+    monkeypatch.delenv(agents.AGENT_USAGE_ENV, raising=False)
+    monkeypatch.setenv(agents.COST_BUDGET_ENV, "5")
+    monkeypatch.setenv(f"{agents.AGENT_PRICE_ENV}_CODEX", "input=2,cached_input=0.5,output=10")
+    monkeypatch.setattr(agents, "_allowed_tools_arg", lambda _cwd: "Bash")
+    lines = {
+        "claude": [
+            '{"type":"result","result":"ok","total_cost_usd":0.0125,'
+            '"usage":{"input_tokens":100,"output_tokens":10}}\n'
+        ],
+        "codex": [
+            '{"type":"turn.completed","usage":{"input_tokens":1000000,'
+            '"cached_input_tokens":600000,"output_tokens":100000}}\n'
+        ],
+    }
+
+    def fake_run_streaming(cmd, cwd, stdin_text=None, on_line=None, **_limits):
+        for line in lines[cmd[0]]:
+            on_line(line)
+        return "raw json"
+
+    monkeypatch.setattr(agents, "_run_streaming", fake_run_streaming)
+    reported = {}
+
+    def record(agent, usage):
+        reported[agent] = usage
+
+    agents.Claude(cwd=tmp_path, on_usage=record).execute("prompt")
+    agents.Codex(cwd=tmp_path, on_usage=record).execute("prompt")
+
+    assert reported["claude"]["cost_usd"] == 0.0125
+    # 400k uncached at $2 + 600k cached at $0.50 + 100k output at $10.
+    assert reported["codex"]["cost_usd"] == 2.1
+
+
+def _process_running(pid: int) -> bool:
+    # A killed orphan lingers as a zombie until its new parent reaps it.
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text(encoding="utf-8")
+    except OSError:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+    return stat.rsplit(")", 1)[1].split()[0] != "Z"
+
+
+def test_watchdog_kills_idle_agent_process_group(tmp_path) -> None:
+    child_pid_file = tmp_path / "child.pid"
+    script = f"sleep 30 & echo $! > {child_pid_file}; echo started; wait"
+
+    with pytest.raises(agents.AgentTimeout) as excinfo:
+        agents._run_streaming(["sh", "-c", script], tmp_path, idle_timeout=0.3)
+
+    assert excinfo.value.kind == "idle"
+    assert excinfo.value.elapsed_seconds < 5
+    child_pid = int(child_pid_file.read_text(encoding="utf-8"))
+    deadline = time.monotonic() + 5
+    while _process_running(child_pid):
+        if time.monotonic() > deadline:
+            pytest.fail("grandchild survived the process-group kill")
+        time.sleep(0.05)
+
+
+def test_watchdog_wall_limit_applies_to_chatty_agents(tmp_path) -> None:
+    script = "import time\nwhile True:\n    print('tick', flush=True)\n    time.sleep(0.05)\n"
+
+    with pytest.raises(agents.AgentTimeout) as excinfo:
+        agents._run_streaming(
+            [sys.executable, "-c", script], tmp_path, idle_timeout=5, wall_timeout=0.4
+        )
+
+    assert excinfo.value.kind == "wall"
+    assert isinstance(excinfo.value, agents.subprocess.CalledProcessError)
+
+
+def test_idle_limit_is_off_unless_configured(monkeypatch) -> None:
+    monkeypatch.delenv(agents.AGENT_IDLE_TIMEOUT_ENV, raising=False)
+
+    assert agents._watchdog_limits(streams_progress=True)["idle_timeout"] is None
+
+
+def test_claude_text_mode_skips_idle_limit(monkeypatch) -> None:
+    monkeypatch.delenv(agents.AGENT_USAGE_ENV, raising=False)
+    monkeypatch.setenv(agents.AGENT_IDLE_TIMEOUT_ENV, "60")
+    monkeypatch.setenv(agents.AGENT_WALL_TIMEOUT_ENV, "0")
+
+    assert agents._watchdog_limits(streams_progress=False) == {
+        "idle_timeout": None,
+        "wall_timeout": None,
+    }
+    assert agents._watchdog_limits(streams_progress=True)["idle_timeout"] == 60
+
+
+def test_parse_limits_reads_sizes_and_rejects_unknown_keys(monkeypatch) -> None:
+    assert resources.parse_limits("memory=1.5g, pids=64,cpus=2;cpu_seconds=900") == {
+        "memory": 1.5 * (1 << 30),
+        "pids": 64,
+        "cpus": 2,
+        "cpu_seconds": 900,
+    }
+    with pytest.raises(ValueError):
+        resources.parse_limits("disk=10g")
+
+    monkeypatch.setenv(resources.AGENT_LIMITS_ENV, "pids=10")
+    monkeypatch.setenv(f"{resources.AGENT_LIMITS_ENV}_YOLO_CODEX", "pids=20")
+    assert resources.limits_from_env("slow") == {"pids": 10}
+    assert resources.limits_from_env("yolo-codex") == {"pids": 20}
+
+
+def test_run_streaming_applies_rlimits_and_reports_resources(monkeypatch, tmp_path) -> None:
+    monkeypatch.delenv(resources.AGENT_CGROUP_PARENT_ENV, raising=False)
+    reports = []
+    script = "import resource; print(resource.getrlimit(resource.RLIMIT_CPU)[0])"
+
+    output = agents._run_streaming(
+        [sys.executable, "-c", script],
+        tmp_path,
+        limits={"cpu_seconds": 77},
+        on_resources=reports.append,
+    )
+
+    assert output == "77"
+    assert len(reports) == 1
+    assert reports[0]["peak_rss_kb"] > 0
+    assert reports[0]["cpu_seconds"] >= 0
+
+
+def test_run_streaming_attaches_agent_to_cgroup_before_exec(monkeypatch, tmp_path) -> None:
+    # A plain directory stands in for the delegated cgroup: the parent writes
+    # the child's pid to cgroup.procs before the exec wrapper lets it run.
+    parent = tmp_path / "cgroup"
+    parent.mkdir()
+    monkeypatch.setenv(resources.AGENT_CGROUP_PARENT_ENV, str(parent))
+    script = "import os; print(os.getpid())"
+
+    output = agents._run_streaming(
+        [sys.executable, "-c", script], tmp_path, limits={"memory": 1 << 30}
+    )
+
+    [cgroup] = parent.glob(f"{resources.CGROUP_PREFIX}*")
+    assert (cgroup / "cgroup.procs").read_text() == output
+    assert (cgroup / "memory.max").read_text() == str(1 << 30)
+    fallback_limits = {"memory": 1 << 30, "pids": 5}
+    assert len(resources.rlimits_for(fallback_limits, None)) == 2
+    assert resources.rlimits_for(fallback_limits, resources.AgentCgroup(parent, {})) == []
+
+
+def test_failed_agent_call_still_reports_resources(tmp_path) -> None:
+    reports = []
+
+    with pytest.raises(agents.subprocess.CalledProcessError):
+        agents._run_streaming(["sh", "-c", "exit 3"], tmp_path, on_resources=reports.append)
+
+    assert len(reports) == 1
+    assert set(reports[0]) == {
+        "cpu_seconds",
+        "user_cpu_seconds",
+        "system_cpu_seconds",
+        "peak_rss_kb",
+        "block_input_ops",
+        "block_output_ops",
+        "voluntary_context_switches",
+        "involuntary_context_switches",
+    }
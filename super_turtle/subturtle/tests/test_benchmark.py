@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from super_turtle.subturtle import benchmark
+
+
+@pytest.mark.parametrize(("loop_type", "iterations"), [("yolo-codex", 2), ("slow", 1)])
+def test_benchmark_loop_runs_against_stub_agents(loop_type, iterations, tmp_path) -> None:
+    result = benchmark.benchmark_loop(loop_type, iterations=iterations, lines=20, work_dir=tmp_path)
+
+    assert result["agent_calls"] == iterations * benchmark.AGENT_CALLS_PER_ITERATION[loop_type]
+    per_iteration = result["per_iteration"]
+    assert per_iteration["overhead_ms"] > 0
+    assert per_iteration["sections_ms"]["checkpoint_write"] > 0
+    assert per_iteration["checkpoint_sections_ms"]["handoff_refresh"] > 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stub_output_is_stream_json_with_usage() -> None:
+    lines = benchmark.agent_output("claude", lines=3, line_bytes=120).splitlines()
+
+    events = [json.loads(line) for line in lines]
+    assert len(events) == 4
+    assert events[-1]["type"] == "result"
+    assert events[-1]["usage"]["output_tokens"] == 50
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from super_turtle.subturtle import gitmeta
+
+
+def _git(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+        text=True,
+        env={
+            "GIT_AUTHOR_NAME": "t",
+            "GIT_AUTHOR_EMAIL": "t@example.com",
+            "GIT_COMMITTER_NAME": "t",
+            "GIT_COMMITTER_EMAIL": "t@example.com",
+            "HOME": str(repo),
+            "PATH": "/usr/bin:/bin:/usr/local/bin",
+        },
+    ).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path) -> Path:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    (repo / "src").mkdir()
+    (repo / "src" / "app.py").write_text("a\nb\nc\n", encoding="utf-8")
+    (repo / "README.md").write_text("hello\n", encoding="utf-8")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "Initial commit")
+    yield repo
+    gitmeta.close_all()
+
+
+def test_read_head_sha_resolves_loose_packed_detached_and_worktree_refs(repo, tmp_path) -> None:
+    head = _git(repo, "rev-parse", "HEAD")
+    assert gitmeta.read_head_sha(repo / "src") == head
+
+    _git(repo, "pack-refs", "--all")
+    assert not (repo / ".git" / "refs" / "heads" / "main").exists()
+    assert gitmeta.read_head_sha(repo) == head
+
+    _git(repo, "worktree", "add", "-q", "-b", "side", str(tmp_path / "side"))
+    assert gitmeta.read_head_sha(tmp_path / "side") == head
+
+    _git(repo, "checkout", "-q", "--detach")
+    assert gitmeta.read_head_sha(repo) == head
+    assert gitmeta.read_head_sha(tmp_path / "not-a-repo") is None
+
+
+def test_checkpoint_metadata_matches_git_numstat(repo) -> None:
+    base = _git(repo, "rev-parse", "HEAD")
+    (repo / "src" / "app.py").write_text("a\nB\nc\nd\n", encoding="utf-8")
+    (repo / "src" / "new.py").write_text("x\ny\n", encoding="utf-8")
+    (repo / "README.md").unlink()
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "Rework app\n\nBody text")
+    head = _git(repo, "rev-parse", "HEAD")
+
+    metadata = gitmeta.checkpoint_git_metadata(repo, head, base)
+
+    numstat = _git(repo, "diff", "--numstat", base, head).splitlines()
+    expected_insertions = sum(int(line.split()[0]) for line in numstat)
+    expected_deletions = sum(int(line.split()[1]) for line in numstat)
+    assert metadata["commits_since_checkpoint"] is True
+    assert metadata["subject"] == "Rework app"
+    assert metadata["files_changed"] == len(numstat) == 3
+    assert (metadata["insertions"], metadata["deletions"]) == (expected_insertions, expected_deletions)
+    assert {entry["path"] for entry in metadata["files"]} == {"README.md", "src/app.py", "src/new.py"}
+
+    # Without a previous checkpoint the first parent is the base.
+    assert gitmeta.checkpoint_git_metadata(repo, head)["base_sha"] == base
+    assert gitmeta.checkpoint_git_metadata(repo, head, head) == {"commits_since_checkpoint": False}
+    assert gitmeta.checkpoint_git_metadata(repo, "0" * 40, base) is None
+
+
+def test_missing_or_unrelated_base_reports_no_diffstat(repo, monkeypatch) -> None:
+    (repo / "src" / "app.py").write_text("a\nB\nc\n", encoding="utf-8")
+    _git(repo, "commit", "-q", "-am", "Tweak app")
+    head = _git(repo, "rev-parse", "HEAD")
+    head_tree = _git(repo, "rev-parse", f"{head}^{{tree}}")
+    _git(repo, "checkout", "-q", "--orphan", "rewritten")
+    _git(repo, "commit", "-q", "-m", "Unrelated root")
+    unrelated = _git(repo, "rev-parse", "HEAD")
+    read_objects = gitmeta.cat_file_for(repo).read_objects
+    requested = []
+
+    def recording_read_objects(names):
+        names = list(names)
+        requested.extend(names)
+        return read_objects(names)
+
+    monkeypatch.setattr(gitmeta.cat_file_for(repo), "read_objects", recording_read_objects)
+
+    for base in ("f" * 40, unrelated):
+        requested.clear()
+        metadata = gitmeta.checkpoint_git_metadata(repo, head, base)
+        assert metadata == {
+            "commits_since_checkpoint": True,
+            "base_sha": base,
+            "base_missing": True,
+            "subject": "Tweak app",
+        }
+        assert head_tree not in requested
+
+
+def test_diffstat_skips_oversized_blobs_without_reading_them(repo, monkeypatch) -> None:
+    base = _git(repo, "rev-parse", "HEAD")
+    (repo / "big.txt").write_text("line\n" * 100, encoding="utf-8")
+    (repo / "src" / "app.py").write_text("a\nb\nc\nd\n", encoding="utf-8")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "Add big file")
+    head = _git(repo, "rev-parse", "HEAD")
+    big_sha = _git(repo, "rev-parse", f"{head}:big.txt")
+    monkeypatch.setattr(gitmeta, "MAX_DIFF_BLOB_BYTES", 100)
+    cat_file = gitmeta.cat_file_for(repo)
+    read_objects = cat_file.read_objects
+    requested = []
+
+    def recording_read_objects(names):
+        names = list(names)
+        requested.extend(names)
+        return read_objects(names)
+
+    monkeypatch.setattr(cat_file, "read_objects", recording_read_objects)
+
+    stats = gitmeta.diffstat(repo, head, base)
+
+    assert big_sha not in requested
+    entries = {entry["path"]: entry for entry in stats["files"]}
+    assert entries["big.txt"]["binary_or_large"] is True
+    assert entries["src/app.py"]["insertions"] == 1
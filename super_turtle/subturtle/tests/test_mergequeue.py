@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from super_turtle.state.conductor_state import ConductorStateStore
+from super_turtle.subturtle import mergequeue
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "t",
+    "GIT_AUTHOR_EMAIL": "t@example.com",
+    "GIT_COMMITTER_NAME": "t",
+    "GIT_COMMITTER_EMAIL": "t@example.com",
+    "PATH": "/usr/bin:/bin:/usr/local/bin",
+}
+
+
+def _git(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**GIT_ENV, "HOME": str(repo)},
+    ).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch) -> Path:
+    for key, value in GIT_ENV.items():
+        monkeypatch.setenv(key, value)
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    (repo / ".gitignore").write_text(".superturtle/\n", encoding="utf-8")
+    (repo / "shared.txt").write_text("base\n", encoding="utf-8")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "Initial commit")
+    _git(repo, "branch", "integration")
+    return repo
+
+
+def _commit_on_branch(repo: Path, worker: str, filename: str, text: str) -> str:
+    branch = f"subturtle/{worker}"
+    _git(repo, "checkout", "-q", "-B", branch, "main")
+    (repo / filename).write_text(text, encoding="utf-8")
+    _git(repo, "add", filename)
+    _git(repo, "commit", "-q", "-m", f"{worker} work")
+    head = _git(repo, "rev-parse", "HEAD")
+    _git(repo, "checkout", "-q", "main")
+    return head
+
+
+def _checkpoint(store: ConductorStateStore, worker: str, head: str) -> None:
+    store.append_event(
+        worker_name=worker,
+        event_type="worker.checkpoint",
+        emitted_by="subturtle",
+        run_id=f"run-{worker}",
+        lifecycle_state="running",
+        payload={"kind": "iteration_complete", "head_sha": head, "branch": f"subturtle/{worker}"},
+    )
+
+
+def test_clean_checkpoints_land_as_one_batch(repo) -> None:
+    store = ConductorStateStore(repo / ".superturtle" / "state")
+    alpha = _commit_on_branch(repo, "alpha", "alpha.txt", "a\n")
+    beta = _commit_on_branch(repo, "beta", "beta.txt", "b\n")
+    _checkpoint(store, "alpha", alpha)
+    _checkpoint(store, "beta", beta)
+    store.append_event(
+        worker_name="gamma",
+        event_type="worker.checkpoint",
+        emitted_by="subturtle",
+        payload={"head_sha": _git(repo, "rev-parse", "main")},
+    )
+
+    result = mergequeue.MergeQueue(repo, store.paths.base_dir, "integration").process()
+
+    assert result["merged"] == ["alpha", "beta"]
+    assert result["conflicts"] == []
+    tip = _git(repo, "rev-parse", "integration")
+    assert tip == result["tip"]
+    assert _git(repo, "show", f"{tip}:alpha.txt") == "a"
+    assert _git(repo, "show", f"{tip}:beta.txt") == "b"
+    assert len(_git(repo, "reflog", "integration").splitlines()) == 2
+
+    again = mergequeue.MergeQueue(repo, store.paths.base_dir, "integration").process()
+    assert again["merged"] == []
+    assert _git(repo, "rev-parse", "integration") == tip
+
+
+def test_conflicting_head_becomes_critical_wakeup_once(repo) -> None:
+    store = ConductorStateStore(repo / ".superturtle" / "state")
+    alpha = _commit_on_branch(repo, "alpha", "shared.txt", "alpha\n")
+    beta = _commit_on_branch(repo, "beta", "shared.txt", "beta\n")
+    _checkpoint(store, "alpha", alpha)
+    _checkpoint(store, "beta", beta)
+    queue = mergequeue.MergeQueue(repo, store.paths.base_dir, "integration")
+
+    result = queue.process()
+
+    assert result["merged"] == ["alpha"]
+    assert result["conflicts"] == ["beta"]
+    wakeups = store.list_wakeups()
+    assert len(wakeups) == 1
+    assert wakeups[0]["category"] == "critical"
+    assert wakeups[0]["worker_name"] == "beta"
+    assert wakeups[0]["payload"]["kind"] == "merge_conflict"
+    assert wakeups[0]["payload"]["files"] == ["shared.txt"]
+
+    _checkpoint(store, "beta", beta)
+    assert queue.process()["conflicts"] == ["beta"]
+    assert len(store.list_wakeups()) == 1
+
+
+def test_checked_out_target_is_refused_and_reported(repo) -> None:
+    store = ConductorStateStore(repo / ".superturtle" / "state")
+    alpha = _commit_on_branch(repo, "alpha", "alpha.txt", "a\n")
+    _checkpoint(store, "alpha", alpha)
+    main_tip = _git(repo, "rev-parse", "main")
+    queue = mergequeue.MergeQueue(repo, store.paths.base_dir, "main")
+
+    result = queue.process()
+
+    assert result["merged"] == []
+    assert result["target_checkout"] == str(repo)
+    assert _git(repo, "rev-parse", "main") == main_tip
+    wakeups = store.list_wakeups()
+    assert len(wakeups) == 1
+    assert wakeups[0]["category"] == "critical"
+    assert wakeups[0]["payload"]["kind"] == "merge_target_checked_out"
+    assert wakeups[0]["payload"]["workers"] == ["alpha"]
+
+    assert queue.process()["target_checkout"] == str(repo)
+    assert len(store.list_wakeups()) == 1
+
+    # The head stays queued and lands once the target is no longer checked out.
+    _git(repo, "checkout", "-q", "--detach")
+    assert queue.process()["merged"] == ["alpha"]
+    assert _git(repo, "rev-parse", "main") == alpha
+
+
+def test_old_git_is_reported_before_merging(repo, monkeypatch) -> None:
+    store = ConductorStateStore(repo / ".superturtle" / "state")
+    _checkpoint(store, "alpha", _commit_on_branch(repo, "alpha", "alpha.txt", "a\n"))
+    monkeypatch.setattr(mergequeue, "git_version", lambda: (2, 37, 1))
+
+    with pytest.raises(RuntimeError, match="git >= 2.38"):
+        mergequeue.MergeQueue(repo, store.paths.base_dir, "integration").process()
+
+    assert _git(repo, "rev-parse", "integration") == _git(repo, "rev-parse", "main")
+
+
+def test_process_merge_queue_is_off_without_target(repo, monkeypatch) -> None:
+    monkeypatch.delenv(mergequeue.MERGE_TARGET_ENV, raising=False)
+
+    assert mergequeue.process_merge_queue(repo, repo / ".superturtle" / "state") is None
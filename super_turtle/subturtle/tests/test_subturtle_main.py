@@ -1,18 +1,23 @@
 from __future__ import annotations
 
 import argparse
+import json
 import os
-from pathlib import Path
+import pstats
 import subprocess
 import sys
+import tracemalloc
+from pathlib import Path
 
 import pytest
 
+from super_turtle.state.conductor_state import ConductorStateStore
 from super_turtle.subturtle import __main__ as subturtle_main
 from super_turtle.subturtle import loops as subturtle_loops
+from super_turtle.subturtle import profiling as subturtle_profiling
 from super_turtle.subturtle import prompts as subturtle_prompts
 from super_turtle.subturtle import statefile as subturtle_statefile
-from super_turtle.state.conductor_state import ConductorStateStore
+from super_turtle.subturtle.subturtle_loop import agents as subturtle_agents
 
 REPO_ROOT = Path(__file__).resolve().parents[3]
 SUPER_TURTLE_ROOT = REPO_ROOT / "super_turtle"
@@ -55,6 +60,111 @@ def test_slow_loop_prompts_allow_blocked_item_replanning() -> None:
     assert "Rewrite the backlog so the next iteration has a concrete unblocker" in prompts["reviewer"]
 
 
+def test_phase_prompts_put_variable_content_after_static_prefix() -> None:
+    bundle = subturtle_prompts.build_prompts("ws/CLAUDE.md")
+
+    for phase, template in bundle.items():
+        prefix = subturtle_prompts.static_prefix(template)
+        assert "{" not in prefix
+        assert template[len(prefix) :].count("\n## ") <= 1, phase
+    assert "6. Do NOT create or modify any other files." in subturtle_prompts.static_prefix(bundle["groomer"])
+
+
+def test_usage_meter_sums_agents_and_reports_cache_ratio() -> None:
+    meter = subturtle_loops.UsageMeter()
+    assert meter.as_payload() is None
+
+    meter.record("claude", {"input_tokens": 1000, "cached_input_tokens": 900})
+    meter.record("claude", {"input_tokens": 1000, "cached_input_tokens": 900})
+    meter.record("codex", {"input_tokens": 2000, "cached_input_tokens": 0})
+
+    payload = meter.as_payload()
+    assert payload["agents"]["claude"] == {"input_tokens": 2000, "cached_input_tokens": 1800}
+    assert payload["totals"] == {"input_tokens": 4000, "cached_input_tokens": 1800}
+    assert payload["cached_input_ratio"] == 0.45
+    meter.reset()
+    assert meter.as_payload() is None
+
+
+def test_resource_meter_aggregates_calls_by_phase() -> None:
+    meter = subturtle_loops.ResourceMeter({"memory": 1 << 30})
+    assert meter.as_payload() is None
+
+    with meter.phase("groomer"):
+        meter.record("claude", {"cpu_seconds": 1.25, "peak_rss_kb": 200_000, "block_input_ops": 4})
+    with meter.phase("executor"):
+        meter.record("codex", {"cpu_seconds": 3.5, "peak_rss_kb": 350_000, "block_input_ops": 6})
+        meter.record("codex", {"cpu_seconds": 0.5, "peak_rss_kb": 100_000, "block_input_ops": 1})
+    meter.record("claude", {"cpu_seconds": 0.25, "peak_rss_kb": 1_000})
+
+    payload = meter.as_payload()
+    assert payload["phases"]["executor"] == {
+        "calls": 2,
+        "cpu_seconds": 4.0,
+        "peak_rss_kb": 350_000,
+        "block_input_ops": 7,
+    }
+    assert payload["phases"]["claude"]["calls"] == 1
+    assert payload["totals"]["calls"] == 4
+    assert payload["totals"]["cpu_seconds"] == 5.5
+    assert payload["totals"]["peak_rss_kb"] == 350_000
+    assert payload["limits"] == {"memory": 1 << 30}
+    meter.reset()
+    assert meter.as_payload() is None
+
+
+def test_compress_plan_drops_code_then_truncates_with_pointer() -> None:
+    plan = "## Steps\n\n" + "- change module\n" * 10 + "```python\n" + "x = 1\n" * 400 + "```\n"
+
+    assert subturtle_prompts.compress_plan(plan, None) == plan
+    compact = subturtle_prompts.compress_plan(plan, 200)
+    assert "x = 1" not in compact
+    assert "[code omitted]" in compact
+
+    small_fence = "```sh\nmake test\n```\n"
+    mixed = subturtle_prompts.compress_plan(small_fence + plan, 200)
+    assert mixed.startswith(small_fence)
+    assert "x = 1" not in mixed
+
+    trimmed = subturtle_prompts.compress_plan(plan, 20, "ws/PLAN.md")
+    assert subturtle_prompts.estimate_tokens(trimmed) <= 20
+    assert trimmed.endswith("; read the full plan in ws/PLAN.md]")
+
+
+def test_plan_token_budget_is_opt_in_and_skips_executor_by_default(monkeypatch) -> None:
+    for phase in ("groomer", "executor", "reviewer"):
+        assert subturtle_prompts.plan_token_budget(phase) is None
+
+    monkeypatch.setenv("SUPERTURTLE_PLAN_TOKEN_BUDGET", "900")
+    monkeypatch.setenv("SUPERTURTLE_PLAN_TOKEN_BUDGET_REVIEWER", "0")
+
+    assert subturtle_prompts.plan_token_budget("groomer") == 900
+    assert subturtle_prompts.plan_token_budget("reviewer") is None
+    assert subturtle_prompts.plan_token_budget("executor") is None
+
+    monkeypatch.setenv("SUPERTURTLE_PLAN_TOKEN_BUDGET_EXECUTOR", "8000")
+    assert subturtle_prompts.plan_token_budget("executor") == 8000
+
+
+def test_budgeted_phase_prompts_write_full_plan_when_trimmed(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("SUPERTURTLE_PLAN_TOKEN_BUDGET_GROOMER", "10")
+    bundle = subturtle_prompts.build_prompts("ws/CLAUDE.md")
+    plan = "- step\n" * 50
+
+    rendered, sizes = subturtle_loops._budgeted_phase_prompts(
+        bundle, plan, "stats", tmp_path, "ws/CLAUDE.md"
+    )
+
+    assert "read the full plan in ws/PLAN.md" in rendered["groomer"]
+    assert plan in rendered["executor"]
+    assert sizes["groomer"]["plan_chars"] < len(plan) == sizes["executor"]["plan_chars"]
+    assert (tmp_path / "PLAN.md").read_text(encoding="utf-8") == plan
+
+    monkeypatch.delenv("SUPERTURTLE_PLAN_TOKEN_BUDGET_GROOMER")
+    subturtle_loops._budgeted_phase_prompts(bundle, plan, "stats", tmp_path, "ws/CLAUDE.md")
+    assert not (tmp_path / "PLAN.md").exists()
+
+
 def test_main_dispatches_to_run_loop(monkeypatch, tmp_path) -> None:
     state_dir = tmp_path / ".superturtle/subturtles" / "worker-cli"
     state_dir.mkdir(parents=True)
@@ -75,6 +185,8 @@ def test_main_dispatches_to_run_loop(monkeypatch, tmp_path) -> None:
             name="worker-cli",
             type="yolo-codex",
             skills=["frontend", "qa"],
+            worktree=False,
+            profile=None,
         ),
     )
 
@@ -88,6 +200,44 @@ def test_main_dispatches_to_run_loop(monkeypatch, tmp_path) -> None:
     }
 
 
+def test_main_releases_worktree_when_loop_fails(monkeypatch, tmp_path) -> None:
+    calls = []
+
+    class FakePool:
+        def __init__(self, project_dir) -> None:
+            pass
+
+        def acquire(self, name, pid=None):
+            calls.append(("acquire", name))
+            return tmp_path / "slot-00"
+
+        def release(self, name):
+            calls.append(("release", name))
+
+    def failing_run_loop(**_kwargs) -> None:
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(subturtle_main, "WorktreePool", FakePool)
+    monkeypatch.setattr(subturtle_main, "run_loop", failing_run_loop)
+    monkeypatch.setattr(
+        subturtle_main.argparse.ArgumentParser,
+        "parse_args",
+        lambda self: argparse.Namespace(
+            state_dir=str(tmp_path),
+            name="worker-cli",
+            type="yolo-codex",
+            skills=[],
+            worktree=True,
+            profile=None,
+        ),
+    )
+
+    with pytest.raises(RuntimeError):
+        subturtle_main.main()
+
+    assert calls == [("acquire", "worker-cli"), ("release", "worker-cli")]
+
+
 def test_monorepo_import_path_smoke(tmp_path) -> None:
     _assert_imports_succeed(
         tmp_path,
@@ -239,7 +389,7 @@ def test_run_yolo_loop_resets_failure_counter_after_success(monkeypatch, tmp_pat
             return "ok"
 
     def fake_record_checkpoint(
-        _state_dir, _name, _project_dir, _loop_type: str, iteration: int
+        _state_dir, _name, _project_dir, _loop_type: str, iteration: int, details=None
     ) -> None:
         checkpoint_iterations.append(iteration)
 
@@ -266,6 +416,186 @@ def test_run_yolo_loop_resets_failure_counter_after_success(monkeypatch, tmp_pat
     ]
 
 
+def test_run_yolo_loop_records_phase_timings_in_checkpoint(monkeypatch, tmp_path) -> None:
+    state_dir = tmp_path / ".superturtle/subturtles" / "worker-timings"
+    state_dir.mkdir(parents=True)
+    state_file = state_dir / "CLAUDE.md"
+    state_file.write_text("# Current task\n\nMeasure phases <- current\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(subturtle_loops, "_require_cli", lambda _name, _cli: None)
+    monkeypatch.setattr(subturtle_loops.time, "sleep", lambda _delay: None)
+    monkeypatch.setattr(subturtle_loops, "_archive_workspace", lambda _state_dir, _name: None)
+    monkeypatch.setattr(subturtle_statefile, "git_head_sha", lambda _project_dir: None)
+
+    outcomes = [OSError("launch failed"), None]
+
+    class FlakyClaude:
+        def execute(self, _prompt: str) -> str:
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            state_file.write_text(
+                state_file.read_text(encoding="utf-8") + "\n## Loop Control\nSTOP\n",
+                encoding="utf-8",
+            )
+            return "ok"
+
+    monkeypatch.setattr(subturtle_loops, "Claude", lambda **_kwargs: FlakyClaude())
+
+    subturtle_loops.run_yolo_loop(state_dir, "worker-timings")
+
+    store = ConductorStateStore(tmp_path / ".superturtle" / "state")
+    checkpoints = [
+        event
+        for _offset, event in store.iter_events()
+        if event["event_type"] == "worker.checkpoint"
+    ]
+    assert len(checkpoints) == 1
+    timings = checkpoints[0]["payload"]["timings"]
+    assert timings["clock"] == "monotonic"
+    assert set(timings["phases"]) == {"yolo"}
+    assert timings["retries"] == 1
+    assert timings["total_seconds"] >= timings["phases"]["yolo"]
+    yolo_prompt = checkpoints[0]["payload"]["prompts"]["phases"]["yolo"]
+    assert yolo_prompt["chars"] > 0
+    assert yolo_prompt["transport"] == "argv"
+
+
+def test_profile_env_writes_per_iteration_profiles(monkeypatch, tmp_path) -> None:
+    state_dir = tmp_path / ".superturtle/subturtles" / "worker-profile"
+    state_dir.mkdir(parents=True)
+    state_file = state_dir / "CLAUDE.md"
+    state_file.write_text("# Current task\n\nProfile the loop <- current\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv(subturtle_profiling.PROFILE_ENV, "all")
+    monkeypatch.setattr(subturtle_loops, "_require_cli", lambda _name, _cli: None)
+    monkeypatch.setattr(subturtle_loops, "_archive_workspace", lambda _state_dir, _name: None)
+    monkeypatch.setattr(subturtle_statefile, "git_head_sha", lambda _project_dir: None)
+
+    class StoppingClaude:
+        def execute(self, _prompt: str) -> str:
+            state_file.write_text(
+                state_file.read_text(encoding="utf-8") + "\n## Loop Control\nSTOP\n",
+                encoding="utf-8",
+            )
+            return "ok"
+
+    monkeypatch.setattr(subturtle_loops, "Claude", lambda **_kwargs: StoppingClaude())
+
+    try:
+        subturtle_loops.run_yolo_loop(state_dir, "worker-profile")
+    finally:
+        tracemalloc.stop()
+
+    store = ConductorStateStore(tmp_path / ".superturtle" / "state")
+    [checkpoint] = [
+        event
+        for _offset, event in store.iter_events()
+        if event["event_type"] == "worker.checkpoint"
+    ]
+    profile = checkpoint["payload"]["profile"]
+    assert profile["cpu_profile"] == str(state_dir / "profiles" / "iteration-0001.prof")
+    assert pstats.Stats(profile["cpu_profile"]).total_calls > 0
+    memory = json.loads(Path(profile["memory_top"]).read_text(encoding="utf-8"))
+    assert memory["peak_kb"] >= memory["traced_kb"]
+    assert memory["top_sites"]
+
+
+def test_profiling_is_off_without_env(monkeypatch, tmp_path) -> None:
+    monkeypatch.delenv(subturtle_profiling.PROFILE_ENV, raising=False)
+    assert subturtle_profiling.IterationProfiler.from_env(tmp_path) is None
+    with subturtle_profiling.profiled_iteration(None, 1) as profile:
+        assert profile is None
+    monkeypatch.setenv(subturtle_profiling.PROFILE_ENV, "heap")
+    with pytest.raises(ValueError):
+        subturtle_profiling.profile_mode_from_env()
+
+
+def test_usage_budget_stops_worker_through_failure_pending(monkeypatch, tmp_path) -> None:
+    state_dir = tmp_path / ".superturtle/subturtles" / "worker-budget"
+    state_dir.mkdir(parents=True)
+    (state_dir / "CLAUDE.md").write_text("# Current task\n\nSpend <- current\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv(subturtle_agents.TOKEN_BUDGET_ENV, "1000")
+    monkeypatch.setattr(subturtle_loops, "_require_cli", lambda _name, _cli: None)
+    monkeypatch.setattr(subturtle_statefile, "git_head_sha", lambda _project_dir: None)
+    calls = {"count": 0}
+
+    class SpendingClaude:
+        def __init__(self, on_usage, **_kwargs) -> None:
+            self.on_usage = on_usage
+
+        def execute(self, _prompt: str) -> str:
+            calls["count"] += 1
+            self.on_usage("claude", {"input_tokens": 600, "output_tokens": 100, "cost_usd": 0.25})
+            return "ok"
+
+    monkeypatch.setattr(subturtle_loops, "Claude", SpendingClaude)
+
+    subturtle_loops.run_yolo_loop(state_dir, "worker-budget")
+
+    assert calls["count"] == 2
+    store = ConductorStateStore(tmp_path / ".superturtle" / "state")
+    worker_state = store.load_worker_state("worker-budget")
+    assert worker_state["lifecycle_state"] == "failure_pending"
+    totals = worker_state["metadata"]["usage_totals"]
+    assert totals["input_tokens"] == 1200
+    assert totals["cost_usd"] == 0.5
+    assert totals["checkpoints"] == 2
+    last_error = worker_state["metadata"]["last_error"]
+    assert last_error["error_type"] == subturtle_loops.USAGE_BUDGET_ERROR_TYPE
+    assert last_error["message"] == "tokens budget exhausted: spent 1400 of 1000"
+    checkpoint_usage = worker_state["checkpoint"]["usage"]
+    assert checkpoint_usage["phases"]["yolo"]["output_tokens"] == 100
+
+
+def test_agent_timeout_is_recorded_and_retried(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(subturtle_loops.time, "sleep", lambda _delay: None)
+    store = ConductorStateStore(tmp_path / ".superturtle" / "state")
+    store.write_worker_state(
+        store.make_worker_state(
+            worker_name="worker-hung",
+            lifecycle_state="running",
+            updated_by="supervisor",
+            run_id="run-hung",
+            loop_type="yolo-codex",
+        )
+    )
+    error = subturtle_loops.AgentTimeout(-15, ["/usr/bin/codex", "exec"], "idle", 1200.0, 1201.5)
+
+    failures, should_stop = subturtle_loops._handle_agent_failure(
+        tmp_path, "worker-hung", tmp_path, "yolo-codex", error, 0
+    )
+
+    assert (failures, should_stop) == (1, False)
+    events = [event for _offset, event in store.iter_events()]
+    assert events[-1]["event_type"] == "worker.agent_timeout"
+    assert events[-1]["payload"]["timeout_kind"] == "idle"
+    assert events[-1]["payload"]["command"] == "codex"
+    worker_state = store.load_worker_state("worker-hung")
+    assert worker_state["lifecycle_state"] == "running"
+    assert worker_state["last_event_id"] == events[-1]["id"]
+
+
+def test_iteration_timer_folds_failed_attempts_into_retry_totals() -> None:
+    ticks = iter([0.0, 1.0, 3.0, 3.0, 4.0, 4.0, 9.0, 10.0])
+    timer = subturtle_loops.IterationTimer(clock=lambda: next(ticks))
+
+    with timer.phase("planner"):
+        pass
+    with timer.retry():
+        pass
+    with timer.phase("planner"):
+        pass
+
+    payload = timer.as_payload()
+    assert payload["phases"] == {"planner": 5.0}
+    assert payload["failed_attempt_seconds"] == 2.0
+    assert payload["retry_sleep_seconds"] == 1.0
+    assert payload["retries"] == 1
+    assert payload["total_seconds"] == 10.0
+
+
 def test_archive_workspace_uses_ctl_stop_and_preserves_meta(monkeypatch, tmp_path) -> None:
     pid_file = tmp_path / "subturtle.pid"
     meta_file = tmp_path / "subturtle.meta"
@@ -345,6 +675,8 @@ def test_record_completion_pending_writes_state_event_and_wakeup(tmp_path) -> No
     )
     store.write_worker_state(initial)
 
+    subturtle_statefile.record_completion_pending(state_dir, "worker-2", project_dir)
+    # A retried record path must not duplicate the event or the wakeup.
     subturtle_statefile.record_completion_pending(state_dir, "worker-2", project_dir)
 
     worker_state = store.load_worker_state("worker-2")
@@ -354,8 +686,8 @@ def test_record_completion_pending_writes_state_event_and_wakeup(tmp_path) -> No
     assert worker_state["run_id"] == "run-222"
 
     events = store.paths.events_jsonl_file.read_text(encoding="utf-8")
-    assert "worker.completion_requested" in events
-    assert "worker-2" in events
+    assert events.count("worker.completion_requested") == 1
+    assert "worker-2:run-222:completion_requested" in events
 
     wakeups = store.list_wakeups()
     assert len(wakeups) == 1
@@ -380,7 +712,11 @@ def test_record_checkpoint_updates_worker_state_and_event(monkeypatch, tmp_path)
         run_id="run-333",
         workspace=str(state_dir),
         loop_type="yolo-codex",
+        pid=4242,
+        timeout_seconds=3600,
+        cron_job_id="cron-333",
         current_task="Refine checkpoint handling",
+        metadata={"owner": "supervisor"},
     )
     store.write_worker_state(initial)
     monkeypatch.setattr(subturtle_statefile, "git_head_sha", lambda _project_dir: "abc123")
@@ -399,6 +735,9 @@ def test_record_checkpoint_updates_worker_state_and_event(monkeypatch, tmp_path)
     assert worker_state["checkpoint"]["iteration"] == 4
     assert worker_state["checkpoint"]["head_sha"] == "abc123"
     assert worker_state["checkpoint"]["current_task"] == "Refine checkpoint handling"
+    for field in ("run_id", "pid", "timeout_seconds", "cron_job_id", "created_at"):
+        assert worker_state[field] == initial[field]
+    assert worker_state["metadata"]["owner"] == "supervisor"
 
     events = store.paths.events_jsonl_file.read_text(encoding="utf-8")
     assert "worker.checkpoint" in events
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from super_turtle.subturtle import worktrees
+
+
+def _git(repo: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+        text=True,
+        env={
+            "GIT_AUTHOR_NAME": "t",
+            "GIT_AUTHOR_EMAIL": "t@example.com",
+            "GIT_COMMITTER_NAME": "t",
+            "GIT_COMMITTER_EMAIL": "t@example.com",
+            "HOME": str(repo),
+            "PATH": "/usr/bin:/bin:/usr/local/bin",
+        },
+    ).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path) -> Path:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    (repo / ".gitignore").write_text(".superturtle/\nnode_modules/\n", encoding="utf-8")
+    (repo / "app.py").write_text("print('hi')\n", encoding="utf-8")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "Initial commit")
+    return repo
+
+
+def test_acquire_checks_out_worker_branch_and_is_idempotent(repo) -> None:
+    pool = worktrees.WorktreePool(repo)
+
+    path = pool.acquire("alpha")
+
+    assert path == worktrees.pool_dir(repo.resolve()) / "slot-00"
+    assert _git(path, "rev-parse", "--abbrev-ref", "HEAD") == "subturtle/alpha"
+    assert (path / "app.py").exists()
+    assert pool.acquire("alpha") == path
+    assert pool.acquire("beta") != path
+    assert worktrees.leased_worktree(repo, "alpha") == path
+    assert worktrees.leased_worktree(repo, "gamma") is None
+
+
+def test_release_recycles_slot_keeping_branch_and_ignored_caches(repo) -> None:
+    pool = worktrees.WorktreePool(repo)
+    path = pool.acquire("alpha")
+    (path / "app.py").write_text("print('alpha')\n", encoding="utf-8")
+    _git(path, "commit", "-q", "-am", "alpha work")
+    alpha_head = _git(path, "rev-parse", "HEAD")
+    (path / "scratch.txt").write_text("untracked\n", encoding="utf-8")
+    (path / "node_modules").mkdir()
+    (path / "node_modules" / "dep.js").write_text("cached\n", encoding="utf-8")
+
+    assert pool.release("alpha") == path
+    assert _git(repo, "rev-parse", "subturtle/alpha") == alpha_head
+    assert "subturtle/alpha: uncommitted work in slot-00" in _git(repo, "stash", "list")
+    assert worktrees.leased_worktree(repo, "alpha") is None
+
+    assert pool.acquire("beta") == path
+    assert _git(path, "rev-parse", "--abbrev-ref", "HEAD") == "subturtle/beta"
+    assert (path / "app.py").read_text(encoding="utf-8") == "print('hi')\n"
+    assert not (path / "scratch.txt").exists()
+    assert (path / "node_modules" / "dep.js").exists()
+
+
+def test_reacquire_after_release_resumes_existing_branch(repo) -> None:
+    pool = worktrees.WorktreePool(repo)
+    path = pool.acquire("alpha")
+    (path / "app.py").write_text("print('alpha')\n", encoding="utf-8")
+    _git(path, "commit", "-q", "-am", "alpha work")
+    pool.release("alpha")
+
+    path = pool.acquire("alpha")
+
+    assert (path / "app.py").read_text(encoding="utf-8") == "print('alpha')\n"
+
+
+def test_acquire_reclaims_slots_held_by_dead_processes(repo) -> None:
+    pool = worktrees.WorktreePool(repo)
+    dead = subprocess.Popen(["true"])
+    dead.wait()
+    path = pool.acquire("alpha", pid=dead.pid)
+    (path / "app.py").write_text("print('unsaved')\n", encoding="utf-8")
+
+    assert pool.acquire("beta") == path
+    assert worktrees.leased_worktree(repo, "alpha") is None
+    assert (path / "app.py").read_text(encoding="utf-8") == "print('hi')\n"
+    assert "subturtle/alpha: uncommitted work" in _git(repo, "stash", "list")
+    _git(repo, "stash", "pop")
+    assert (repo / "app.py").read_text(encoding="utf-8") == "print('unsaved')\n"
+
+
+def test_prewarm_creates_missing_slots_once(repo) -> None:
+    pool = worktrees.WorktreePool(repo)
+
+    assert pool.prewarm(2) == ["slot-00", "slot-01"]
+    assert pool.prewarm(2) == []
+    assert pool.acquire("alpha").name == "slot-00"
@@ -0,0 +1,211 @@
+"""Git worktree pool so SubTurtles can share one repository concurrently."""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import subprocess
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+WORKTREE_ENV = "SUPERTURTLE_WORKTREE"
+BRANCH_PREFIX = "subturtle/"
+SLOT_PREFIX = "slot-"
+
+
+def pool_dir(project_dir: Path) -> Path:
+    """Return the directory holding pooled worktrees for a project."""
+    return project_dir / ".superturtle" / "worktrees"
+
+
+def worker_branch(name: str) -> str:
+    """Return the branch a worker commits to inside its leased worktree."""
+    return f"{BRANCH_PREFIX}{name}"
+
+
+def _pid_alive(pid: Any) -> bool:
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WorktreePool:
+    """Pre-created ``git worktree`` checkouts leased to workers by name.
+
+    Slots live under ``.superturtle/worktrees/slot-NN`` and are recycled
+    rather than deleted: a released slot has its uncommitted work stashed and
+    is detached and cleaned, but keeps its ignored files (dependency installs,
+    build caches), so the next lease starts warm. Leases are tracked in
+    ``pool.json`` under an flock.
+    """
+
+    def __init__(self, project_dir: Path):
+        self.project_dir = project_dir.resolve()
+        self.root = pool_dir(self.project_dir)
+        self.index_path = self.root / "pool.json"
+
+    def _git(self, *args: str, cwd: Path | None = None) -> str:
+        return subprocess.run(
+            ["git", *args],
+            cwd=cwd or self.project_dir,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    @contextmanager
+    def _locked_index(self) -> Iterator[dict[str, Any]]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with (self.root / ".lock").open("a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                try:
+                    index = json.loads(self.index_path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    index = {}
+                index.setdefault("slots", {})
+                yield index
+                with tempfile.NamedTemporaryFile(
+                    "w", encoding="utf-8", delete=False, dir=self.root
+                ) as tmp_file:
+                    json.dump(index, tmp_file, indent=2, sort_keys=True)
+                    tmp_file.write("\n")
+                Path(tmp_file.name).replace(self.index_path)
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _create_slot_locked(self, index: dict[str, Any], base_ref: str) -> str:
+        number = 0
+        while f"{SLOT_PREFIX}{number:02d}" in index["slots"]:
+            number += 1
+        slot = f"{SLOT_PREFIX}{number:02d}"
+        self._git("worktree", "add", "--detach", str(self.root / slot), base_ref)
+        index["slots"][slot] = {"worker": None}
+        return slot
+
+    def _stash_uncommitted(self, slot: str, worker: str) -> bool:
+        """Stash tracked changes and untracked files before a slot is reset.
+
+        Stashes are shared by every worktree, so the work stays reachable from
+        ``git stash list`` in the main checkout. Ignored files are left alone.
+        """
+        path = self.root / slot
+        if not self._git("status", "--porcelain", cwd=path):
+            return False
+        # A fixed identity lets the stash commit succeed where none is configured.
+        self._git(
+            "-c", "user.name=SubTurtle", "-c", "user.email=subturtle@localhost",
+            "stash", "push", "--include-untracked",
+            "--message", f"{worker_branch(worker)}: uncommitted work in {slot}",
+            cwd=path,
+        )
+        return True
+
+    def _reset_slot(self, slot: str, base_ref: str, previous_worker: str | None) -> None:
+        # Uncommitted work is stashed; ignored files stay warm.
+        if previous_worker:
+            self._stash_uncommitted(slot, previous_worker)
+        path = self.root / slot
+        self._git("checkout", "--detach", "--force", base_ref, cwd=path)
+        self._git("clean", "-fd", cwd=path)
+
+    def prewarm(self, count: int, base_ref: str = "HEAD") -> list[str]:
+        """Ensure at least ``count`` slots exist; returns the slots created."""
+        created: list[str] = []
+        with self._locked_index() as index:
+            while len(index["slots"]) < count:
+                created.append(self._create_slot_locked(index, base_ref))
+        return created
+
+    def lease_for(self, name: str) -> Path | None:
+        """Return the worktree currently leased to ``name``, if any."""
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        for slot, lease in (index.get("slots") or {}).items():
+            if lease.get("worker") == name and (self.root / slot).is_dir():
+                return self.root / slot
+        return None
+
+    def acquire(self, name: str, base_ref: str = "HEAD", pid: int | None = None) -> Path:
+        """Lease a worktree to ``name`` on branch ``subturtle/<name>``.
+
+        Re-acquiring keeps an existing lease, so a restarted worker resumes in
+        the same checkout. Slots held by dead processes are reclaimed before a
+        new slot is created; their uncommitted work is stashed first.
+        """
+        base_sha = self._git("rev-parse", base_ref)
+        with self._locked_index() as index:
+            slots = index["slots"]
+            for slot, lease in slots.items():
+                if lease.get("worker") == name:
+                    lease["pid"] = pid
+                    return self.root / slot
+
+            free = [slot for slot, lease in sorted(slots.items()) if not lease.get("worker")]
+            if not free:
+                free = [
+                    slot
+                    for slot, lease in sorted(slots.items())
+                    if lease.get("pid") is not None and not _pid_alive(lease.get("pid"))
+                ]
+            slot = free[0] if free else self._create_slot_locked(index, base_sha)
+            path = self.root / slot
+            self._reset_slot(slot, base_sha, slots.get(slot, {}).get("worker"))
+            # An existing branch carries the worker's earlier commits.
+            branch = worker_branch(name)
+            if self._git("branch", "--list", branch):
+                self._git("checkout", branch, cwd=path)
+            else:
+                self._git("checkout", "-b", branch, base_sha, cwd=path)
+            slots[slot] = {"worker": name, "pid": pid, "base_sha": base_sha}
+            return path
+
+    def release(self, name: str) -> Path | None:
+        """Return ``name``'s slot to the pool, keeping its branch for merging.
+
+        Uncommitted work is stashed rather than discarded. Releasing a worker
+        without a lease is a no-op, so stop, crash, and archive paths can all
+        call this.
+        """
+        with self._locked_index() as index:
+            for slot, lease in index["slots"].items():
+                if lease.get("worker") != name:
+                    continue
+                path = self.root / slot
+                if path.is_dir():
+                    self._stash_uncommitted(slot, name)
+                    # Detaching frees the branch so it can be merged or reused.
+                    self._git("checkout", "--detach", "--force", cwd=path)
+                    self._git("clean", "-fd", cwd=path)
+                index["slots"][slot] = {"worker": None}
+                return path
+        return None
+
+
+def leased_worktree(project_dir: Path, name: str) -> Path | None:
+    """Return the worktree leased to a worker, or None when it runs in place."""
+    if not pool_dir(project_dir).is_dir():
+        return None
+    return WorktreePool(project_dir).lease_for(name)
+
+
+__all__ = [
+    "BRANCH_PREFIX",
+    "WORKTREE_ENV",
+    "WorktreePool",
+    "leased_worktree",
+    "pool_dir",
+    "worker_branch",
+]